@@ -56,6 +56,7 @@ SPEC = {
         'maximum number of tries': vdr(vtype='integer', vmin=1, default=7),
         'connection timeout': vdr(
             vtype='interval', default=DurationFloat(30)),
+        'local aggregation': vdr(vtype='boolean', default=False),
     },
 
     'cylc': {
@@ -64,6 +65,16 @@ SPEC = {
             vtype='interval', default=DurationFloat(600)),
         'task event mail interval': vdr(
             vtype='interval', default=DurationFloat(300)),
+        'database history retention': vdr(vtype='interval', default=None),
+        'public database maximum lag': vdr(
+            vtype='interval', default=DurationFloat(120)),
+        'public database journal mode': vdr(
+            vtype='string', options=["DELETE", "WAL"], default="DELETE"),
+        'private database persistent connection': vdr(
+            vtype='boolean', default=False),
+        'private database synchronous': vdr(
+            vtype='string', options=["OFF", "NORMAL", "FULL"]),
+        'private database cache size': vdr(vtype='integer'),
         'events': {
             'handlers': vdr(vtype='string_list', default=[]),
             'handler events': vdr(vtype='string_list', default=[]),
@@ -154,6 +165,7 @@ SPEC = {
                 vtype='string',
                 default='ssh -oBatchMode=yes -oConnectTimeout=10'),
             'use login shell': vdr(vtype='boolean', default=True),
+            'use ssh control master': vdr(vtype='boolean', default=False),
             'cylc executable': vdr(vtype='string', default='cylc'),
             'global init-script': vdr(vtype='string', default=''),
             'copyable environment variables': vdr(
@@ -206,6 +218,7 @@ SPEC = {
             'remote copy template': vdr(vtype='string'),
             'remote shell template': vdr(vtype='string'),
             'use login shell': vdr(vtype='boolean', default=None),
+            'use ssh control master': vdr(vtype='boolean', default=None),
             'cylc executable': vdr(vtype='string'),
             'global init-script': vdr(vtype='string'),
             'copyable environment variables': vdr(
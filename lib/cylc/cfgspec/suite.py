@@ -186,6 +186,7 @@ SPEC = {
         'abort if any task fails': vdr(vtype='boolean', default=False),
         'health check interval': vdr(vtype='interval', default=None),
         'task event mail interval': vdr(vtype='interval', default=None),
+        'database history retention': vdr(vtype='interval', default=None),
         'log resolved dependencies': vdr(vtype='boolean', default=False),
         'disable automatic shutdown': vdr(vtype='boolean', default=False),
         'environment': {
@@ -69,6 +69,14 @@ class Poller(object):
         """Abstract method. Test polling condition."""
         raise NotImplementedError()
 
+    def wait(self):
+        """Wait before the next check.
+
+        Derived classes may override this to return early, e.g. when the
+        polled program reports a change.
+        """
+        sleep(self.interval)
+
     def poll(self):
         """Poll for the condition embodied by self.check().
         Return True if condition met, or False if polling exhausted."""
@@ -88,7 +96,7 @@ class Poller(object):
                 return True
             if self.max_polls > 1:
                 sys.stdout.write(".")
-                sleep(self.interval)
+                self.wait()
         sys.stdout.write("\n")
         if self.max_polls > 1:
             sys.stderr.write(
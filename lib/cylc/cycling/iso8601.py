@@ -21,7 +21,7 @@
 import re
 import unittest
 
-from isodatetime.data import Calendar, Duration
+from isodatetime.data import Calendar, Duration, get_days_since_1_ad
 from isodatetime.dumpers import TimePointDumper
 from isodatetime.parsers import TimePointParser, DurationParser
 from isodatetime.timezone import (
@@ -84,7 +84,16 @@ def memoize(function):
 
 class ISO8601Point(PointBase):
 
-    """A single point in an ISO8601 date time sequence."""
+    """A single point in an ISO8601 date time sequence.
+
+    As well as its string value, a point may carry an integer representation
+    of itself: the number of seconds since the start of 1 AD (UTC) in the
+    current calendar. Where available, this is used for comparison and
+    hashing, and adding or subtracting a fixed-length interval (without years
+    or months) is an integer addition. A point resulting from such arithmetic
+    only works out its string value on demand.
+
+    """
 
     TYPE = CYCLER_TYPE_ISO8601
     TYPE_SORT_KEY = CYCLER_TYPE_SORT_KEY_ISO8601
@@ -94,16 +103,75 @@ class ISO8601Point(PointBase):
         """Standardise a date-time string."""
         return ISO8601Point(str(point_parse(point_string))).standardise()
 
+    @classmethod
+    def _from_epoch(cls, epoch, base_value, base_epoch):
+        """Return a point "epoch - base_epoch" seconds after base_value."""
+        point = cls.__new__(cls)
+        point._value = None
+        point._epoch = epoch
+        point._base = (base_value, base_epoch)
+        return point
+
+    def __init__(self, value):
+        self._value = None
+        self._epoch = None
+        self._base = None
+        PointBase.__init__(self, value)
+
+    def _get_value(self):
+        """Return the string value, working it out if necessary."""
+        if self._value is None:
+            base_value, base_epoch = self._base
+            self._value = self._iso_point_add_seconds(
+                base_value, self._epoch - base_epoch)
+            self._base = None
+        return self._value
+
+    def _set_value(self, value):
+        """Set the string value, and invalidate its integer epoch."""
+        self._value = value
+        self._epoch = None
+        self._base = None
+
+    value = property(_get_value, _set_value)
+
+    def get_epoch(self):
+        """Return seconds since the start of 1 AD (UTC), or None."""
+        if self._epoch is None:
+            self._epoch = get_point_epoch(self._value)
+        return self._epoch
+
     def add(self, other):
         """Add an Interval to self."""
+        seconds = get_interval_seconds(other.value)
+        if seconds is not None and self.get_epoch() >= -seconds:
+            return self._add_seconds(seconds)
         return ISO8601Point(self._iso_point_add(self.value, other.value))
 
+    def _add_seconds(self, seconds):
+        """Return a new point, seconds after self (integer arithmetic).
+
+        The result must not be before 1 AD, to keep epochs consistent with
+        points created from strings.
+        """
+        if self._value is None:
+            base_value, base_epoch = self._base
+        else:
+            base_value, base_epoch = self._value, self._epoch
+        return ISO8601Point._from_epoch(
+            self._epoch + seconds, base_value, base_epoch)
+
     def __cmp__(self, other):
         # Compare other (point) to self.
         if other is None:
             return -1
         if self.TYPE != other.TYPE:
             return cmp(self.TYPE_SORT_KEY, other.TYPE_SORT_KEY)
+        epoch = self.get_epoch()
+        if epoch is not None:
+            other_epoch = other.get_epoch()
+            if other_epoch is not None:
+                return cmp(epoch, other_epoch)
         if self.value == other.value:
             return 0
         return self._iso_point_cmp(self.value, other.value)
@@ -126,10 +194,17 @@ class ISO8601Point(PointBase):
         if isinstance(other, ISO8601Point):
             return ISO8601Interval(
                 self._iso_point_sub_point(self.value, other.value))
+        seconds = get_interval_seconds(other.value)
+        if seconds is not None and self.get_epoch() >= seconds:
+            return self._add_seconds(-seconds)
         return ISO8601Point(
             self._iso_point_sub_interval(self.value, other.value))
 
     def __hash__(self):
+        # Equal points have equal epochs, where available.
+        epoch = self.get_epoch()
+        if epoch is not None:
+            return hash(epoch)
         return hash(self.value)
 
     @staticmethod
@@ -140,6 +215,15 @@ class ISO8601Point(PointBase):
         interval = interval_parse(interval_string)
         return str(point + interval)
 
+    @staticmethod
+    @memoize
+    def _iso_point_add_seconds(point_string, seconds):
+        """Add a number of seconds to the parsed point_string."""
+        point = point_parse(point_string)
+        if seconds < 0:
+            return str(point - _get_seconds_as_duration(-seconds))
+        return str(point + _get_seconds_as_duration(seconds))
+
     @staticmethod
     @memoize
     def _iso_point_cmp(point_string, other_point_string):
@@ -637,19 +721,24 @@ def init(num_expanded_year_digits=0, custom_dump_format=None, time_zone=None,
 
 def get_point_relative(offset_string, base_point):
     """Create a point from offset_string applied to base_point."""
-    try:
-        interval = ISO8601Interval(
-            str(interval_parse(offset_string)))
-    except Exception:
-        pass
-    else:
-        return base_point + interval
+    interval_string = _get_offset_interval_string(offset_string)
+    if interval_string is not None:
+        return base_point + ISO8601Interval(interval_string)
     return ISO8601Point(str(
         SuiteSpecifics.abbrev_util.parse_timepoint(
             offset_string, context_point=_point_parse(base_point.value))
     ))
 
 
+@memoize
+def _get_offset_interval_string(offset_string):
+    """Return offset_string as an interval string, or None if not one."""
+    try:
+        return str(interval_parse(offset_string))
+    except Exception:
+        return None
+
+
 def interval_parse(interval_string):
     """Parse an interval_string into a proper Duration class."""
     try:
@@ -698,6 +787,66 @@ def _point_parse(point_string):
     return SuiteSpecifics.point_parser.parse(point_string)
 
 
+def get_point_epoch(point_string):
+    """Return seconds since the start of 1 AD (UTC) for point_string.
+
+    Return None if the point cannot be represented in this way, e.g. a point
+    before 1 AD or with fractional seconds.
+
+    """
+    return _get_point_epoch(point_string, Calendar.default().mode)
+
+
+@memoize
+def _get_point_epoch(point_string, calendar_mode):
+    """Return seconds since the start of 1 AD (UTC) for point_string."""
+    try:
+        point = point_parse(point_string)
+    except ValueError:
+        return None
+    if point.truncated:
+        return None
+    point.set_time_zone_to_utc()
+    year, day_of_year = point.get_ordinal_date()
+    second_of_day = point.get_second_of_day()
+    if year < 1 or second_of_day != int(second_of_day):
+        return None
+    return (
+        (get_days_since_1_ad(year - 1) + day_of_year - 1) * 86400 +
+        int(second_of_day))
+
+
+@memoize
+def get_interval_seconds(interval_string):
+    """Return the length of a fixed-length interval in seconds.
+
+    Return None if the interval has a nominal length (years or months), or
+    has fractional seconds.
+
+    """
+    try:
+        interval = interval_parse(interval_string)
+    except ValueError:
+        return None
+    if interval.years or interval.months:
+        return None
+    seconds = (
+        ((interval.weeks or 0) * 7 + (interval.days or 0)) * 86400 +
+        (interval.hours or 0) * 3600 + (interval.minutes or 0) * 60 +
+        (interval.seconds or 0))
+    if seconds != int(seconds):
+        return None
+    return int(seconds)
+
+
+def _get_seconds_as_duration(seconds):
+    """Return a Duration of (non-negative) seconds, in days to seconds."""
+    days, seconds = divmod(seconds, 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    return Duration(days=days, hours=hours, minutes=minutes, seconds=seconds)
+
+
 class TestISO8601Sequence(unittest.TestCase):
     """Contains unit tests for the ISO8601Sequence class."""
 
@@ -790,5 +939,84 @@ class TestISO8601Sequence(unittest.TestCase):
             sequence.is_on_sequence(ISO8601Point('20100809T0005')))
 
 
+class TestISO8601Point(unittest.TestCase):
+    """Contains unit tests for the ISO8601Point class."""
+
+    def _get_str_results(self, point_string, interval_string):
+        """Return string results of point +/- interval, without epoch."""
+        return (
+            ISO8601Point._iso_point_add(point_string, interval_string),
+            ISO8601Point._iso_point_sub_interval(
+                point_string, interval_string))
+
+    def test_epoch_arithmetic(self):
+        """Test integer epoch arithmetic matches date-time arithmetic."""
+        for time_zone in ['Z', '+0530', '-1000']:
+            init(time_zone=time_zone)
+            for point_string in [
+                    '20000101T0000Z', '20000228T1200+0100', '19991231T2359Z',
+                    '21000228T0000-0800', '20000301T0000']:
+                point = ISO8601Point(point_string).standardise()
+                self.assertTrue(point.get_epoch() is not None)
+                for interval_string in [
+                        'PT1M', 'PT6H', 'P1D', 'P2W', 'P400D', 'PT36H30M',
+                        '-PT1H', 'P0D']:
+                    interval = ISO8601Interval(interval_string)
+                    str_add, str_sub = self._get_str_results(
+                        point.value, interval.value)
+                    self.assertEqual(str_add, str(point + interval))
+                    self.assertEqual(str_sub, str(point - interval))
+                    self.assertEqual(
+                        ISO8601Point(str_add), point + interval)
+                    self.assertEqual(
+                        hash(ISO8601Point(str_sub)), hash(point - interval))
+                    # Chained arithmetic via lazy points.
+                    self.assertEqual(
+                        str(point),
+                        str(point + interval + interval - interval - interval))
+
+    def test_before_1_ad(self):
+        """Test arithmetic across the start of 1 AD."""
+        init(time_zone='Z')
+        point = ISO8601Point('00010101T0100Z')
+        self.assertEqual(3600, point.get_epoch())
+        for interval_string in ['PT1H', 'PT2H']:
+            interval = ISO8601Interval(interval_string)
+            str_sub = self._get_str_results(point.value, interval.value)[1]
+            self.assertEqual(str_sub, str(point - interval))
+            self.assertEqual(
+                hash(ISO8601Point(str_sub)), hash(point - interval))
+        self.assertEqual(None, (point - ISO8601Interval('PT2H')).get_epoch())
+
+    def test_nominal_interval(self):
+        """Test arithmetic with years and months does not use epochs."""
+        init(time_zone='Z')
+        point = ISO8601Point('20000131T0000Z')
+        self.assertEqual('20000229T0000Z', str(point + ISO8601Interval('P1M')))
+        self.assertEqual('19990131T0000Z', str(point - ISO8601Interval('P1Y')))
+
+    def test_cmp_hash(self):
+        """Test comparison and hashing across time zones."""
+        init(time_zone='Z')
+        point = ISO8601Point('20100101T0000Z')
+        other = ISO8601Point('20100101T0100+01')
+        self.assertEqual(point, other)
+        self.assertEqual(hash(point), hash(other))
+        self.assertEqual(1, len(set([point, other])))
+        self.assertTrue(point < ISO8601Point('20100101T0001Z'))
+        self.assertTrue(point > ISO8601Point('20091231T2359Z'))
+        self.assertEqual(
+            sorted([point + ISO8601Interval('PT%dH' % i) for i in [3, 1, 2]]),
+            [point + ISO8601Interval('PT%dH' % i) for i in [1, 2, 3]])
+
+    def test_standardise_resets_epoch(self):
+        """Test setting the value of a point resets its epoch."""
+        init(time_zone='Z')
+        point = ISO8601Point('20100101T0000Z')
+        epoch = point.get_epoch()
+        point.value = '20100101T0100Z'
+        self.assertEqual(epoch + 3600, point.get_epoch())
+
+
 if __name__ == '__main__':
     unittest.main()
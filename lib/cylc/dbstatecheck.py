@@ -146,6 +146,15 @@ class CylcSuiteDBChecker(object):
             while next:
                 res.append(next[0])
                 next = self.c.fetchmany()
+            if check_message:
+                # Task events may have been moved to archive files
+                for file_name in CylcSuiteDAO.get_archive_file_names(
+                        self.db_address):
+                    conn = sqlite3.connect(file_name, timeout=10.0)
+                    try:
+                        res.extend(conn.execute(q, vals))
+                    finally:
+                        conn.close()
         except sqlite3.OperationalError as err:
             raise DBOperationError(str(err))
         except Exception as err:
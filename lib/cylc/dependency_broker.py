@@ -0,0 +1,245 @@
+#!/usr/bin/env python
+
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2017 NIWA
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Match completed task outputs to task prerequisites.
+
+The broker keeps a reverse index of prerequisite messages to the task proxies
+that need them, and an index of the completed outputs of all task proxies in
+the (non-runahead) task pool. Both are maintained incrementally:
+ * The task pool calls "add" and "remove" as tasks enter and leave the pool.
+ * Task outputs call "output_completed" and "output_not_completed" as they
+   change.
+ * Task states call "prerequisites_reset" when their prerequisites are reset.
+
+Each call to "match" then only has to consider outputs completed, and task
+proxies added or reset, since the previous call, instead of the whole pool.
+
+"""
+
+import unittest
+
+from cylc.prerequisite import Prerequisite, PrerequisiteTemplate
+from cylc.task_outputs import TaskOutputs
+
+
+class DependencyBroker(object):
+    """Dependency broker of the task pool."""
+
+    def __init__(self):
+        # itasks[identity] = itask, for all task proxies in the broker.
+        self.itasks = {}
+        # outputs[message] = owner_id, for all completed outputs.
+        self.outputs = {}
+        # itasks_by_prereq[message] = {identity: itask, ...}
+        self.itasks_by_prereq = {}
+        # Outputs completed since last "match".
+        self.new_outputs = set()
+        # Task proxies added, or with prerequisites reset, since last "match".
+        self.new_itasks = {}
+
+    def add(self, itask):
+        """Add a task proxy to the broker."""
+        self.itasks[itask.identity] = itask
+        itask.state.broker = self
+        itask.state.outputs.broker = self
+        for message, owner_id in itask.state.outputs.completed.items():
+            self.output_completed(message, owner_id)
+        for message in self._get_prereq_messages(itask):
+            self.itasks_by_prereq.setdefault(message, {})
+            self.itasks_by_prereq[message][itask.identity] = itask
+        self.new_itasks[itask.identity] = itask
+
+    def remove(self, itask):
+        """Remove a task proxy from the broker."""
+        self.itasks.pop(itask.identity, None)
+        itask.state.broker = None
+        itask.state.outputs.broker = None
+        for message in itask.state.outputs.completed:
+            self.output_not_completed(message)
+        for message in self._get_prereq_messages(itask):
+            try:
+                del self.itasks_by_prereq[message][itask.identity]
+            except KeyError:
+                pass
+            else:
+                if not self.itasks_by_prereq[message]:
+                    del self.itasks_by_prereq[message]
+        self.new_itasks.pop(itask.identity, None)
+
+    def output_completed(self, message, owner_id):
+        """Register a newly completed output."""
+        self.outputs[message] = owner_id
+        self.new_outputs.add(message)
+
+    def output_not_completed(self, message):
+        """Unregister an output that is no longer completed."""
+        self.outputs.pop(message, None)
+
+    def prerequisites_reset(self, identity):
+        """Register a task proxy whose prerequisites have been reset."""
+        try:
+            self.new_itasks[identity] = self.itasks[identity]
+        except KeyError:
+            pass
+
+    def match(self):
+        """Satisfy prerequisites with new outputs, or of new task proxies.
+
+        Return True if any new matches are attempted.
+        """
+        if not self.new_outputs and not self.new_itasks:
+            return False
+        # Outputs for each task proxy: {identity: (itask, {message: owner})}
+        itask_outputs = {}
+        # New task proxies need to match against all completed outputs.
+        for identity, itask in self.new_itasks.items():
+            outputs = {}
+            for message in self._get_prereq_messages(itask):
+                if message in self.outputs:
+                    outputs[message] = self.outputs[message]
+            if outputs:
+                itask_outputs[identity] = (itask, outputs)
+        # Other task proxies only need to match against new outputs.
+        for message in self.new_outputs:
+            if message not in self.outputs:
+                # Completed then reset.
+                continue
+            for identity, itask in self.itasks_by_prereq.get(
+                    message, {}).items():
+                itask_outputs.setdefault(identity, (itask, {}))
+                itask_outputs[identity][1][message] = self.outputs[message]
+        self.new_outputs.clear()
+        self.new_itasks.clear()
+        for itask, outputs in itask_outputs.values():
+            # Try to satisfy itask if not already satisfied.
+            if itask.state.prerequisites_are_not_all_satisfied():
+                itask.state.satisfy_me(set(outputs), outputs)
+        return True
+
+    @staticmethod
+    def _get_prereq_messages(itask):
+        """Return a set of all prerequisite messages of a task proxy."""
+        messages = set()
+        for preqs in [itask.state.prerequisites,
+                      itask.state.suicide_prerequisites]:
+            for preq in preqs:
+                messages.update(preq.messages)
+        return messages
+
+
+class TestDependencyBroker(unittest.TestCase):
+    """Unit tests for DependencyBroker."""
+
+    class _FakeTaskState(object):
+        """Minimal stand-in for TaskState."""
+
+        def __init__(self, identity, prereq_messages):
+            self.broker = None
+            self.outputs = TaskOutputs(identity)
+            self.outputs.add("succeeded")
+            self.prerequisites = []
+            self.suicide_prerequisites = []
+            for i, message in enumerate(prereq_messages):
+                label = "l%d" % i
+                self.prerequisites.append(Prerequisite(
+                    PrerequisiteTemplate([label], label), [message]))
+
+        def prerequisites_are_not_all_satisfied(self):
+            return not all(preq.is_satisfied() for preq in self.prerequisites)
+
+        def satisfy_me(self, output_msgs, outputs):
+            for preq in self.prerequisites:
+                preq.satisfy_me(output_msgs, outputs)
+
+    class _FakeTaskProxy(object):
+        """Minimal stand-in for TaskProxy."""
+
+        def __init__(self, identity, prereq_messages):
+            self.identity = identity
+            self.state = TestDependencyBroker._FakeTaskState(
+                identity, prereq_messages)
+
+    def setUp(self):
+        self.broker = DependencyBroker()
+
+    def test_match_new_output(self):
+        """Test output completed after both tasks are added."""
+        foo = self._FakeTaskProxy("foo.1", [])
+        bar = self._FakeTaskProxy("bar.1", ["foo.1 succeeded"])
+        self.broker.add(foo)
+        self.broker.add(bar)
+        self.assertTrue(self.broker.match())
+        self.assertTrue(bar.state.prerequisites_are_not_all_satisfied())
+        self.assertFalse(self.broker.match())
+        foo.state.outputs.set_completed("succeeded")
+        self.assertTrue(self.broker.match())
+        self.assertFalse(bar.state.prerequisites_are_not_all_satisfied())
+        self.assertEqual(
+            {"l0": "foo.1"}, bar.state.prerequisites[0].satisfied_by)
+
+    def test_match_new_task(self):
+        """Test task added after output completed."""
+        foo = self._FakeTaskProxy("foo.1", [])
+        foo.state.outputs.set_completed("succeeded")
+        self.broker.add(foo)
+        self.broker.match()
+        bar = self._FakeTaskProxy("bar.1", ["foo.1 succeeded"])
+        self.broker.add(bar)
+        self.broker.match()
+        self.assertFalse(bar.state.prerequisites_are_not_all_satisfied())
+
+    def test_no_match_removed_or_reset(self):
+        """Test outputs of removed tasks, or reset outputs, do not match."""
+        foo = self._FakeTaskProxy("foo.1", [])
+        baz = self._FakeTaskProxy("baz.1", [])
+        self.broker.add(foo)
+        self.broker.add(baz)
+        foo.state.outputs.set_completed("succeeded")
+        foo.state.outputs.set_all_incomplete()
+        baz.state.outputs.set_completed("succeeded")
+        self.broker.remove(baz)
+        self.assertEqual({}, self.broker.outputs)
+        bar = self._FakeTaskProxy("bar.1", ["foo.1 succeeded"])
+        qux = self._FakeTaskProxy("qux.1", ["baz.1 succeeded"])
+        self.broker.add(bar)
+        self.broker.add(qux)
+        self.broker.match()
+        self.assertTrue(bar.state.prerequisites_are_not_all_satisfied())
+        self.assertTrue(qux.state.prerequisites_are_not_all_satisfied())
+        self.broker.remove(bar)
+        self.broker.remove(qux)
+        self.broker.remove(foo)
+        self.assertEqual({}, self.broker.itasks_by_prereq)
+
+    def test_prerequisites_reset(self):
+        """Test task with reset prerequisites is matched again."""
+        foo = self._FakeTaskProxy("foo.1", [])
+        bar = self._FakeTaskProxy("bar.1", ["foo.1 succeeded"])
+        foo.state.outputs.set_completed("succeeded")
+        self.broker.add(foo)
+        self.broker.add(bar)
+        self.broker.match()
+        self.assertFalse(bar.state.prerequisites_are_not_all_satisfied())
+        for preq in bar.state.prerequisites:
+            preq.set_not_satisfied()
+        self.broker.prerequisites_reset(bar.identity)
+        self.broker.match()
+        self.assertFalse(bar.state.prerequisites_are_not_all_satisfied())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -303,9 +303,8 @@ class Updater(threading.Thread):
 
     def retrieve_state_summaries(self):
         """Retrieve suite summary."""
-        ret = self.state_summary_client.get_suite_state_summary()
         glbl, states, fam_states = (
-            self.state_summary_client.get_suite_state_summary())
+            self.state_summary_client.get_suite_state_summary_incremental())
         self.ancestors = self.suite_info_client.get_info(
             'get_first_parent_ancestors')
         self.ancestors_pruned = self.suite_info_client.get_info(
@@ -20,12 +20,12 @@
 import os
 from pipes import quote
 from subprocess import Popen, PIPE
-import shlex
 from time import sleep, time
 from uuid import uuid4
 
 from cylc.cfgspec.globalcfg import GLOBAL_CFG
 from cylc.owner import USER
+from cylc.ssh_multiplexer import SSHMultiplexer
 from cylc.suite_logging import ERR, LOG
 from cylc.suite_srv_files_mgr import SuiteSrvFilesManager
 
@@ -93,7 +93,7 @@ class RemoteJobHostManager(object):
         # Create a UUID file in the service directory.
         # If remote host has the file in its service directory, we can assume
         # that the remote host has a shared file system with the suite host.
-        ssh_tmpl = GLOBAL_CFG.get_host_item(
+        ssh_cmd = SSHMultiplexer.get_inst().get_ssh_cmd(
             'remote shell template', host, owner)
         uuid_str = str(uuid4())
         uuid_fname = os.path.join(
@@ -101,7 +101,7 @@ class RemoteJobHostManager(object):
         try:
             open(uuid_fname, 'wb').close()
             proc = Popen(
-                shlex.split(ssh_tmpl) + [
+                ssh_cmd + [
                     '-n', user_at_host,
                     'test', '-e', os.path.join(r_suite_srv_dir, uuid_str)],
                 stdout=PIPE, stderr=PIPE)
@@ -117,7 +117,7 @@ class RemoteJobHostManager(object):
 
         cmds = []
         # Command to create suite directory structure on remote host.
-        cmds.append(shlex.split(ssh_tmpl) + [
+        cmds.append(ssh_cmd + [
             '-n', user_at_host,
             'mkdir', '-p',
             r_suite_run_dir, r_log_job_dir, r_suite_srv_dir])
@@ -126,9 +126,9 @@ class RemoteJobHostManager(object):
         should_unlink = GLOBAL_CFG.get_host_item(
             'task communication method', host, owner) != "poll"
         if should_unlink:
-            scp_tmpl = GLOBAL_CFG.get_host_item(
+            scp_cmd = SSHMultiplexer.get_inst().get_ssh_cmd(
                 'remote copy template', host, owner)
-            cmds.append(shlex.split(scp_tmpl) + [
+            cmds.append(scp_cmd + [
                 '-p',
                 self.suite_srv_files_mgr.get_contact_file(reg),
                 self.suite_srv_files_mgr.get_auth_item(
@@ -141,7 +141,7 @@ class RemoteJobHostManager(object):
             GLOBAL_CFG.get_derived_host_item(reg, 'suite run directory'),
             'python')
         if os.path.isdir(suite_run_py):
-            cmds.append(shlex.split(scp_tmpl) + [
+            cmds.append(scp_cmd + [
                 '-pr',
                 suite_run_py, user_at_host + ':' + r_suite_run_dir + '/'])
         # Run commands in sequence.
@@ -170,14 +170,14 @@ class RemoteJobHostManager(object):
             user_at_host = host
             if owner:
                 user_at_host = owner + '@' + host
-            ssh_tmpl = GLOBAL_CFG.get_host_item(
+            ssh_cmd = SSHMultiplexer.get_inst().get_ssh_cmd(
                 'remote shell template', host, owner)
             r_suite_contact_file = os.path.join(
                 GLOBAL_CFG.get_derived_host_item(
                     reg, 'suite run directory', host, owner),
                 SuiteSrvFilesManager.DIR_BASE_SRV,
                 SuiteSrvFilesManager.FILE_BASE_CONTACT)
-            cmd = shlex.split(ssh_tmpl) + [
+            cmd = ssh_cmd + [
                 '-n', user_at_host, 'rm', '-f', r_suite_contact_file]
             procs[user_at_host] = (cmd, Popen(cmd, stdout=PIPE, stderr=PIPE))
         # Wait for commands to complete for a max of 10 seconds
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2017 NIWA
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Wake up the suite daemon main loop when there is work for it to do.
+
+The main loop blocks in MainLoopWaker.wait() between iterations. Producers of
+work for the main loop (task messages, suite commands, external triggers and
+process pool results) call MainLoopWaker.wake(), usually from another thread,
+to end the wait early.
+
+This is implemented as a self-pipe, so the main loop is genuinely blocked in
+select() rather than polling a flag.
+"""
+
+import errno
+import fcntl
+import os
+import select
+import unittest
+
+
+class MainLoopWaker(object):
+    """Self-pipe to wake up the main loop from other threads."""
+
+    _INSTANCE = None
+
+    @classmethod
+    def get_inst(cls):
+        """Return a singleton instance."""
+        if cls._INSTANCE is None:
+            cls._INSTANCE = cls()
+        return cls._INSTANCE
+
+    def __init__(self):
+        self.read_fd, self.write_fd = os.pipe()
+        for fd in self.read_fd, self.write_fd:
+            fcntl.fcntl(
+                fd, fcntl.F_SETFL, fcntl.fcntl(fd, fcntl.F_GETFL) |
+                os.O_NONBLOCK)
+
+    def close(self):
+        """Close the pipe."""
+        for fd in self.read_fd, self.write_fd:
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self.read_fd = None
+        self.write_fd = None
+
+    def wake(self):
+        """Wake up the main loop, if it is waiting.
+
+        Safe to call from any thread. If the main loop is not waiting, the
+        next call to "wait" will return immediately.
+        """
+        write_fd = self.write_fd
+        if write_fd is None:
+            # Closed, suite is shutting down.
+            return
+        try:
+            os.write(write_fd, "\0")
+        except OSError as exc:
+            # EAGAIN: the pipe is full, so a wake up is already pending.
+            if exc.errno not in [errno.EAGAIN, errno.EBADF]:
+                raise
+
+    def wait(self, timeout):
+        """Wait for up to "timeout" seconds or until woken up.
+
+        Return True if woken up, False on timeout.
+        """
+        if timeout < 0:
+            timeout = 0
+        try:
+            ready = select.select([self.read_fd], [], [], timeout)[0]
+        except select.error as exc:
+            if exc.args[0] == errno.EINTR:
+                return False
+            raise
+        if not ready:
+            return False
+        # Drain the pipe: many wake ups are served by one main loop iteration.
+        while True:
+            try:
+                if not os.read(self.read_fd, 4096):
+                    break
+            except OSError as exc:
+                if exc.errno == errno.EAGAIN:
+                    break
+                raise
+        return True
+
+
+class TestMainLoopWaker(unittest.TestCase):
+    """Unit tests for MainLoopWaker."""
+
+    def setUp(self):
+        self.waker = MainLoopWaker()
+
+    def tearDown(self):
+        self.waker.close()
+
+    def test_wait_timeout(self):
+        """Test wait returns False on timeout if not woken up."""
+        self.assertFalse(self.waker.wait(0.01))
+
+    def test_wake_before_wait(self):
+        """Test wait returns immediately if woken up earlier."""
+        self.waker.wake()
+        self.assertTrue(self.waker.wait(10.0))
+        # All pending wake ups are served by a single wait.
+        self.assertFalse(self.waker.wait(0))
+
+    def test_wake_many(self):
+        """Test that many wake ups do not block or overflow."""
+        for _ in range(100000):
+            self.waker.wake()
+        self.assertTrue(self.waker.wait(10.0))
+        self.assertFalse(self.waker.wait(0))
+
+    def test_wake_from_thread(self):
+        """Test waking up from another thread."""
+        import threading
+        thread = threading.Timer(0.1, self.waker.wake)
+        thread.start()
+        self.assertTrue(self.waker.wait(10.0))
+        thread.join()
+
+    def test_wake_after_close(self):
+        """Test wake after close is harmless."""
+        self.waker.close()
+        self.waker.wake()
+
+
+if __name__ == '__main__':
+    unittest.main()
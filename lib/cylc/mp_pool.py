@@ -32,6 +32,7 @@ Some notes:
 import fileinput
 import logging
 import multiprocessing
+import os
 from pipes import quote
 from subprocess import Popen, PIPE
 import sys
@@ -42,6 +43,7 @@ import traceback
 from cylc.batch_sys_manager import BATCH_SYS_MANAGER
 from cylc.cfgspec.globalcfg import GLOBAL_CFG
 import cylc.flags
+from cylc.main_loop_waker import MainLoopWaker
 from cylc.suite_logging import LOG, OUT
 from cylc.wallclock import get_current_time_string
 
@@ -63,6 +65,9 @@ def _run_command(ctx):
         ctx.timestamp = get_current_time_string()
         return ctx
 
+    if ctx.cmd_kwargs.get('in_process'):
+        return _run_job_cmd_in_process(ctx)
+
     try:
         stdin_file = None
         if ctx.cmd_kwargs.get('stdin_file_paths'):
@@ -96,6 +101,57 @@ def _run_command(ctx):
     return ctx
 
 
+def _run_job_cmd_in_process(ctx):
+    """Run a "cylc jobs-submit|jobs-poll|jobs-kill" command without exec.
+
+    For jobs on the suite host, fork this (already initialised) worker
+    process, and call the BATCH_SYS_MANAGER method directly in the child.
+    This avoids the cost of starting and initialising a new Python process
+    for each command. The STDOUT, STDERR and return code are captured as for
+    the command. (The child process exits, as the command would, so jobs
+    started by it are not left behind as children of the worker.)
+
+    """
+    method = getattr(BATCH_SYS_MANAGER, ctx.cmd_key.replace('-', '_'))
+    out_file = TemporaryFile()
+    err_file = TemporaryFile()
+    pid = os.fork()
+    if pid == 0:
+        ret_code = 1
+        try:
+            os.dup2(out_file.fileno(), sys.stdout.fileno())
+            os.dup2(err_file.fileno(), sys.stderr.fileno())
+            method(
+                ctx.cmd_kwargs['job_log_root'], ctx.cmd_kwargs['job_log_dirs'])
+            ret_code = 0
+        except SystemExit as exc:
+            if exc.code is None or isinstance(exc.code, int):
+                ret_code = exc.code or 0
+            else:
+                sys.stderr.write('%s\n' % exc.code)
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(ret_code)
+    status = os.waitpid(pid, 0)[1]
+    if os.WIFEXITED(status):
+        ctx.ret_code = os.WEXITSTATUS(status)
+    else:
+        ctx.ret_code = -os.WTERMSIG(status)
+    out_file.seek(0)
+    err_file.seek(0)
+    ctx.out = out_file.read()
+    ctx.err = err_file.read()
+    out_file.close()
+    err_file.close()
+    ctx.timestamp = get_current_time_string()
+    return ctx
+
+
 class SuiteProcContext(object):
     """Represent the context of a command to run."""
 
@@ -214,9 +270,14 @@ class SuiteProcPool(object):
         self.pool.join()
 
     def put_command(self, ctx, callback):
-        """Queue a new shell command to execute."""
+        """Queue a new shell command to execute.
+
+        The suite daemon main loop is woken up when the command completes, so
+        that "handle_results_async" can pass the result to "callback".
+        """
         try:
-            result = self.pool.apply_async(_run_command, [ctx])
+            result = self.pool.apply_async(
+                _run_command, [ctx], callback=self._wake_main_loop)
         except AssertionError as exc:
             self.log.warning("%s\n  %s\n %s" % (
                 str(exc),
@@ -225,6 +286,11 @@ class SuiteProcPool(object):
         else:
             self.results[id(result)] = (result, callback)
 
+    @staticmethod
+    def _wake_main_loop(_):
+        """Wake up the main loop. Called in the pool result handler thread."""
+        MainLoopWaker.get_inst().wake()
+
     @staticmethod
     def run_command(ctx):
         """Execute a shell command and capture its output and exit status."""
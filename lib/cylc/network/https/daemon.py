@@ -35,6 +35,13 @@ from cylc.suite_logging import ERR
 class CommsDaemon(object):
     """Wrap HTTPS daemon for a suite."""
 
+    # Number of server threads. Requests that block, e.g. "wait_task_state"
+    # of the state summary server, hold a thread each for their duration.
+    THREAD_POOL_SIZE = 30
+    # Number of server threads kept free of blocking requests, for other
+    # clients, e.g. task messages, commands and GUIs.
+    THREAD_POOL_MIN_FREE = 10
+
     def __init__(self, suite):
         # Suite only needed for back-compat with old clients (see below):
         self.suite = suite
@@ -103,6 +110,7 @@ class CommsDaemon(object):
         # cherrypy.config["tools.encode.encoding"] = "utf-8"
         cherrypy.config["server.socket_host"] = '0.0.0.0'
         cherrypy.config["engine.autoreload.on"] = False
+        cherrypy.config["server.thread_pool"] = self.THREAD_POOL_SIZE
         try:
             from OpenSSL import SSL, crypto
             cherrypy.config['server.ssl_module'] = 'pyopenSSL'
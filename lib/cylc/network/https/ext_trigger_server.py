@@ -20,6 +20,7 @@ import cherrypy
 
 from Queue import Queue, Empty
 import cylc.flags
+from cylc.main_loop_waker import MainLoopWaker
 from cylc.network.https.base_server import BaseCommsServer
 from cylc.network.https.suite_broadcast_server import BroadcastServer
 from cylc.network import check_access_priv
@@ -50,18 +51,22 @@ class ExtTriggerServer(BaseCommsServer):
         check_access_priv(self, 'full-control')
         self.report("ext_trigger")
         self.queue.put((event_message, event_id))
+        MainLoopWaker.get_inst().wake()
         return (True, 'event queued')
 
     def retrieve(self, itask):
-        """Match external triggers for a waiting task proxy."""
+        """Match external triggers for a waiting task proxy.
+
+        Return True if any external trigger of the task proxy is matched.
+        """
 
         # Note this has to allow multiple same-message triggers to be queued
         # and only used one at a time.
 
         if self.queue.empty():
-            return
+            return False
         if len(itask.state.external_triggers) == 0:
-            return
+            return False
         bcast = BroadcastServer.get_inst()
         queued = []
         while True:
@@ -97,3 +102,4 @@ class ExtTriggerServer(BaseCommsServer):
         for q in queued:
             if q not in used:
                 self.queue.put(q)
+        return bool(used)
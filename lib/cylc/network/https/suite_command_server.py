@@ -22,6 +22,7 @@ import os
 from Queue import Queue
 
 import cylc.flags
+from cylc.main_loop_waker import MainLoopWaker
 from cylc.network.https.base_server import BaseCommsServer
 from cylc.network import check_access_priv
 
@@ -201,6 +202,7 @@ class SuiteCommandServer(BaseCommsServer):
             check_access_priv(self, 'full-control')
         self.report(command)
         self.queue.put((command, command_args, command_kwargs))
+        MainLoopWaker.get_inst().wake()
         return (True, 'Command queued')
 
     def get_queue(self):
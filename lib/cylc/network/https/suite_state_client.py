@@ -19,7 +19,7 @@
 import re
 
 from cylc.task_id import TaskID
-from cylc.network import COMMS_STATE_OBJ_NAME
+from cylc.network import COMMS_STATE_OBJ_NAME, ConnectionError
 from cylc.network.https.base_client import BaseCommsClient
 from cylc.network.https.util import unicode_encode
 from cylc.task_state import (
@@ -84,10 +84,74 @@ class StateSummaryClient(BaseCommsClient):
 
     METHOD = BaseCommsClient.METHOD_GET
 
+    def __init__(self, *args, **kwargs):
+        super(StateSummaryClient, self).__init__(*args, **kwargs)
+        # Cache for "get_suite_state_summary_incremental".
+        self.version = None
+        self.task_summary = {}
+        self.family_summary = {}
+        # True if the suite daemon has no "get_state_summary_delta", i.e. it
+        # runs an older version of cylc. Fetch full summaries instead.
+        self.is_delta_unsupported = False
+
     def get_suite_state_summary(self):
         return unicode_encode(
             self.call_server_func(COMMS_STATE_OBJ_NAME, "get_state_summary"))
 
+    def get_suite_state_summary_delta(self, version=None):
+        """Return summaries changed since version (all if version is None).
+        """
+        if version is None:
+            return unicode_encode(self.call_server_func(
+                COMMS_STATE_OBJ_NAME, "get_state_summary_delta"))
+        return unicode_encode(self.call_server_func(
+            COMMS_STATE_OBJ_NAME, "get_state_summary_delta", version=version))
+
+    def get_suite_state_summary_incremental(self):
+        """Return the global, task, and family summary data structures.
+
+        Like "get_suite_state_summary", but only fetch the task and family
+        summaries changed since the previous call. If the first call fails,
+        and a full summary can be fetched, assume that the suite daemon does
+        not support deltas, and fetch full summaries until reset.
+
+        """
+        if self.is_delta_unsupported:
+            return self.get_suite_state_summary()
+        try:
+            delta = self.get_suite_state_summary_delta(self.version)
+        except ConnectionError:
+            if self.version is not None:
+                raise
+            result = self.get_suite_state_summary()
+            self.is_delta_unsupported = True
+            return result
+        if delta["full"]:
+            self.task_summary = delta["tasks"]
+            self.family_summary = delta["families"]
+        else:
+            self.task_summary.update(delta["tasks"])
+            self.family_summary.update(delta["families"])
+            for task_id in delta["removed tasks"]:
+                self.task_summary.pop(task_id, None)
+            for family_id in delta["removed families"]:
+                self.family_summary.pop(family_id, None)
+        self.version = delta["version"]
+        return (
+            delta["global"], dict(self.task_summary),
+            dict(self.family_summary))
+
+    def reset(self, *args, **kwargs):
+        """Forget cached summaries, e.g. on reconnecting to the suite.
+
+        The suite daemon may have been restarted with another version of
+        cylc, so try deltas again.
+        """
+        self.version = None
+        self.task_summary = {}
+        self.family_summary = {}
+        self.is_delta_unsupported = False
+
     def get_suite_state_summary_update_time(self):
         return self.call_server_func(COMMS_STATE_OBJ_NAME,
                                      "get_summary_update_time")
@@ -96,6 +160,19 @@ class StateSummaryClient(BaseCommsClient):
         return self.call_server_func(COMMS_STATE_OBJ_NAME,
                                      "get_tasks_by_state")
 
+    def wait_task_state(self, task_id, statuses, timeout):
+        """Wait until task_id is in one of statuses, for up to timeout.
+
+        Return True if the task is in one of the statuses, False if it is not
+        on timeout, or None if the suite does not know the state of the task,
+        in which case the suite database should be checked. (The suite waits
+        for no longer than its own maximum.)
+
+        """
+        return self.call_server_func(
+            COMMS_STATE_OBJ_NAME, "wait_task_state", task_id=task_id,
+            statuses=list(statuses), timeout=timeout)
+
 
 def extract_group_state(child_states, is_stopped=False):
     """Summarise child states as a group."""
@@ -16,28 +16,59 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from collections import deque
+from threading import Condition, Lock
 import time
+import unittest
+from uuid import uuid4
 
 import cylc.flags
 from cylc.task_id import TaskID
 from cylc.wallclock import TIME_ZONE_LOCAL_INFO, TIME_ZONE_UTC_INFO
 from cylc.config import SuiteConfig
 from cylc.network.https.base_server import BaseCommsServer
+from cylc.network.https.daemon import CommsDaemon
 from cylc.network.https.suite_state_client import (
     get_suite_status_string, SuiteStillInitialisingError,
-    extract_group_state
+    extract_group_state, StateSummaryClient
 )
-from cylc.network import check_access_priv
+from cylc.network import check_access_priv, ConnectionError
 from cylc.task_state import TASK_STATUS_RUNAHEAD
 
 import cherrypy
 
 
 class StateSummaryServer(BaseCommsServer):
-    """Server-side suite state summary interface."""
+    """Server-side suite state summary interface.
+
+    The summaries are updated incrementally. Each update is given only the
+    task proxies whose summaries may have changed (the task pool tracks
+    these), and the IDs of those removed. Only the summaries of these are
+    copied, and only the family summaries and state counts of their cycle
+    points are recomputed.
+
+    Each update has a version. Clients can call "get_state_summary_delta"
+    with the version they last saw, to get only the task and family
+    summaries changed (or removed) since then.
+
+    Clients can call "wait_task_state" to block until a task reaches one of
+    a set of states, e.g. for inter-suite dependencies, instead of polling
+    the suite database. Each waiting client holds a server thread, so the
+    number of clients waiting at a time is capped by the size of the server
+    thread pool, less the threads kept free for other clients. Clients over
+    the cap are told to check the suite database instead.
+
+    """
 
     _INSTANCE = None
     TIME_FIELDS = ['submitted_time', 'started_time', 'finished_time']
+    # Number of updates to keep changes for, for "get_state_summary_delta".
+    MAX_DELTAS = 100
+    # Maximum number of clients waiting in "wait_task_state" at a time.
+    MAX_TASK_STATE_WAITERS = (
+        CommsDaemon.THREAD_POOL_SIZE - CommsDaemon.THREAD_POOL_MIN_FREE)
+    # Maximum wait in "wait_task_state", in seconds.
+    MAX_TASK_STATE_WAIT = 60.0
 
     @classmethod
     def get_inst(cls, run_mode=None):
@@ -58,49 +89,137 @@ class StateSummaryServer(BaseCommsServer):
         self.state_count_totals = {}
         self.state_count_cycles = {}
 
-    def update(self, tasks, tasks_rh, min_point, max_point, max_point_rh,
-               paused, will_pause_at, stopping, will_stop_at, ns_defn_order,
-               reloading):
-        global_summary = {}
-        family_summary = {}
-
-        task_summary, task_states = self._get_tasks_info(tasks, tasks_rh)
-
-        fam_states = {}
-        all_states = []
-        config = SuiteConfig.get_inst()
+        # Serialise update and access from other threads.
+        self.lock = Lock()
+        # {point_string: {name: state, ...}, ...}
+        self._point_task_states = {}
+        # {point_string: set([family_id, ...]), ...}
+        self._point_family_ids = {}
+        self._config = None
+        # Version: unique for this suite run, and the update number.
+        self._uuid = str(uuid4())
+        self._version_num = 0
+        # Task and family IDs changed in the most recent updates:
+        # (version_num, task_ids, family_ids)
+        self._deltas = deque(maxlen=self.MAX_DELTAS)
+        # Notified on each update, and on release of waiters on shutdown.
+        self.update_cond = Condition(self.lock)
+        self._n_task_state_waiters = 0
+        self._is_releasing_waiters = False
+
+    def update(self, tasks, tasks_rh, removed_task_ids, min_point,
+               max_point, max_point_rh, paused, will_pause_at, stopping,
+               will_stop_at, ns_defn_order, reloading):
+        """Update the summaries from changed task proxies in the task pool.
+
+        tasks and tasks_rh are the task proxies in the task pool and in the
+        runahead pool whose summaries may have changed since the last update.
+        removed_task_ids are the IDs of task proxies removed since then.
+
+        """
+        with self.lock:
+            task_ids, dirty_points = self._update_tasks(
+                tasks, tasks_rh, removed_task_ids)
+            config = SuiteConfig.get_inst()
+            if config is not self._config:
+                # New or reloaded suite, recompute all families.
+                self._config = config
+                dirty_points.update(self._point_family_ids)
+                dirty_points.update(self._point_task_states)
+            family_ids = self._update_families(config, dirty_points)
+            self._update_global_summary(
+                min_point, max_point, max_point_rh, paused, will_pause_at,
+                stopping, will_stop_at, ns_defn_order, reloading)
+            self._version_num += 1
+            self._deltas.append((self._version_num, task_ids, family_ids))
+            self._summary_update_time = time.time()
+            self.first_update_completed = True
+            self.update_cond.notify_all()
+
+    def _update_tasks(self, tasks, tasks_rh, removed_task_ids):
+        """Update the summaries of changed, new and removed task proxies.
+
+        Return (IDs of the tasks changed, points with changed task states).
+
+        """
+        task_ids = set()
+        dirty_points = set()
+        for itasks, is_runahead in [(tasks, False), (tasks_rh, True)]:
+            for itask in itasks:
+                summary = itask.get_state_summary()
+                if is_runahead:
+                    summary['state'] = TASK_STATUS_RUNAHEAD
+                old_summary = self.task_summary.get(itask.identity)
+                if summary == old_summary:
+                    continue
+                # Keep a copy, the task proxy changes its summary in place.
+                self.task_summary[itask.identity] = self._copy_summary(
+                    summary)
+                task_ids.add(itask.identity)
+                if (old_summary is not None and
+                        old_summary['state'] == summary['state']):
+                    continue
+                name, point_string = TaskID.split(itask.identity)
+                self._point_task_states.setdefault(point_string, {})
+                self._point_task_states[point_string][name] = summary['state']
+                dirty_points.add(point_string)
+        for task_id in removed_task_ids:
+            if task_id not in self.task_summary:
+                continue
+            del self.task_summary[task_id]
+            task_ids.add(task_id)
+            name, point_string = TaskID.split(task_id)
+            task_states = self._point_task_states[point_string]
+            del task_states[name]
+            if not task_states:
+                del self._point_task_states[point_string]
+            dirty_points.add(point_string)
+        return task_ids, dirty_points
+
+    @staticmethod
+    def _copy_summary(summary):
+        """Return a copy of a task summary, including its containers."""
+        summary = dict(summary)
+        for key, value in summary.items():
+            if isinstance(value, (dict, list)):
+                summary[key] = type(value)(value)
+        return summary
+
+    def _update_families(self, config, dirty_points):
+        """Recompute family summaries and state counts at dirty points.
+
+        Return IDs of the families changed.
+
+        """
+        family_ids = set()
         ancestors_dict = config.get_first_parent_ancestors()
-
-        # Compute state_counts (total, and per cycle).
-        state_count_totals = {}
-        state_count_cycles = {}
-
-        for point_string, c_task_states in task_states:
-            # For each cycle point, construct a family state tree
+        # Replace, rather than modify, for access from other threads.
+        state_count_cycles = dict(self.state_count_cycles)
+        for point_string in dirty_points:
+            # For the cycle point, construct a family state tree
             # based on the first-parent single-inheritance tree
-
+            c_task_states = self._point_task_states.get(point_string, {})
             c_fam_task_states = {}
-
             count = {}
-
-            for key in c_task_states:
-                state = c_task_states[key]
+            for key, state in c_task_states.items():
                 if state is None:
                     continue
                 try:
                     count[state] += 1
                 except KeyError:
                     count[state] = 1
-
-                all_states.append(state)
                 for parent in ancestors_dict.get(key, []):
                     if parent == key:
                         continue
                     c_fam_task_states.setdefault(parent, set([]))
                     c_fam_task_states[parent].add(state)
+            if c_task_states:
+                state_count_cycles[point_string] = count
+            else:
+                state_count_cycles.pop(point_string, None)
 
-            state_count_cycles[point_string] = count
-
+            old_ids = self._point_family_ids.pop(point_string, set())
+            new_ids = set()
             for fam, child_states in c_fam_task_states.items():
                 f_id = TaskID.get(fam, point_string)
                 state = extract_group_state(child_states)
@@ -112,19 +231,36 @@ class StateSummaryServer(BaseCommsServer):
                     famcfg = {}
                 description = famcfg.get('description')
                 title = famcfg.get('title')
-                family_summary[f_id] = {'name': fam,
-                                        'description': description,
-                                        'title': title,
-                                        'label': point_string,
-                                        'state': state}
+                summary = {'name': fam,
+                           'description': description,
+                           'title': title,
+                           'label': point_string,
+                           'state': state}
+                new_ids.add(f_id)
+                if self.family_summary.get(f_id) != summary:
+                    self.family_summary[f_id] = summary
+                    family_ids.add(f_id)
+            if new_ids:
+                self._point_family_ids[point_string] = new_ids
+            for f_id in old_ids - new_ids:
+                del self.family_summary[f_id]
+                family_ids.add(f_id)
+        self.state_count_cycles = state_count_cycles
+        return family_ids
 
+    def _update_global_summary(
+            self, min_point, max_point, max_point_rh, paused, will_pause_at,
+            stopping, will_stop_at, ns_defn_order, reloading):
+        """Replace the global summary and state count totals."""
+        global_summary = {}
         state_count_totals = {}
-        for point_string, count in state_count_cycles.items():
+        for count in self.state_count_cycles.values():
             for state, state_count in count.items():
                 state_count_totals.setdefault(state, 0)
                 state_count_totals[state] += state_count
-
-        all_states.sort()
+        all_states = []
+        for state in sorted(state_count_totals):
+            all_states += [state] * state_count_totals[state]
 
         global_summary['oldest cycle point string'] = (
             self.str_or_None(min_point))
@@ -147,38 +283,9 @@ class StateSummaryServer(BaseCommsServer):
         global_summary['status_string'] = get_suite_status_string(
             paused, stopping, will_pause_at, will_stop_at)
 
-        self._summary_update_time = time.time()
-
         # Replace the originals (atomic update, for access from other threads).
-        self.task_summary = task_summary
         self.global_summary = global_summary
-        self.family_summary = family_summary
-        self.first_update_completed = True
         self.state_count_totals = state_count_totals
-        self.state_count_cycles = state_count_cycles
-
-    def _get_tasks_info(self, tasks, tasks_rh):
-        """Retrieve task summary info and states."""
-
-        task_summary = {}
-        task_states = {}
-
-        for task in tasks:
-            ts = task.get_state_summary()
-            task_summary[task.identity] = ts
-            name, point_string = TaskID.split(task.identity)
-            task_states.setdefault(point_string, {})
-            task_states[point_string][name] = ts['state']
-
-        for task in tasks_rh:
-            ts = task.get_state_summary()
-            ts['state'] = TASK_STATUS_RUNAHEAD
-            task_summary[task.identity] = ts
-            name, point_string = TaskID.split(task.identity)
-            task_states.setdefault(point_string, {})
-            task_states[point_string][name] = TASK_STATUS_RUNAHEAD
-
-        return task_summary, task_states.items()
 
     def str_or_None(self, s):
         if s:
@@ -190,6 +297,121 @@ class StateSummaryServer(BaseCommsServer):
         # (Access to this is controlled via the suite_identity server.)
         return (self.state_count_totals, self.state_count_cycles)
 
+    def get_version(self):
+        """Return the version of the current summaries."""
+        return "%s-%d" % (self._uuid, self._version_num)
+
+    def get_delta(self, version=None):
+        """Return summaries changed since "version".
+
+        Return a dict with:
+            "version": the version of the current summaries.
+            "full": False if the task and family summaries only contain
+                    entries changed since "version", True if they contain
+                    all entries (if "version" is None or no longer known).
+            "global": the global summary.
+            "tasks", "families": {id: summary, ...}
+            "removed tasks", "removed families": [id, ...]
+
+        """
+        with self.lock:
+            task_ids, family_ids = self._get_delta_ids(version)
+            if task_ids is None:
+                result = {
+                    "full": True,
+                    "tasks": dict(self.task_summary),
+                    "families": dict(self.family_summary),
+                    "removed tasks": [],
+                    "removed families": []}
+            else:
+                result = {
+                    "full": False, "tasks": {}, "families": {},
+                    "removed tasks": [], "removed families": []}
+                for ids, summaries, key, removed_key in [
+                        (task_ids, self.task_summary, "tasks",
+                         "removed tasks"),
+                        (family_ids, self.family_summary, "families",
+                         "removed families")]:
+                    for id_ in ids:
+                        try:
+                            result[key][id_] = summaries[id_]
+                        except KeyError:
+                            result[removed_key].append(id_)
+            result["version"] = self.get_version()
+            result["global"] = self.global_summary
+            return result
+
+    def _get_delta_ids(self, version):
+        """Return (task IDs, family IDs) changed since version.
+
+        Return (None, None) if version is None or no longer known.
+
+        """
+        try:
+            uuid, version_num = version.rsplit("-", 1)
+            version_num = int(version_num)
+        except (AttributeError, ValueError):
+            return None, None
+        if (uuid != self._uuid or version_num > self._version_num or
+                not self._deltas or version_num < self._deltas[0][0] - 1):
+            return None, None
+        task_ids = set()
+        family_ids = set()
+        for delta_version_num, delta_task_ids, delta_family_ids in (
+                self._deltas):
+            if delta_version_num > version_num:
+                task_ids.update(delta_task_ids)
+                family_ids.update(delta_family_ids)
+        return task_ids, family_ids
+
+    def wait_for_task_state(self, task_id, statuses, timeout):
+        """Wait until task_id is in one of statuses, for up to timeout.
+
+        Return True if the task is in one of the statuses, or False if the
+        task is in the task pool but not in one of the statuses on timeout.
+        Return None if the state of the task is not known, i.e. the task is
+        not in the task pool (or leaves it), on release of waiters, or if
+        MAX_TASK_STATE_WAITERS clients are already waiting. The client
+        should then check the suite database.
+
+        """
+        timeout = min(float(timeout), self.MAX_TASK_STATE_WAIT)
+        with self.lock:
+            summary = self.task_summary.get(task_id)
+            if summary is not None and summary['state'] in statuses:
+                return True
+            if (self._is_releasing_waiters or
+                    self._n_task_state_waiters >=
+                    self.MAX_TASK_STATE_WAITERS):
+                return None
+            self._n_task_state_waiters += 1
+            try:
+                is_seen = summary is not None
+                end_time = time.time() + timeout
+                now = time.time()
+                while now < end_time and not self._is_releasing_waiters:
+                    self.update_cond.wait(end_time - now)
+                    summary = self.task_summary.get(task_id)
+                    if summary is None:
+                        if is_seen:
+                            return None
+                    elif summary['state'] in statuses:
+                        return True
+                    else:
+                        is_seen = True
+                    now = time.time()
+                if summary is None or self._is_releasing_waiters:
+                    return None
+                return False
+            finally:
+                self._n_task_state_waiters -= 1
+
+    def release_waiters(self):
+        """Release waiting clients, e.g. on shutdown."""
+        with self.lock:
+            self._is_releasing_waiters = True
+            self.update_cond.notify_all()
+
     @cherrypy.expose
     @cherrypy.tools.json_out()
     def get_state_summary(self):
@@ -198,7 +420,37 @@ class StateSummaryServer(BaseCommsServer):
         self.report('get_state_summary')
         if not self.first_update_completed:
             raise SuiteStillInitialisingError()
-        return (self.global_summary, self.task_summary, self.family_summary)
+        with self.lock:
+            return (self.global_summary, dict(self.task_summary),
+                    dict(self.family_summary))
+
+    @cherrypy.expose
+    @cherrypy.tools.json_out()
+    def get_state_summary_delta(self, version=None):
+        """Return the summaries changed since "version".
+
+        See "get_delta" for the data structure returned.
+
+        """
+        check_access_priv(self, 'full-read')
+        self.report('get_state_summary_delta')
+        if not self.first_update_completed:
+            raise SuiteStillInitialisingError()
+        return self.get_delta(version)
+
+    @cherrypy.expose
+    @cherrypy.tools.json_out()
+    def wait_task_state(self, task_id, statuses, timeout):
+        """Wait until task_id is in one of statuses, for up to timeout.
+
+        See "wait_for_task_state" for the return value.
+
+        """
+        check_access_priv(self, 'full-read')
+        self.report('wait_task_state')
+        if isinstance(statuses, basestring):
+            statuses = [statuses]
+        return self.wait_for_task_state(task_id, statuses, timeout)
 
     @cherrypy.expose
     @cherrypy.tools.json_out()
@@ -219,15 +471,17 @@ class StateSummaryServer(BaseCommsServer):
 
         # Get tasks.
         ret = {}
-        for task in self.task_summary:
-            state = self.task_summary[task]['state']
+        with self.lock:
+            task_summary = dict(self.task_summary)
+        for task in task_summary:
+            state = task_summary[task]['state']
             if state not in ret:
                 ret[state] = []
             times = [0]
             for time_field in self.TIME_FIELDS:
-                if (time_field in self.task_summary[task] and
-                        self.task_summary[task][time_field]):
-                    times.append(self.task_summary[task][time_field])
+                if (time_field in task_summary[task] and
+                        task_summary[task][time_field]):
+                    times.append(task_summary[task][time_field])
             task_name, point_string = task.rsplit('.', 1)
             ret[state].append((max(times), task_name, point_string,))
 
@@ -241,3 +495,330 @@ class StateSummaryServer(BaseCommsServer):
                     (None, len(ret[state]) - 5, None,)]
 
         return ret
+
+
+class TestStateSummaryServer(unittest.TestCase):
+    """Unit tests for incremental update of StateSummaryServer."""
+
+    class _FakeSuiteConfig(object):
+        """Minimal stand-in for SuiteConfig."""
+
+        def __init__(self):
+            self.cfg = {'runtime': {'FAM': {'title': 'fam'}}}
+
+        @staticmethod
+        def get_first_parent_ancestors():
+            return {
+                'foo': ['foo', 'FAM', 'root'],
+                'bar': ['bar', 'FAM', 'root'],
+                'baz': ['baz', 'root']}
+
+    class _FakeTaskProxy(object):
+        """Minimal stand-in for TaskProxy."""
+
+        def __init__(self, identity, state):
+            self.identity = identity
+            self.summary = {'name': identity, 'state': state, 'logfiles': []}
+
+        def get_state_summary(self):
+            return dict(self.summary)
+
+    def setUp(self):
+        self.config_inst = SuiteConfig._INSTANCES.get(None)
+        SuiteConfig._INSTANCES[None] = self._FakeSuiteConfig()
+        self.server = StateSummaryServer('live')
+        self.tasks = {}
+        self.removed_ids = []
+        for identity, state in [
+                ('foo.1', 'waiting'), ('bar.1', 'running'),
+                ('baz.1', 'waiting'), ('foo.2', 'waiting')]:
+            self.tasks[identity] = self._FakeTaskProxy(identity, state)
+
+    def tearDown(self):
+        if self.config_inst is None:
+            SuiteConfig._INSTANCES.pop(None, None)
+        else:
+            SuiteConfig._INSTANCES[None] = self.config_inst
+
+    def _update(self, tasks_rh=None, tasks=None):
+        """Update server, with all tasks changed by default."""
+        if tasks is None:
+            tasks = self.tasks.values()
+        self.server.update(
+            tasks, tasks_rh or [], self.removed_ids, '1', '2', '2', False,
+            None, False, None, [], False)
+        self.removed_ids = []
+
+    def _remove(self, task_id):
+        """Remove a task."""
+        del self.tasks[task_id]
+        self.removed_ids.append(task_id)
+
+    def test_update(self):
+        """Test summaries and state counts after updates."""
+        self._update()
+        self.assertEqual(sorted(self.tasks), sorted(self.server.task_summary))
+        self.assertEqual(
+            'running', self.server.family_summary['FAM.1']['state'])
+        self.assertEqual('fam', self.server.family_summary['FAM.1']['title'])
+        self.assertEqual(
+            'waiting', self.server.family_summary['root.2']['state'])
+        self.assertEqual(
+            {'waiting': 3, 'running': 1}, self.server.state_count_totals)
+        self.assertEqual(
+            ['running', 'waiting', 'waiting', 'waiting'],
+            self.server.global_summary['states'])
+        # Change a nested value, then remove tasks from a point.
+        self.tasks['bar.1'].summary['logfiles'].append('job.out')
+        self.tasks['bar.1'].summary['state'] = 'succeeded'
+        self._remove('foo.2')
+        self._update()
+        self.assertEqual(
+            ['job.out'], self.server.task_summary['bar.1']['logfiles'])
+        self.assertEqual(
+            'waiting', self.server.family_summary['FAM.1']['state'])
+        self.assertNotIn('foo.2', self.server.task_summary)
+        self.assertNotIn('FAM.2', self.server.family_summary)
+        self.assertNotIn('2', self.server.state_count_cycles)
+        self.assertEqual(
+            {'waiting': 2, 'succeeded': 1}, self.server.state_count_totals)
+
+    def test_update_changed_only(self):
+        """Test only the given changed and removed tasks are updated."""
+        self._update()
+        version = self.server.get_delta()['version']
+        self.tasks['foo.1'].summary['state'] = 'submitted'
+        self.tasks['baz.1'].summary['state'] = 'submitted'
+        self._remove('foo.2')
+        self._update(tasks=[self.tasks['foo.1']])
+        self.assertEqual(
+            'submitted', self.server.task_summary['foo.1']['state'])
+        self.assertEqual(
+            'waiting', self.server.task_summary['baz.1']['state'])
+        self.assertNotIn('foo.2', self.server.task_summary)
+        result = self.server.get_delta(version)
+        self.assertEqual(['foo.1'], result['tasks'].keys())
+        self.assertEqual(['foo.2'], result['removed tasks'])
+        # Removal of unknown tasks is ignored.
+        self.removed_ids.append('qux.1')
+        self._update(tasks=[])
+        self.assertEqual(
+            {'waiting': 1, 'running': 1, 'submitted': 1},
+            self.server.state_count_totals)
+
+    def test_update_runahead(self):
+        """Test runahead tasks are summarised as runahead."""
+        itask = self._FakeTaskProxy('foo.3', 'waiting')
+        self._update([itask])
+        self.assertEqual(
+            'runahead', self.server.task_summary['foo.3']['state'])
+        self.assertEqual(
+            {'runahead': 1}, self.server.state_count_cycles['3'])
+
+    def test_get_delta(self):
+        """Test deltas contain only changed and removed entries."""
+        self._update()
+        result = self.server.get_delta()
+        self.assertTrue(result['full'])
+        self.assertEqual(sorted(self.tasks), sorted(result['tasks']))
+        version = result['version']
+        # No change.
+        self._update()
+        result = self.server.get_delta(version)
+        self.assertFalse(result['full'])
+        self.assertEqual({}, result['tasks'])
+        self.assertEqual({}, result['families'])
+        self.assertNotEqual(version, result['version'])
+        # Changes over several updates are merged.
+        self.tasks['foo.1'].summary['state'] = 'submitted'
+        self._update()
+        self._remove('foo.2')
+        self._update()
+        result = self.server.get_delta(version)
+        self.assertFalse(result['full'])
+        self.assertEqual(['foo.1'], result['tasks'].keys())
+        self.assertEqual(['foo.2'], result['removed tasks'])
+        self.assertEqual(
+            ['FAM.2', 'root.2'], sorted(result['removed families']))
+        # Family states at point 1 are still "running".
+        self.assertEqual({}, result['families'])
+        # Current version.
+        result = self.server.get_delta(result['version'])
+        self.assertEqual({}, result['tasks'])
+
+    def test_get_delta_unknown_version(self):
+        """Test full summaries are returned for unknown versions."""
+        self._update()
+        version = self.server.get_delta()['version']
+        for bad_version in ['nonsense', 'x-1', version + '0']:
+            self.assertTrue(self.server.get_delta(bad_version)['full'])
+        for _ in range(StateSummaryServer.MAX_DELTAS):
+            self._update()
+        self.assertFalse(self.server.get_delta(version)['full'])
+        self._update()
+        self.assertTrue(self.server.get_delta(version)['full'])
+
+    def test_reload(self):
+        """Test families are recomputed on a new suite configuration."""
+        self._update()
+        version = self.server.get_delta()['version']
+        config = self._FakeSuiteConfig()
+        config.cfg['runtime']['FAM']['title'] = 'new fam'
+        SuiteConfig._INSTANCES[None] = config
+        self._update()
+        self.assertEqual(
+            'new fam', self.server.family_summary['FAM.2']['title'])
+        result = self.server.get_delta(version)
+        self.assertEqual(['FAM.1', 'FAM.2'], sorted(result['families']))
+
+    def test_wait_for_task_state(self):
+        """Test waiting for task states."""
+        from threading import Thread
+        self._update()
+        # Already in state, in none of the states (timeout), or unknown.
+        self.assertEqual(True, self.server.wait_for_task_state(
+            'bar.1', ['running', 'succeeded'], 0.0))
+        self.assertEqual(False, self.server.wait_for_task_state(
+            'foo.1', ['succeeded'], 0.1))
+        self.assertEqual(None, self.server.wait_for_task_state(
+            'qux.1', ['succeeded'], 0.1))
+        results = []
+
+        def _wait(task_id):
+            results.append(self.server.wait_for_task_state(
+                task_id, ['succeeded'], 10.0))
+
+        # Released on state change, or when the task leaves the pool.
+        for task_id in 'foo.1', 'foo.2':
+            thread = Thread(target=_wait, args=[task_id])
+            thread.start()
+            while not self.server._n_task_state_waiters:
+                time.sleep(0.01)
+            if task_id == 'foo.1':
+                self.tasks[task_id].summary['state'] = 'succeeded'
+            else:
+                self._remove(task_id)
+            self._update()
+            thread.join()
+        self.assertEqual([True, None], results)
+
+    def test_wait_for_task_state_max_waiters(self):
+        """Test clients do not wait beyond MAX_TASK_STATE_WAITERS."""
+        from threading import Thread
+        self._update()
+        threads = []
+        for _ in range(StateSummaryServer.MAX_TASK_STATE_WAITERS):
+            threads.append(Thread(
+                target=self.server.wait_for_task_state,
+                args=['foo.1', ['succeeded'], 10.0]))
+            threads[-1].start()
+        while (self.server._n_task_state_waiters <
+                StateSummaryServer.MAX_TASK_STATE_WAITERS):
+            time.sleep(0.01)
+        start_time = time.time()
+        self.assertEqual(None, self.server.wait_for_task_state(
+            'foo.1', ['succeeded'], 10.0))
+        results = []
+        threads.append(Thread(target=lambda: results.append(
+            self.server.wait_for_task_state('foo.1', ['succeeded'], 10.0))))
+        self.server.release_waiters()
+        threads[-1].start()
+        for thread in threads:
+            thread.join()
+        self.assertTrue(time.time() - start_time < 5.0)
+        self.assertEqual([None], results)
+        self.assertEqual(0, self.server._n_task_state_waiters)
+
+
+class TestStateSummaryClient(unittest.TestCase):
+    """Unit tests for incremental fetch of StateSummaryClient."""
+
+    class _FakeStateSummaryClient(StateSummaryClient):
+        """StateSummaryClient calling a StateSummaryServer in process."""
+
+        def __init__(self, server):
+            super(TestStateSummaryClient._FakeStateSummaryClient,
+                  self).__init__('suite')
+            self.server = server
+            self.calls = []
+            # Behave as a suite daemon without "get_state_summary_delta"?
+            self.is_old_server = False
+            # Fail all calls?
+            self.is_down = False
+
+        def call_server_func(self, category, fname, **fargs):
+            self.calls.append(fname)
+            if self.is_down or (
+                    self.is_old_server and
+                    fname == 'get_state_summary_delta'):
+                raise ConnectionError(fname, 'HTTP Error 404: Not Found')
+            if fname == 'get_state_summary_delta':
+                return self.server.get_delta(fargs.get('version'))
+            return (
+                self.server.global_summary, dict(self.server.task_summary),
+                dict(self.server.family_summary))
+
+    def setUp(self):
+        self.config_inst = SuiteConfig._INSTANCES.get(None)
+        SuiteConfig._INSTANCES[None] = (
+            TestStateSummaryServer._FakeSuiteConfig())
+        self.server = StateSummaryServer('live')
+        self.tasks = [
+            TestStateSummaryServer._FakeTaskProxy(identity, 'waiting')
+            for identity in ['foo.1', 'bar.1']]
+        self.server.update(
+            self.tasks, [], [], '1', '1', '1', False, None, False, None, [],
+            False)
+        self.client = self._FakeStateSummaryClient(self.server)
+
+    def tearDown(self):
+        if self.config_inst is None:
+            SuiteConfig._INSTANCES.pop(None, None)
+        else:
+            SuiteConfig._INSTANCES[None] = self.config_inst
+
+    def _get_task_ids(self):
+        """Fetch summaries incrementally, and return sorted task IDs."""
+        return sorted(self.client.get_suite_state_summary_incremental()[1])
+
+    def test_incremental(self):
+        """Test fetch of deltas from a suite daemon that supports them."""
+        self.assertEqual(['bar.1', 'foo.1'], self._get_task_ids())
+        self.assertEqual(['bar.1', 'foo.1'], self._get_task_ids())
+        self.assertEqual(
+            ['get_state_summary_delta'] * 2, self.client.calls)
+
+    def test_old_server(self):
+        """Test fall back to full summaries from an older suite daemon."""
+        self.client.is_old_server = True
+        for _ in range(2):
+            self.assertEqual(['bar.1', 'foo.1'], self._get_task_ids())
+        self.assertEqual(
+            ['get_state_summary_delta', 'get_state_summary',
+             'get_state_summary'],
+            self.client.calls)
+        # Try deltas again on reconnect, e.g. to a restarted suite daemon.
+        self.client.is_old_server = False
+        self.client.reset()
+        self.client.calls = []
+        self.assertEqual(['bar.1', 'foo.1'], self._get_task_ids())
+        self.assertEqual(['get_state_summary_delta'], self.client.calls)
+
+    def test_connection_error(self):
+        """Test connection errors that are not due to an older daemon."""
+        # Down on first call, up on retry: deltas are still used.
+        self.client.is_down = True
+        self.assertRaises(ConnectionError, self._get_task_ids)
+        self.assertFalse(self.client.is_delta_unsupported)
+        self.client.is_down = False
+        self.assertEqual(['bar.1', 'foo.1'], self._get_task_ids())
+        # Error on a later call does not fall back to full summaries.
+        self.client.is_down = True
+        self.client.calls = []
+        self.assertRaises(ConnectionError, self._get_task_ids)
+        self.assertEqual(['get_state_summary_delta'], self.client.calls)
+        self.assertFalse(self.client.is_delta_unsupported)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -28,3 +28,13 @@ class TaskMessageClient(BaseCommsClient):
         return self.call_server_func(
             COMMS_TASK_MESSAGE_OBJ_NAME, "put",
             task_id=task_id, priority=priority, message=message)
+
+    def put_messages(self, messages):
+        """Send a batch of task messages in a single request.
+
+        messages -- a list of (task_id, priority, message, event_time).
+
+        """
+        return self.call_server_func(
+            COMMS_TASK_MESSAGE_OBJ_NAME, "put_messages",
+            payload={"messages": [list(item) for item in messages]})
@@ -17,6 +17,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from Queue import Queue
+from cylc.main_loop_waker import MainLoopWaker
 from cylc.network import check_access_priv
 from cylc.network.https.base_server import BaseCommsServer
 
@@ -36,7 +37,36 @@ class TaskMessageServer(BaseCommsServer):
         check_access_priv(self, 'full-control')
         self.report('task_message')
         self.queue.put((task_id, priority, str(message)))
+        MainLoopWaker.get_inst().wake()
         return 'Message queued'
 
+    @cherrypy.expose
+    @cherrypy.tools.json_in()
+    @cherrypy.tools.json_out()
+    def put_messages(self):
+        """Queue a batch of task messages.
+
+        The JSON payload is {"messages": [item, ...]}, where each item is
+        [task_id, priority, message, event_time]. If event_time is set, it is
+        appended to the message as " at EVENT_TIME", as for single messages.
+
+        """
+        check_access_priv(self, 'full-control')
+        self.report('task_messages')
+        items = []
+        try:
+            for task_id, priority, message, event_time in (
+                    cherrypy.request.json["messages"]):
+                message = str(message)
+                if event_time:
+                    message += ' at ' + str(event_time)
+                items.append((str(task_id), str(priority), message))
+        except (KeyError, TypeError, ValueError):
+            raise cherrypy.HTTPError(400, 'Bad messages payload')
+        for item in items:
+            self.queue.put(item)
+        MainLoopWaker.get_inst().wake()
+        return 'Messages queued: %d' % len(items)
+
     def get_queue(self):
         return self.queue
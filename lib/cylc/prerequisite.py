@@ -18,10 +18,10 @@
 
 import re
 import sys
+import unittest
 from cylc.conditional_simplifier import ConditionalSimplifier
 from cylc.cycling.loader import get_point
 from cylc.suite_logging import ERR
-from cylc.task_id import TaskID
 
 
 """A task prerequisite.
@@ -39,130 +39,224 @@ class TriggerExpressionError(Exception):
         return repr(self.msg)
 
 
-class Prerequisite(object):
+class ConditionalExpression(object):
+    """A conditional trigger expression, e.g. "foo | bar & (baz | qux)".
 
-    # Memory optimization - constrain possible attributes to this list.
-    __slots__ = ["CYCLE_POINT_RE", "owner_id", "labels", "messages",
-                 "messages_set", "satisfied", "all_satisfied", "satisfied_by",
-                 "target_point_strings", "start_point",
-                 "pre_initial_messages", "conditional_expression",
-                 "raw_conditional_expression", "point"]
+    The expression is parsed once into a tree and evaluated against a dict of
+    {label: True/False}, instead of being re-written as Python code and passed
+    to eval(). Expressions are cached by their text, so all prerequisites with
+    the same trigger expression (e.g. all instances of a task) share the same
+    parsed tree.
 
-    # Extracts T from "foo.T succeeded" etc.
-    CYCLE_POINT_RE = re.compile('^\w+\.(\S+) .*$')
+    A node of the tree is either a label, or a tuple of the form
+    (OP, node, node, ...), where OP is OP_AND or OP_OR.
 
-    def __init__(self, owner_id, point, start_point=None):
-        self.point = point
-        self.owner_id = owner_id
-        self.labels = {}   # labels[ message ] = label
-        self.messages = {}   # messages[ label ] = message
-        self.messages_set = set()  # = set(self.messages.values())
-        self.satisfied = {}    # satisfied[ label ] = True/False
-        self.satisfied_by = {}   # self.satisfied_by[ label ] = task_id
-        self.target_point_strings = []   # list of target cycle points
-        self.start_point = start_point
-        self.pre_initial_messages = []
-        self.conditional_expression = None
-        self.raw_conditional_expression = None
+    """
+
+    __slots__ = ["raw_expression", "tree", "error"]
+
+    OP_AND = "&"
+    OP_OR = "|"
+    # Labels are \w+, see "SuiteConfig.get_conditional_label".
+    TOKEN_RE = re.compile(r"\s*(\w+|[&|()]|\S)")
+
+    _INSTANCES = {}
+
+    @classmethod
+    def get(cls, expr):
+        """Return a (shared) parsed instance of the expression."""
+        try:
+            return cls._INSTANCES[expr]
+        except KeyError:
+            cls._INSTANCES[expr] = cls(expr)
+            return cls._INSTANCES[expr]
+
+    def __init__(self, expr):
+        self.raw_expression = expr
+        self.tree = None
+        self.error = None
+        try:
+            self.tree = self._parse(expr)
+        except ValueError as exc:
+            # Report on evaluation, like any other bad trigger expression.
+            self.error = str(exc)
+
+    @classmethod
+    def _parse(cls, expr):
+        """Parse expr into a tree. Raise ValueError on syntax error."""
+        tokens = cls.TOKEN_RE.findall(expr)
+        tree, i = cls._parse_op(tokens, 0, cls.OP_OR)
+        if i < len(tokens):
+            raise ValueError("unexpected \"%s\"" % tokens[i])
+        return tree
+
+    @classmethod
+    def _parse_op(cls, tokens, i, oper):
+        """Parse a sequence of operands joined by oper, from tokens[i].
+
+        "&" binds tighter than "|", as in Python.
+        Return (node, index of next token).
+        """
+        nodes = []
+        while True:
+            if oper == cls.OP_OR:
+                node, i = cls._parse_op(tokens, i, cls.OP_AND)
+            else:
+                node, i = cls._parse_operand(tokens, i)
+            nodes.append(node)
+            if i < len(tokens) and tokens[i] == oper:
+                i += 1
+            else:
+                break
+        if len(nodes) == 1:
+            return nodes[0], i
+        return (oper,) + tuple(nodes), i
+
+    @classmethod
+    def _parse_operand(cls, tokens, i):
+        """Parse a label or a bracketed expression, from tokens[i].
+
+        Return (node, index of next token).
+        """
+        if i >= len(tokens):
+            raise ValueError("unexpected EOF")
+        if tokens[i] == "(":
+            node, i = cls._parse_op(tokens, i + 1, cls.OP_OR)
+            if i >= len(tokens) or tokens[i] != ")":
+                raise ValueError(
+                    "unexpected EOF\n(?could be unmatched parentheses in the"
+                    " graph string?)")
+            return node, i + 1
+        if tokens[i] in [cls.OP_AND, cls.OP_OR, ")"] or not (
+                tokens[i][0].isalnum() or tokens[i][0] == "_"):
+            raise ValueError("unexpected \"%s\"" % tokens[i])
+        return tokens[i], i + 1
+
+    def evaluate(self, satisfied):
+        """Evaluate the expression against satisfied[label] = True/False.
+
+        Raise TriggerExpressionError on bad expression or unknown label.
+        """
+        err_msg = self.error
+        if err_msg is None:
+            try:
+                return self._evaluate(self.tree, satisfied)
+            except KeyError as exc:
+                err_msg = "name %s is not defined" % exc
+        ERR.error(err_msg)
+        raise TriggerExpressionError('"' + self.raw_expression + '"')
+
+    @classmethod
+    def _evaluate(cls, node, satisfied):
+        """Evaluate a node of the tree."""
+        if node.__class__ is not tuple:
+            return satisfied[node]
+        # No short-circuit, so that all labels are always checked.
+        values = [cls._evaluate(child, satisfied) for child in node[1:]]
+        if node[0] == cls.OP_AND:
+            return all(values)
+        else:
+            return any(values)
+
+
+class _LabelBits(object):
+    """View a bitset of satisfied labels as satisfied[label] = True/False."""
+
+    __slots__ = ["bits", "label_bits"]
+
+    def __init__(self, bits, label_bits):
+        self.bits = bits
+        self.label_bits = label_bits
+
+    def __getitem__(self, label):
+        return bool(self.bits & self.label_bits[label])
+
+
+class PrerequisiteTemplate(object):
+    """The static structure of a prerequisite.
 
-    def add(self, message, label, pre_initial=False):
-        # Add a new prerequisite message in an UNSATISFIED state.
-        self.messages[label] = message
-        self.messages_set.add(message)
-        self.labels[message] = label
-        self.satisfied[label] = False
-        if hasattr(self, 'all_satisfied'):
-            self.all_satisfied = False
-        m = re.match(self.__class__.CYCLE_POINT_RE, message)
-        if m:
-            self.target_point_strings.append(m.groups()[0])
-        if pre_initial:
-            self.pre_initial_messages.append(label)
-
-    def get_not_satisfied_list(self):
-        not_satisfied = []
-        for label in self.satisfied:
-            if not self.satisfied[label]:
-                not_satisfied.append(label)
-        return not_satisfied
-
-    def set_condition(self, expr):
-        # 'foo | bar & baz'
-        # 'foo:fail | foo'
-        # 'foo[T-6]:out1 | baz'
-
-        drop_these = []
-        if hasattr(self, 'all_satisfied'):
-            delattr(self, 'all_satisfied')
-
-        if self.pre_initial_messages:
-            for k in self.pre_initial_messages:
-                drop_these.append(k)
-
-        # Needed to drop pre warm-start dependence:
-        for k in self.messages:
-            if k in drop_these:
-                continue
-            if self.start_point:
-                m = re.search(
-                    r'(' + TaskID.NAME_RE + ')\.(' +
-                    TaskID.POINT_RE + ') ', self.messages[k])
-                if m:
-                    try:
-                        foo = m.group().split(".")[1].rstrip()
-                        if (get_point(foo) < self.start_point and
-                           self.point >= self.start_point):
-                            drop_these.append(k)
-                    except IndexError:
-                        pass
-
-        for label in drop_these:
-            if self.messages.get(label):
-                msg = self.messages[label]
-                self.messages.pop(label)
-                self.messages_set.remove(msg)
-                self.satisfied.pop(label)
-                self.labels.pop(msg)
+    This is shared by all prerequisites generated by the same trigger
+    expression of a TaskDef, see "TaskDef.get_prereq_template". Each
+    Prerequisite only stores its messages and a bitset of satisfied labels,
+    where bit N represents labels[N].
 
+    """
+
+    # Memory optimization - constrain possible attributes to this list.
+    __slots__ = ["labels", "label_bits", "all_bits", "conditional_expression",
+                 "raw_conditional_expression", "truth_table"]
+
+    # Evaluate conditional expressions with up to this number of labels with a
+    # pre-computed truth table, indexed by the bitset of satisfied labels.
+    MAX_TRUTH_TABLE_LABELS = 12
+
+    def __init__(self, labels, expr, drop_these=None):
+        self.labels = tuple(labels)
+        self.label_bits = {}
+        for i, label in enumerate(self.labels):
+            self.label_bits[label] = 1 << i
+        self.all_bits = (1 << len(self.labels)) - 1
+        self.conditional_expression = None
+        self.raw_conditional_expression = None
+        self.truth_table = None
         if '|' in expr:
             if drop_these:
                 simpler = ConditionalSimplifier(expr, drop_these)
                 expr = simpler.get_cleaned()
-            # Make a Python expression so we can eval() the logic.
             self.raw_conditional_expression = expr
-            for label in self.messages:
-                expr = re.sub(
-                    r'\b' + label + r'\b', 'self.satisfied[\'' + label + '\']',
-                    expr)
-            self.conditional_expression = expr
+            self.conditional_expression = ConditionalExpression.get(expr)
 
-    def is_satisfied(self):
-        try:
-            return self.all_satisfied
-        except AttributeError:
-            # No cached value.
-            if not self.satisfied:
-                # No prerequisites left after pre-initial simplification.
-                return True
-            if self.conditional_expression:
-                # Trigger expression with at least one '|': use eval.
-                self.all_satisfied = self._conditional_is_satisfied()
-            else:
-                self.all_satisfied = all(self.satisfied.values())
-            return self.all_satisfied
+    def is_satisfied(self, bits):
+        """Return True if a bitset of satisfied labels satisfies me."""
+        if not self.labels:
+            # No prerequisites left after pre-initial simplification.
+            return True
+        if self.conditional_expression is None:
+            return bits == self.all_bits
+        if self.truth_table is not None:
+            return self.truth_table[bits]
+        if len(self.labels) <= self.MAX_TRUTH_TABLE_LABELS:
+            # (Raise TriggerExpressionError on bad expression.)
+            self.truth_table = tuple(
+                self.conditional_expression.evaluate(
+                    _LabelBits(i, self.label_bits))
+                for i in range(self.all_bits + 1))
+            return self.truth_table[bits]
+        return self.conditional_expression.evaluate(
+            _LabelBits(bits, self.label_bits))
 
-    def _conditional_is_satisfied(self):
-        try:
-            res = eval(self.conditional_expression)
-        except Exception, exc:
-            err_msg = str(exc)
-            if str(exc).find("unexpected EOF") != -1:
-                err_msg += ("\n(?could be unmatched parentheses in the graph "
-                            "string?)")
-            ERR.error(err_msg)
-            raise TriggerExpressionError(
-                '"' + self.raw_conditional_expression + '"')
-        return res
+
+class Prerequisite(object):
+    """A task prerequisite.
+
+    The static structure is in a PrerequisiteTemplate shared with other task
+    proxies. Each instance stores its own messages, which depend on the cycle
+    point of the task, and what is satisfied.
+
+    """
+
+    # Memory optimization - constrain possible attributes to this list.
+    __slots__ = ["CYCLE_POINT_RE", "template", "messages", "satisfied_bits",
+                 "satisfied_by", "all_satisfied"]
+
+    # Extracts T from "foo.T succeeded" etc.
+    CYCLE_POINT_RE = re.compile('^\w+\.(\S+) .*$')
+
+    def __init__(self, template, messages):
+        self.template = template
+        # messages[i] is the message of template.labels[i]
+        self.messages = tuple(messages)
+        self.satisfied_bits = 0
+        # satisfied_by[label] = task_id, only if anything satisfied by outputs
+        self.satisfied_by = None
+        # Cached result of "is_satisfied", None if not yet known.
+        self.all_satisfied = None
+
+    def is_satisfied(self):
+        if self.all_satisfied is None:
+            self.all_satisfied = self.template.is_satisfied(
+                self.satisfied_bits)
+        return self.all_satisfied
 
     def satisfy_me(self, output_msgs, outputs):
         """Can any completed outputs satisfy any of my prequisites?
@@ -175,53 +269,123 @@ class Prerequisite(object):
         slow.
 
         """
-        relevant_msgs = output_msgs & self.messages_set
-        for msg in relevant_msgs:
-            for label in self.satisfied:
-                if self.messages[label] == msg:
-                    self.satisfied[label] = True
-                    self.satisfied_by[label] = outputs[msg]  # owner_id
-            if self.conditional_expression is None:
-                self.all_satisfied = all(self.satisfied.values())
-            else:
-                self.all_satisfied = self._conditional_is_satisfied()
+        relevant_msgs = output_msgs.intersection(self.messages)
+        if not relevant_msgs:
+            return relevant_msgs
+        if self.satisfied_by is None:
+            self.satisfied_by = {}
+        for i, msg in enumerate(self.messages):
+            if msg in relevant_msgs:
+                self.satisfied_bits |= 1 << i
+                self.satisfied_by[self.template.labels[i]] = outputs[msg]
+        self.all_satisfied = self.template.is_satisfied(self.satisfied_bits)
         return relevant_msgs
 
     def dump(self):
-        # TODO - CHECK THIS WORKS NOW
         # return an array of strings representing each message and its state
         res = []
-        if self.raw_conditional_expression:
-            for label, val in self.satisfied.items():
-                res.append(['    LABEL: %s = %s' %
-                            (label, self.messages[label]), val])
+        labels = self.template.labels
+        if self.template.raw_conditional_expression:
+            for i, label in enumerate(labels):
+                res.append(['    LABEL: %s = %s' % (label, self.messages[i]),
+                            bool(self.satisfied_bits & (1 << i))])
             res.append(['CONDITION: %s' %
-                        self.raw_conditional_expression, self.is_satisfied()])
-        elif self.satisfied:
-            for label, val in self.satisfied.items():
-                res.append([self.messages[label], val])
-        # (Else trigger wiped out by pre-initial simplification.)
+                        self.template.raw_conditional_expression,
+                        self.is_satisfied()])
+        else:
+            for i, message in enumerate(self.messages):
+                res.append([message, bool(self.satisfied_bits & (1 << i))])
+        # (No result if trigger wiped out by pre-initial simplification.)
         return res
 
     def set_satisfied(self):
-        for label in self.messages:
-            self.satisfied[label] = True
-        if self.conditional_expression is None:
-            self.all_satisfied = True
-        else:
-            self.all_satisfied = self._conditional_is_satisfied()
+        self.satisfied_bits = self.template.all_bits
+        self.all_satisfied = self.template.is_satisfied(self.satisfied_bits)
 
     def set_not_satisfied(self):
-        for label in self.messages:
-            self.satisfied[label] = False
-        if not self.satisfied:
-            self.all_satisfied = True
-        elif self.conditional_expression is None:
-            self.all_satisfied = False
-        else:
-            self.all_satisfied = self._conditional_is_satisfied()
+        self.satisfied_bits = 0
+        self.all_satisfied = self.template.is_satisfied(self.satisfied_bits)
 
     def get_target_points(self):
         """Return a list of cycle points target by each prerequisite,
         including each component of conditionals."""
-        return [get_point(p) for p in self.target_point_strings]
+        points = []
+        for message in self.messages:
+            match = self.CYCLE_POINT_RE.match(message)
+            if match:
+                points.append(get_point(match.groups()[0]))
+        return points
+
+
+class TestConditionalExpression(unittest.TestCase):
+    """Unit tests for ConditionalExpression."""
+
+    def test_evaluate(self):
+        """Test evaluation against all combinations of label values."""
+        for expr in ["a | b", "a & b | c", "a | b & c", "(a | b) & c",
+                     "a & (b | (c & a))", "((a))|b|c"]:
+            cond = ConditionalExpression(expr)
+            for i in range(8):
+                values = {"a": bool(i & 1), "b": bool(i & 2), "c": bool(i & 4)}
+                self.assertEqual(
+                    eval(expr, {}, values), cond.evaluate(values), expr)
+
+    def test_shared(self):
+        """Test parsed expressions are shared."""
+        self.assertTrue(
+            ConditionalExpression.get("x | y") is
+            ConditionalExpression.get("x | y"))
+
+    def test_bad_expressions(self):
+        """Test bad expressions raise TriggerExpressionError."""
+        for expr in ["a |", "(a | b", "a | b)", "a b | c", "a | | b", "a | $",
+                     "a | unknown"]:
+            cond = ConditionalExpression(expr)
+            self.assertRaises(
+                TriggerExpressionError, cond.evaluate, {"a": True, "b": True})
+
+
+class TestPrerequisite(unittest.TestCase):
+    """Unit tests for Prerequisite and PrerequisiteTemplate."""
+
+    def test_satisfy_me(self):
+        """Test satisfying a prerequisite with a conditional expression."""
+        template = PrerequisiteTemplate(
+            ["a", "b", "c"], "a & b | c")
+        for expr_values in [(["a"], False), (["b"], True), (["c"], True)]:
+            outputs, result = expr_values
+            preq = Prerequisite(template, ["a.1 x", "b.1 x", "c.1 x"])
+            self.assertFalse(preq.is_satisfied())
+            preq.satisfy_me(set(["a.1 x"]), {"a.1 x": "a.1"})
+            self.assertFalse(preq.is_satisfied())
+            for label in outputs:
+                msg = label + ".1 x"
+                preq.satisfy_me(set([msg, "z.1 x"]), {msg: label + ".1"})
+            self.assertEqual(result, preq.is_satisfied())
+        self.assertEqual(8, len(template.truth_table))
+        self.assertEqual({"a": "a.1", "c": "c.1"}, preq.satisfied_by)
+        preq.set_not_satisfied()
+        self.assertFalse(preq.is_satisfied())
+        preq.set_satisfied()
+        self.assertTrue(preq.is_satisfied())
+
+    def test_dropped_labels(self):
+        """Test expressions simplified for dropped labels."""
+        template = PrerequisiteTemplate(["b"], "a | b", ["a"])
+        self.assertEqual("(b)", template.raw_conditional_expression)
+        self.assertTrue(template.is_satisfied(1))
+        self.assertFalse(template.is_satisfied(0))
+        template = PrerequisiteTemplate([], "a", ["a"])
+        self.assertTrue(Prerequisite(template, []).is_satisfied())
+
+    def test_large_expression(self):
+        """Test expressions too large for a truth table."""
+        labels = ["f%02d" % i for i in range(30)]
+        template = PrerequisiteTemplate(labels, " | ".join(labels))
+        self.assertFalse(template.is_satisfied(0))
+        self.assertTrue(template.is_satisfied(1 << 29))
+        self.assertTrue(template.truth_table is None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -101,7 +101,13 @@ class remrun(object):
         # ssh command and options (X forwarding)
         ssh_tmpl = str(GLOBAL_CFG.get_host_item(
             "remote shell template", self.host, self.owner))
-        command = shlex.split(ssh_tmpl) + ["-Y", user_at_host]
+        command = shlex.split(ssh_tmpl) + ["-Y"]
+        # Use the suite daemon's shared connection to the host, if it has one.
+        from cylc.ssh_multiplexer import SSHMultiplexer
+        control_path = os.getenv(SSHMultiplexer.ENV_CONTROL_PATH)
+        if control_path:
+            command += SSHMultiplexer.get_ssh_options(control_path)
+        command.append(user_at_host)
 
         # Use bash -l?
         ssh_login_shell = self.ssh_login_shell
@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2017 NIWA
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Keep track of the cycle points of the task pool, for runahead release.
+
+The tracker counts the task proxies, and the unfinished task proxies, at each
+cycle point of the task pool (including the runahead pool). The counts are
+maintained incrementally:
+ * The task pool calls "add" and "remove" as tasks enter and leave the pool.
+ * Task states call "status_changed" when their status changes.
+
+The task pool can then get the earliest point with unfinished tasks, and the
+points after it, without looking at every task proxy.
+
+"""
+
+from bisect import bisect_left, insort
+from heapq import heappop, heappush
+import unittest
+
+from cylc.task_state import (
+    TASK_STATUS_EXPIRED, TASK_STATUS_FAILED, TASK_STATUS_SUCCEEDED)
+
+
+class RunaheadTracker(object):
+    """Count tasks and unfinished tasks at each point of the task pool."""
+
+    # Statuses of finished tasks, for runahead purposes.
+    STATUSES_FINISHED = set([
+        TASK_STATUS_EXPIRED, TASK_STATUS_FAILED, TASK_STATUS_SUCCEEDED])
+
+    def __init__(self):
+        # itasks[identity] = itask, for all task proxies in the tracker.
+        self.itasks = {}
+        # n_tasks[point] = number of task proxies at point.
+        self.n_tasks = {}
+        # Sorted list of points with task proxies.
+        self.points = []
+        # n_unfinished[point] = number of unfinished task proxies at point.
+        self.n_unfinished = {}
+        # Heap of points with unfinished task proxies. May contain stale
+        # (or duplicated) points, which are dropped on access.
+        self.unfinished_points_heap = []
+        # Task proxies added finished, or finished, since "pop_new_finished".
+        self.new_finished = {}
+
+    def add(self, itask):
+        """Add a task proxy to the tracker."""
+        if itask.identity in self.itasks:
+            self.remove(self.itasks[itask.identity])
+        self.itasks[itask.identity] = itask
+        itask.state.runahead_tracker = self
+        point = itask.point
+        if point in self.n_tasks:
+            self.n_tasks[point] += 1
+        else:
+            self.n_tasks[point] = 1
+            insort(self.points, point)
+        if itask.state.status in self.STATUSES_FINISHED:
+            self.new_finished[itask.identity] = itask
+        else:
+            self._add_unfinished(point)
+
+    def remove(self, itask):
+        """Remove a task proxy from the tracker."""
+        if self.itasks.get(itask.identity) is not itask:
+            return
+        del self.itasks[itask.identity]
+        itask.state.runahead_tracker = None
+        point = itask.point
+        self.n_tasks[point] -= 1
+        if not self.n_tasks[point]:
+            del self.n_tasks[point]
+            del self.points[bisect_left(self.points, point)]
+        if itask.state.status in self.STATUSES_FINISHED:
+            self.new_finished.pop(itask.identity, None)
+        else:
+            self._remove_unfinished(point)
+
+    def status_changed(self, identity, old_status, new_status):
+        """Register a change of status of a task proxy."""
+        try:
+            itask = self.itasks[identity]
+        except KeyError:
+            return
+        is_old_finished = old_status in self.STATUSES_FINISHED
+        is_new_finished = new_status in self.STATUSES_FINISHED
+        if is_old_finished and not is_new_finished:
+            self.new_finished.pop(identity, None)
+            self._add_unfinished(itask.point)
+        elif is_new_finished and not is_old_finished:
+            self.new_finished[identity] = itask
+            self._remove_unfinished(itask.point)
+
+    def get_base_point(self):
+        """Return the earliest point with unfinished tasks, or None."""
+        heap = self.unfinished_points_heap
+        while heap and not self.n_unfinished.get(heap[0]):
+            heappop(heap)
+        if heap:
+            return heap[0]
+        return None
+
+    def get_points(self, start_point, limit):
+        """Return up to limit sorted points with tasks, from start_point."""
+        index = bisect_left(self.points, start_point)
+        return self.points[index:index + limit]
+
+    def pop_new_finished(self):
+        """Return task proxies added finished, or finished, since last call.
+        """
+        itasks = self.new_finished.values()
+        self.new_finished.clear()
+        return itasks
+
+    def _add_unfinished(self, point):
+        """Count an unfinished task at point."""
+        if self.n_unfinished.get(point):
+            self.n_unfinished[point] += 1
+        else:
+            self.n_unfinished[point] = 1
+            heappush(self.unfinished_points_heap, point)
+
+    def _remove_unfinished(self, point):
+        """Uncount an unfinished task at point."""
+        self.n_unfinished[point] -= 1
+        if not self.n_unfinished[point]:
+            del self.n_unfinished[point]
+
+
+class TestRunaheadTracker(unittest.TestCase):
+    """Unit tests for RunaheadTracker."""
+
+    class _FakeTaskState(object):
+        """Minimal stand-in for TaskState."""
+
+        def __init__(self, status):
+            self.status = status
+            self.runahead_tracker = None
+
+        def set_state(self, status):
+            old_status = self.status
+            self.status = status
+            if self.runahead_tracker is not None:
+                self.runahead_tracker.status_changed(
+                    self.identity, old_status, status)
+
+    class _FakeTaskProxy(object):
+        """Minimal stand-in for TaskProxy."""
+
+        def __init__(self, name, point, status):
+            self.identity = "%s.%d" % (name, point)
+            self.point = point
+            self.state = TestRunaheadTracker._FakeTaskState(status)
+            self.state.identity = self.identity
+
+    def setUp(self):
+        self.tracker = RunaheadTracker()
+        self.itasks = {}
+        for name, point, status in [
+                ("foo", 1, TASK_STATUS_SUCCEEDED),
+                ("bar", 1, "running"),
+                ("foo", 2, "waiting"),
+                ("foo", 4, "waiting")]:
+            itask = self._FakeTaskProxy(name, point, status)
+            self.itasks[itask.identity] = itask
+            self.tracker.add(itask)
+
+    def test_add(self):
+        """Test points, base point, and finished tasks on add."""
+        self.assertEqual([1, 2, 4], self.tracker.points)
+        self.assertEqual(1, self.tracker.get_base_point())
+        self.assertEqual([2, 4], self.tracker.get_points(2, 5))
+        self.assertEqual([1, 2], self.tracker.get_points(0, 2))
+        self.assertEqual(
+            ["foo.1"],
+            [itask.identity for itask in self.tracker.pop_new_finished()])
+        self.assertEqual([], self.tracker.pop_new_finished())
+
+    def test_status_changed(self):
+        """Test base point moves as tasks finish, and back on reset."""
+        self.tracker.pop_new_finished()
+        self.itasks["bar.1"].state.set_state(TASK_STATUS_FAILED)
+        self.assertEqual(2, self.tracker.get_base_point())
+        self.assertEqual(
+            ["bar.1"],
+            [itask.identity for itask in self.tracker.pop_new_finished()])
+        self.itasks["foo.2"].state.set_state(TASK_STATUS_SUCCEEDED)
+        self.assertEqual(4, self.tracker.get_base_point())
+        self.itasks["foo.1"].state.set_state("waiting")
+        self.assertEqual(1, self.tracker.get_base_point())
+        self.itasks["foo.2"].state.set_state("waiting")
+        self.itasks["foo.2"].state.set_state(TASK_STATUS_EXPIRED)
+        self.assertEqual(
+            ["foo.2"],
+            [itask.identity for itask in self.tracker.pop_new_finished()])
+        self.itasks["foo.1"].state.set_state(TASK_STATUS_SUCCEEDED)
+        self.itasks["foo.4"].state.set_state(TASK_STATUS_SUCCEEDED)
+        self.assertEqual(None, self.tracker.get_base_point())
+
+    def test_remove(self):
+        """Test points and base point on remove."""
+        self.tracker.remove(self.itasks["bar.1"])
+        self.assertEqual([1, 2, 4], self.tracker.points)
+        self.assertEqual(2, self.tracker.get_base_point())
+        self.tracker.remove(self.itasks["foo.1"])
+        self.assertEqual([2, 4], self.tracker.points)
+        self.assertEqual([], self.tracker.pop_new_finished())
+        # Status changes of removed tasks are ignored.
+        self.itasks["bar.1"].state.set_state("waiting")
+        self.assertEqual(2, self.tracker.get_base_point())
+        # Re-add.
+        self.tracker.add(self.itasks["bar.1"])
+        self.assertEqual([1, 2, 4], self.tracker.points)
+        self.assertEqual(1, self.tracker.get_base_point())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -17,12 +17,21 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """Provide data access object for the suite runtime database."""
 
+import cPickle
+from glob import glob
+import os
+from shutil import copy
 import sqlite3
 import sys
+from tempfile import mkstemp
+import threading
+from time import time
 import traceback
+import unittest
 
 import cylc.flags
-from cylc.wallclock import get_current_time_string
+from cylc.wallclock import (
+    get_current_time_string, get_time_string_from_unix_time)
 from cylc.suite_logging import LOG, ERR
 
 
@@ -39,6 +48,9 @@ class CylcSuiteDAOTable(object):
     """Represent a table in the suite runtime database."""
 
     FMT_CREATE = "CREATE TABLE %(name)s(%(columns_str)s%(primary_keys_str)s)"
+    FMT_CREATE_INDEX = (
+        "CREATE INDEX IF NOT EXISTS %(index_name)s" +
+        " ON %(name)s(%(columns_str)s)")
     FMT_DELETE = "DELETE FROM %(name)s%(where_str)s"
     FMT_INSERT = "INSERT OR REPLACE INTO %(name)s VALUES(%(values_str)s)"
     FMT_UPDATE = "UPDATE %(name)s SET %(set_str)s%(where_str)s"
@@ -46,6 +58,8 @@ class CylcSuiteDAOTable(object):
     def __init__(self, name, column_items):
         self.name = name
         self.columns = []
+        # {index_name: [column_name, ...], ...}
+        self.indexes = {}
         for column_item in column_items:
             name = column_item[0]
             attrs = {}
@@ -55,9 +69,14 @@ class CylcSuiteDAOTable(object):
                 name,
                 attrs.get("datatype", "TEXT"),
                 attrs.get("is_primary_key", False)))
+            for index_name in attrs.get("indexes", []):
+                self.indexes.setdefault(index_name, [])
+                self.indexes[index_name].append(name)
         self.delete_queues = {}
         self.insert_queue = []
         self.update_queues = {}
+        # {stmt: (set_column_names, where_column_names), ...}
+        self.update_stmt_columns = {}
 
     def get_create_stmt(self):
         """Return an SQL statement to create this table."""
@@ -75,12 +94,43 @@ class CylcSuiteDAOTable(object):
             "columns_str": ", ".join(column_str_list),
             "primary_keys_str": primary_keys_str}
 
+    def get_create_index_stmts(self):
+        """Return SQL statements to create indexes of this table if needed."""
+        stmts = []
+        for index_name, column_names in sorted(self.indexes.items()):
+            stmts.append(self.FMT_CREATE_INDEX % {
+                "index_name": index_name,
+                "name": self.name,
+                "columns_str": ", ".join(column_names)})
+        return stmts
+
     def get_insert_stmt(self):
         """Return an SQL statement to insert a row to this table."""
         return self.FMT_INSERT % {
             "name": self.name,
             "values_str": ", ".join("?" * len(self.columns))}
 
+    def clear_queues(self):
+        """Clear queued items."""
+        self.delete_queues.clear()
+        del self.insert_queue[:]  # list.clear avail from Python 3.3
+        self.update_queues.clear()
+
+    def get_queued_stmts(self):
+        """Return queued items as [(stmt, stmt_args_list), ...]."""
+        stmts = []
+        # DELETE statements may have varying number of WHERE args so we can
+        # only executemany for each identical template statement.
+        stmts.extend(self.delete_queues.items())
+        # INSERT statements are uniform for each table, so all INSERT
+        # statements can be executed using a single "executemany" call.
+        if self.insert_queue:
+            stmts.append((self.get_insert_stmt(), self.insert_queue))
+        # UPDATE statements can have varying number of SET and WHERE args so
+        # we can only executemany for each identical template statement.
+        stmts.extend(self.update_queues.items())
+        return stmts
+
     def add_delete_item(self, where_args):
         """Queue a DELETE item.
 
@@ -156,18 +206,126 @@ class CylcSuiteDAOTable(object):
             "where_str": where_str}
         if stmt not in self.update_queues:
             self.update_queues[stmt] = []
+        if stmt not in self.update_stmt_columns:
+            self.update_stmt_columns[stmt] = (
+                set(column.name for column in self.columns
+                    if column.name in set_args),
+                set(column.name for column in self.columns
+                    if where_args and column.name in where_args))
         self.update_queues[stmt].append(stmt_args)
 
 
+class CylcSuiteDAOQueue(object):
+    """Ordered queue of statements, for the public database writer.
+
+    Items for each table are kept in the order they are added, except that
+    items made redundant by a later item are dropped:
+    * A DELETE of all rows supersedes all earlier items.
+    * An INSERT (OR REPLACE) supersedes an earlier INSERT of the same primary
+      key, unless there is an UPDATE in between that sets a primary key
+      column.
+    * An UPDATE supersedes an earlier UPDATE of the same statement and WHERE
+      args, unless there is an UPDATE in between that sets one of its WHERE
+      columns.
+    (Statements only ever set literal values, so these are safe.)
+
+    """
+
+    def __init__(self, tables):
+        self.tables = tables
+        # {table_name: [[stmt, stmt_args] or None (if dropped), ...], ...}
+        self.items = {}
+        # {table_name: {primary_key_values: index, ...}, ...}
+        self.insert_indexes = {}
+        # {table_name: {(stmt, where_args): index, ...}, ...}
+        self.update_indexes = {}
+        # {table_name: set(where_column_names_of_update_indexes), ...}
+        self.update_where_columns = {}
+        self.n_items = 0
+        # Time when the oldest item was added
+        self.time = None
+
+    def add(self, table_name, stmt, stmt_args):
+        """Add an item for a table."""
+        table = self.tables[table_name]
+        items = self.items.setdefault(table_name, [])
+        insert_indexes = self.insert_indexes.setdefault(table_name, {})
+        update_indexes = self.update_indexes.setdefault(table_name, {})
+        update_where_columns = self.update_where_columns.setdefault(
+            table_name, set())
+        index = None
+        if stmt == table.FMT_DELETE % {"name": table.name, "where_str": ""}:
+            self.n_items -= len(items) - items.count(None)
+            del items[:]
+            insert_indexes.clear()
+            update_indexes.clear()
+            update_where_columns.clear()
+        elif stmt in table.update_stmt_columns:
+            set_columns, where_columns = table.update_stmt_columns[stmt]
+            if any(column.is_primary_key and column.name in set_columns
+                   for column in table.columns):
+                insert_indexes.clear()
+            if set_columns & update_where_columns:
+                update_indexes.clear()
+                update_where_columns.clear()
+            key = (stmt, tuple(stmt_args[len(set_columns):]))
+            index = update_indexes.get(key)
+            update_indexes[key] = len(items)
+            update_where_columns.update(where_columns)
+        elif stmt == table.get_insert_stmt():
+            key = tuple(
+                stmt_args[i] for i, column in enumerate(table.columns)
+                if column.is_primary_key)
+            if key:
+                index = insert_indexes.get(key)
+                insert_indexes[key] = len(items)
+        if index is not None:
+            items[index] = None
+            self.n_items -= 1
+        items.append([stmt, stmt_args])
+        self.n_items += 1
+        if self.time is None:
+            self.time = time()
+
+    def extend(self, other):
+        """Add all items of another queue, which are newer than ours."""
+        for table_name, items in sorted(other.items.items()):
+            for item in items:
+                if item is not None:
+                    self.add(table_name, *item)
+        if other.time is not None and (
+                self.time is None or other.time < self.time):
+            self.time = other.time
+
+    def get_stmts(self):
+        """Return items as [(stmt, stmt_args_list), ...].
+
+        Consecutive items of the same statement are grouped together, so they
+        can be executed with a single "executemany" call.
+        """
+        stmts = []
+        # Tables in the same order as "CylcSuiteDAO.execute_queued_items".
+        for table_name in self.tables:
+            for item in self.items.get(table_name, []):
+                if item is None:
+                    continue
+                stmt, stmt_args = item
+                if stmts and stmts[-1][0] == stmt:
+                    stmts[-1][1].append(stmt_args)
+                else:
+                    stmts.append((stmt, [stmt_args]))
+        return stmts
+
+
 class CylcSuiteDAO(object):
     """Data access object for the suite runtime database."""
 
+    ARCHIVE_DIR_BASE_NAME = "db-archive"
     CONN_TIMEOUT = 0.2
     DB_FILE_BASE_NAME = "db"
     OLD_DB_FILE_BASE_NAME = "cylc-suite.db"
     OLD_DB_FILE_BASE_NAME_611 = (
         "cylc-suite-private.db", "cylc-suite-public.db")
-    MAX_TRIES = 100
     CHECKPOINT_LATEST_ID = 0
     CHECKPOINT_LATEST_EVENT = "latest"
     TABLE_BROADCAST_EVENTS = "broadcast_events"
@@ -186,7 +344,7 @@ class CylcSuiteDAO(object):
 
     TABLES_ATTRS = {
         TABLE_BROADCAST_EVENTS: [
-            ["time"],
+            ["time", {"indexes": ["broadcast_events_time"]}],
             ["change"],
             ["point"],
             ["namespace"],
@@ -227,12 +385,13 @@ class CylcSuiteDAO(object):
         TABLE_TASK_ACTION_TIMERS: [
             ["cycle", {"is_primary_key": True}],
             ["name", {"is_primary_key": True}],
-            ["ctx_key_pickle", {"is_primary_key": True}],
-            ["ctx_pickle"],
-            ["delays_pickle"],
+            ["ctx_key", {"is_primary_key": True}],
+            ["ctx_type"],
+            ["ctx_args"],
+            ["delays"],
             ["num", {"datatype": "INTEGER"}],
-            ["delay"],
-            ["timeout"],
+            ["delay", {"datatype": "REAL"}],
+            ["timeout", {"datatype": "REAL"}],
         ],
         TABLE_TASK_JOBS: [
             ["cycle", {"is_primary_key": True}],
@@ -240,7 +399,7 @@ class CylcSuiteDAO(object):
             ["submit_num", {"datatype": "INTEGER", "is_primary_key": True}],
             ["is_manual_submit", {"datatype": "INTEGER"}],
             ["try_num", {"datatype": "INTEGER"}],
-            ["time_submit"],
+            ["time_submit", {"indexes": ["task_jobs_time_submit"]}],
             ["time_submit_exit"],
             ["submit_status", {"datatype": "INTEGER"}],
             ["time_run"],
@@ -252,9 +411,9 @@ class CylcSuiteDAO(object):
             ["batch_sys_job_id"],
         ],
         TABLE_TASK_EVENTS: [
-            ["name"],
-            ["cycle"],
-            ["time"],
+            ["name", {"indexes": ["task_events_name_cycle"]}],
+            ["cycle", {"indexes": ["task_events_name_cycle"]}],
+            ["time", {"indexes": ["task_events_time"]}],
             ["submit_num", {"datatype": "INTEGER"}],
             ["event"],
             ["message"],
@@ -276,24 +435,33 @@ class CylcSuiteDAO(object):
         ],
         TABLE_TASK_STATES: [
             ["name", {"is_primary_key": True}],
-            ["cycle", {"is_primary_key": True}],
+            ["cycle", {
+                "is_primary_key": True, "indexes": ["task_states_cycle"]}],
             ["time_created"],
             ["time_updated"],
             ["submit_num", {"datatype": "INTEGER"}],
-            ["status"],
+            ["status", {"indexes": ["task_states_status"]}],
         ],
     }
 
-    def __init__(self, db_file_name=None, is_public=False):
+    def __init__(self, db_file_name=None, is_public=False,
+                 is_persistent=False, pragmas=None):
         """Initialise object.
 
         db_file_name - Path to the database file
         is_public - If True, allow retries, etc
+        is_persistent - If True, keep the connection open between writes
+        pragmas - List of (name, value) of PRAGMA to set on connect, e.g.
+                  [("journal_mode", "WAL"), ("synchronous", "NORMAL")]
 
         """
         self.db_file_name = db_file_name
         self.is_public = is_public
+        self.is_persistent = is_persistent
+        self.pragmas = pragmas or []
         self.conn = None
+        # Inode of the database file, at connect
+        self.conn_ino = None
         self.n_tries = 0
 
         self.tables = {}
@@ -348,43 +516,52 @@ class CylcSuiteDAO(object):
         """Connect to the database."""
         if self.conn is None:
             self.conn = sqlite3.connect(self.db_file_name, self.CONN_TIMEOUT)
+            for name, value in self.pragmas:
+                self.conn.execute("PRAGMA %s=%s" % (name, value))
+            self.conn_ino = self._get_db_file_ino()
         return self.conn
 
     def create_tables(self):
-        """Create tables."""
+        """Create tables, and any of their indexes that do not exist."""
         names = []
         for row in self.connect().execute(
                 "SELECT name FROM sqlite_master WHERE type==? ORDER BY name",
                 ["table"]):
             names.append(row[0])
-        cur = None
         for name, table in self.tables.items():
             if name not in names:
-                cur = self.conn.execute(table.get_create_stmt())
-        if cur is not None:
-            self.conn.commit()
+                self.conn.execute(table.get_create_stmt())
+            for stmt in table.get_create_index_stmts():
+                self.conn.execute(stmt)
+        self.conn.commit()
 
     def execute_queued_items(self):
         """Execute queued items for each table."""
-        try:
+        stmts = []
+        for table in self.tables.values():
+            stmts.extend(table.get_queued_stmts())
+        if self._execute_stmts(stmts):
             for table in self.tables.values():
-                # DELETE statements may have varying number of WHERE args so we
-                # can only executemany for each identical template statement.
-                for stmt, stmt_args_list in table.delete_queues.items():
-                    self._execute_stmt(stmt, stmt_args_list)
-                # INSERT statements are uniform for each table, so all INSERT
-                # statements can be executed using a single "executemany" call.
-                if table.insert_queue:
-                    self._execute_stmt(
-                        table.get_insert_stmt(), table.insert_queue)
-                # UPDATE statements can have varying number of SET and WHERE
-                # args so we can only executemany for each identical template
-                # statement.
-                for stmt, stmt_args_list in table.update_queues.items():
-                    self._execute_stmt(stmt, stmt_args_list)
+                table.clear_queues()
+
+    def _execute_stmts(self, stmts):
+        """Execute [(stmt, stmt_args_list), ...] in a single transaction.
+
+        Return True on success. On failure, raise if this is the private
+        database, or return False if this is the public database.
+        """
+        # If the database file has been removed (e.g. with the suite run
+        # directory) or replaced, a forced reconnection to the private
+        # database will ensure that the suite dies.
+        if (self.is_persistent and self.conn is not None and
+                self._get_db_file_ino() != self.conn_ino):
+            CylcSuiteDAO.close(self)
+        try:
+            for stmt, stmt_args_list in stmts:
+                self._execute_stmt(stmt, stmt_args_list)
             # Connection should only be opened if we have executed something.
             if self.conn is None:
-                return
+                return True
             self.conn.commit()
         except sqlite3.Error:
             if not self.is_public:
@@ -398,24 +575,29 @@ class CylcSuiteDAO(object):
                     self.conn.rollback()
                 except sqlite3.Error:
                     pass
-            return
+            return False
         else:
-            # Clear the queues
-            for table in self.tables.values():
-                table.delete_queues.clear()
-                del table.insert_queue[:]  # list.clear avail from Python 3.3
-                table.update_queues.clear()
             # Report public database retry recovery if necessary
             if self.n_tries:
                 LOG.warning(
                     "%(file)s: recovered after (%(attempt)d) attempt(s)\n" % {
                         "file": self.db_file_name, "attempt": self.n_tries})
             self.n_tries = 0
+            return True
         finally:
             # Note: This is not strictly necessary. However, if the suite run
             # directory is removed, a forced reconnection to the private
             # database will ensure that the suite dies.
-            self.close()
+            # (Close the connection only, not any override of "close".)
+            if not self.is_persistent:
+                CylcSuiteDAO.close(self)
+
+    def _get_db_file_ino(self):
+        """Return inode number of database file, or None if not exist."""
+        try:
+            return os.stat(self.db_file_name).st_ino
+        except OSError:
+            return None
 
     def _execute_stmt(self, stmt, stmt_args_list):
         """Helper for "self.execute_queued_items".
@@ -442,6 +624,50 @@ class CylcSuiteDAO(object):
             ERR.warning(err_log)
             raise
 
+    @classmethod
+    def get_archive_file_names(cls, db_file_name):
+        """Return archive files next to db_file_name, oldest first.
+
+        See CylcSuiteDBArchiver.
+
+        """
+        return sorted(glob(os.path.join(
+            os.path.dirname(db_file_name), cls.ARCHIVE_DIR_BASE_NAME,
+            "*" + CylcSuiteDBArchiver.ARCHIVE_FILE_EXT)))
+
+    def select_archives(self, stmt, stmt_args=None, is_reversed=False):
+        """Iterate rows of a SELECT statement in each archive file.
+
+        Files are visited oldest first, or latest first if is_reversed. The
+        statement must only refer to archived tables. To select the full
+        history, use "select_history".
+
+        """
+        file_names = self.get_archive_file_names(self.db_file_name)
+        if is_reversed:
+            file_names.reverse()
+        for file_name in file_names:
+            conn = sqlite3.connect(file_name, self.CONN_TIMEOUT)
+            try:
+                for row in conn.execute(stmt, stmt_args or []):
+                    yield row
+            finally:
+                conn.close()
+
+    def select_history(self, stmt, stmt_args=None):
+        """Iterate rows of a SELECT statement in archives and live database.
+
+        This is for statements on archived tables, task_events, task_jobs and
+        broadcast_events, so it spans the full history of the suite. Rows of
+        archive files come first, oldest first, then those of the live
+        database.
+
+        """
+        for row in self.select_archives(stmt, stmt_args):
+            yield row
+        for row in self.connect().execute(stmt, stmt_args or []):
+            yield row
+
     def select_broadcast_states(self, callback, id_key=None):
         """Select from broadcast_states or broadcast_states_checkpoints.
 
@@ -549,10 +775,10 @@ class CylcSuiteDAO(object):
             stmt_args = [cycle, name, submit_num]
         try:
             for row in self.connect().execute(stmt, stmt_args):
-                ret = {}
-                for key, value in zip(keys, row):
-                    ret[key] = value
-                return ret
+                return dict(zip(keys, row))
+            # Not in live database, try archives, latest first
+            for row in self.select_archives(stmt, stmt_args, is_reversed=True):
+                return dict(zip(keys, row))
         except sqlite3.DatabaseError:
             return None
 
@@ -724,6 +950,55 @@ class CylcSuiteDAO(object):
                 r"ALTER TABLE " + t_name + r" ADD COLUMN hold_swap TEXT")
         conn.commit()
 
+    def upgrade_pickle_to_json(self):
+        """Upgrade task_action_timers table from pickle to JSON columns.
+
+        Do nothing if the table does not have the old pickle columns.
+        Otherwise, load each old row, and insert it with the new columns.
+        Skip rows that cannot be loaded.
+        """
+        conn = self.connect()
+        t_name = self.TABLE_TASK_ACTION_TIMERS
+        column_names = [
+            row[1] for row in conn.execute(r"PRAGMA table_info(%s)" % t_name)]
+        if "ctx_key_pickle" not in column_names:
+            return
+        # Import here, as cylc.task_proxy imports this module
+        from cylc.task_proxy import TaskActionTimer, dump_json_value
+        sys.stdout.write("Upgrading %s table " % t_name)
+        conn.execute(
+            r"ALTER TABLE " + t_name + r" RENAME TO " + t_name + r"_old")
+        conn.commit()
+        self.create_tables()
+        n_rows = 0
+        for row in conn.execute(
+                r"SELECT cycle, name, ctx_key_pickle, ctx_pickle," +
+                r" delays_pickle, num, delay, timeout" +
+                r" FROM " + t_name + r"_old"):
+            cycle, name, ctx_key_pickle, ctx_pickle, delays_pickle = row[0:5]
+            try:
+                ctx_key = cPickle.loads(str(ctx_key_pickle))
+                timer = TaskActionTimer(
+                    cPickle.loads(str(ctx_pickle)),
+                    cPickle.loads(str(delays_pickle)),
+                    *row[5:])
+            except (EOFError, TypeError, LookupError, ValueError,
+                    cPickle.UnpicklingError):
+                sys.stdout.write("\n - %s.%s (skip)\n" % (name, cycle))
+                continue
+            args = timer.get_db_values()
+            args.update({
+                "cycle": cycle,
+                "name": name,
+                "ctx_key": dump_json_value(ctx_key)})
+            conn.execute(
+                self.tables[t_name].get_insert_stmt(),
+                [args[column.name] for column in self.tables[t_name].columns])
+            n_rows += 1
+        sys.stdout.write("%d rows done\n" % n_rows)
+        conn.execute(r"DROP TABLE " + t_name + "_old")
+        conn.commit()
+
     def upgrade_with_state_file(self, state_file_path):
         """Upgrade database on restart with an old state file.
 
@@ -845,6 +1120,1288 @@ class CylcSuiteDAO(object):
             conn.execute(r"DROP TABLE " + t_name + "_old")
         conn.commit()
 
+        # Indexes were renamed with the old tables, so create them again
+        self.create_tables()
+
     def vacuum(self):
         """Vacuum to the database."""
         return self.connect().execute("VACUUM")
+
+    def wal_checkpoint(self):
+        """Copy any content in the write-ahead log into the database file.
+
+        This is required, before the database file can be copied, if the
+        journal_mode is WAL. Otherwise, it does nothing.
+        """
+        self.connect().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+class CylcSuitePubDAO(CylcSuiteDAO):
+    """Data access object for the public suite runtime database.
+
+    Statements are executed by a separate writer thread, so a public database
+    that is locked by its readers (or is slow to write, e.g. on a shared file
+    system) does not hold up the main loop. "execute_queued_items" hands the
+    queued items over to the writer thread, which writes them as soon as it
+    can, retrying on failure, and coalescing items superseded in the mean time
+    (see CylcSuiteDAOQueue).
+
+    If the writer falls more than max_lag seconds behind, "is_stuck" returns
+    True. The public database should then be recovered from the private
+    database, either with "recover", which copies the whole file, or
+    incrementally with "resync" followed by calls to "resync_step".
+
+    The public database file is kept in the given journal_mode, e.g. "WAL", so
+    that readers do not block the writer, or vice versa. (In the "DELETE"
+    default, readers need no write access to the directory of the file.)
+
+    """
+
+    # Maximum number of unwritten items, before the writer is stuck
+    MAX_ITEMS = 100000
+    # Delay before the writer retries after a failed write attempt (seconds)
+    RETRY_DELAY = 1.0
+    # Allow the writer this long to write remaining items on close (seconds)
+    STOP_TIMEOUT = 10.0
+    # Database file name suffixes: itself, and journal files of each mode
+    JOURNAL_SUFFIXES = ["", "-journal", "-wal", "-shm"]
+    # Maximum time spent copying rows in each resync step (seconds)
+    RESYNC_STEP_TIME = 0.1
+    # Number of rows to copy in each SELECT/INSERT in a resync step
+    RESYNC_BATCH_SIZE = 1000
+
+    def __init__(self, db_file_name=None, max_lag=120.0,
+                 journal_mode="DELETE"):
+        CylcSuiteDAO.__init__(self, db_file_name, is_public=True)
+        self.max_lag = max_lag
+        self.journal_mode = journal_mode
+        self.cond = threading.Condition()
+        # Items handed over, but not yet taken, by the writer thread
+        self.queue = CylcSuiteDAOQueue(self.tables)
+        # Number of items taken, but not yet written, and time of oldest
+        self.unwritten_n_items = 0
+        self.unwritten_time = None
+        # Copy of private database to be moved in place by the writer thread
+        self.recover_file_name = None
+        # Writer thread is moving a copy in place, or writing items taken
+        self.is_writing = False
+        # Set at start of resync, for the writer thread to drop its unwritten
+        # items, which are in the private database
+        self.is_discarding = False
+        # Incremental resync in progress, writer thread holds its items
+        self.is_resyncing = False
+        # Resync state, only used by the main thread:
+        # private database DAO, temporary file name and connection, and
+        # [[table_name, last_rowid_copied, max_rowid_to_copy], ...]
+        self.resync_pri_dao = None
+        self.resync_file_name = None
+        self.resync_conn = None
+        self.resync_tables = []
+        self.stopping = False
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def close(self):
+        """Stop the writer thread, after a final write attempt.
+
+        Complete any resync in progress first, so the public database is left
+        up to date.
+
+        """
+        if self.is_resyncing:
+            try:
+                while not self.resync_step(None):
+                    pass
+            except (IOError, OSError) as exc:
+                LOG.warning("%s: cannot resync: %s\n" % (
+                    self.db_file_name, exc))
+        with self.cond:
+            self.stopping = True
+            self.cond.notify()
+        self.thread.join(self.STOP_TIMEOUT)
+        if self.thread.is_alive():
+            LOG.warning("%s: writes did not complete on close\n" % (
+                self.db_file_name))
+
+    def execute_queued_items(self):
+        """Hand queued items for each table over to the writer thread."""
+        with self.cond:
+            for name, table in self.tables.items():
+                for stmt, stmt_args_list in table.get_queued_stmts():
+                    for stmt_args in stmt_args_list:
+                        self.queue.add(name, stmt, stmt_args)
+                table.clear_queues()
+            if self.queue.n_items:
+                self.cond.notify()
+
+    def is_stuck(self):
+        """Return True if the writer is too far behind.
+
+        That is, if any item has been waiting for more than self.max_lag
+        seconds, or if there are too many unwritten items. (Items are not
+        written while a resync is in progress, so it is not stuck then.)
+
+        """
+        with self.cond:
+            if self.is_resyncing:
+                return False
+            times = [
+                item_time
+                for item_time in [self.queue.time, self.unwritten_time]
+                if item_time is not None]
+            n_items = self.queue.n_items + self.unwritten_n_items
+        return bool(
+            n_items > self.MAX_ITEMS or
+            times and time() - min(times) > self.max_lag)
+
+    def is_up_to_date(self):
+        """Return True if all items handed over are written."""
+        with self.cond:
+            return not (
+                self.queue.n_items or self.unwritten_n_items or
+                self.recover_file_name or self.is_writing)
+
+    def recover(self, pri_dao):
+        """Replace content of public database with that of private database.
+
+        Copy the private database file to a temporary file next to the public
+        database file, and set its journal_mode. (This does not involve the
+        public database file, so it does not matter if this is locked.) The
+        writer thread then moves the copy into place, in place of all items
+        handed over so far.
+
+        Raise IOError or OSError if the copy cannot be made.
+
+        """
+        temp_file_name = None
+        try:
+            temp_file_name = self._get_temp_file_name()
+            pri_dao.wal_checkpoint()
+            copy(pri_dao.db_file_name, temp_file_name)
+            self._set_temp_file_mode(temp_file_name)
+            conn = sqlite3.connect(temp_file_name, self.CONN_TIMEOUT)
+            try:
+                conn.execute("PRAGMA journal_mode=%s" % self.journal_mode)
+            finally:
+                conn.close()
+        except (IOError, OSError, sqlite3.Error) as exc:
+            self._unlink_temp_file(temp_file_name)
+            if isinstance(exc, sqlite3.Error):
+                raise IOError("%s: %s" % (temp_file_name, exc))
+            raise
+        self._cancel_resync()
+        with self.cond:
+            if self.recover_file_name:
+                # Superseded, before the writer thread has moved it in place
+                os.unlink(self.recover_file_name)
+            self.recover_file_name = temp_file_name
+            self.queue = CylcSuiteDAOQueue(self.tables)
+            self.unwritten_n_items = 0
+            self.unwritten_time = None
+            self.cond.notify()
+
+    def resync(self, pri_dao):
+        """Start to rebuild the public database from the private database.
+
+        Unlike "recover", this does not copy the whole private database file
+        in one go, which can take a long time for a large database. Instead,
+        create the tables in a temporary file next to the public database
+        file, and note the last row of each table of the private database.
+        Each call to "resync_step" then copies a limited number of rows, up to
+        the noted ones, so the main loop can carry on in between.
+
+        Items handed over from now on are held by the writer thread, instead
+        of being written. When all rows are copied, the writer thread moves
+        the copy into place, then writes the items on top of it. This brings
+        any rows changed since the start of the resync up to date, whether or
+        not a step has copied them. (Rows only ever change by INSERT OR
+        REPLACE, UPDATE or DELETE of whole rows, so writing the items again is
+        harmless.)
+
+        The private database must be up to date with all items handed over
+        so far, i.e. its queued items must be executed before this is called.
+
+        Raise IOError or OSError if the copy cannot be started.
+
+        """
+        self._cancel_resync()
+        temp_file_name = None
+        try:
+            temp_file_name = self._get_temp_file_name()
+            self._set_temp_file_mode(temp_file_name)
+            conn = sqlite3.connect(temp_file_name, self.CONN_TIMEOUT)
+            # Temporary file is rebuilt from scratch on failure, so there is
+            # no need to journal or sync it while it is being built.
+            conn.execute("PRAGMA journal_mode=OFF")
+            conn.execute("PRAGMA synchronous=OFF")
+            self.resync_conn = conn
+            self.resync_file_name = temp_file_name
+            self.resync_tables = []
+            pri_conn = pri_dao.connect()
+            for name, table in sorted(self.tables.items()):
+                conn.execute(table.get_create_stmt())
+                max_rowid = pri_conn.execute(
+                    "SELECT MAX(rowid) FROM %s" % name).fetchone()[0]
+                if max_rowid is not None:
+                    self.resync_tables.append([name, None, max_rowid])
+            conn.commit()
+        except (IOError, OSError, sqlite3.Error) as exc:
+            self._cancel_resync()
+            self._unlink_temp_file(temp_file_name)
+            if isinstance(exc, sqlite3.Error):
+                raise IOError("%s: %s" % (temp_file_name, exc))
+            raise
+        self.resync_pri_dao = pri_dao
+        with self.cond:
+            self.is_discarding = True
+            self.is_resyncing = True
+            self.queue = CylcSuiteDAOQueue(self.tables)
+            self.unwritten_n_items = 0
+            self.unwritten_time = None
+            self.cond.notify()
+
+    def resync_step(self, step_time=RESYNC_STEP_TIME):
+        """Copy rows of a resync in progress, for up to step_time seconds.
+
+        If step_time is None, copy all remaining rows.
+
+        Return True if this completes the resync, i.e. the copy is handed to
+        the writer thread to move into place. Return False if the resync is
+        not complete, or if no resync is in progress.
+
+        Raise IOError if rows cannot be copied, in which case the resync is
+        abandoned, and the writer thread resumes with the items it holds.
+
+        """
+        if not self.is_resyncing:
+            return False
+        timeout = None
+        if step_time is not None:
+            timeout = time() + step_time
+        conn = self.resync_conn
+        try:
+            pri_conn = self.resync_pri_dao.connect()
+            while self.resync_tables:
+                item = self.resync_tables[0]
+                name, last_rowid, max_rowid = item
+                columns_str = ", ".join(
+                    ["rowid"] +
+                    [column.name for column in self.tables[name].columns])
+                stmt = "SELECT %s FROM %s WHERE rowid<=?" % (columns_str, name)
+                stmt_args = [max_rowid]
+                if last_rowid is not None:
+                    stmt += " AND rowid>?"
+                    stmt_args.append(last_rowid)
+                stmt += " ORDER BY rowid LIMIT %d" % self.RESYNC_BATCH_SIZE
+                rows = pri_conn.execute(stmt, stmt_args).fetchall()
+                if rows:
+                    conn.executemany(
+                        "INSERT INTO %s(%s) VALUES(%s)" % (
+                            name, columns_str,
+                            ", ".join("?" * len(rows[0]))),
+                        rows)
+                if len(rows) < self.RESYNC_BATCH_SIZE:
+                    self.resync_tables.pop(0)
+                else:
+                    item[1] = rows[-1][0]
+                if (self.resync_tables and timeout is not None and
+                        time() > timeout):
+                    conn.commit()
+                    return False
+            # Indexes are quicker to create after all rows are copied
+            for table in self.tables.values():
+                for stmt in table.get_create_index_stmts():
+                    conn.execute(stmt)
+            conn.commit()
+            conn.execute("PRAGMA journal_mode=%s" % self.journal_mode)
+            conn.close()
+        except sqlite3.Error as exc:
+            temp_file_name = self.resync_file_name
+            self._cancel_resync()
+            raise IOError("%s: %s" % (temp_file_name, exc))
+        temp_file_name = self.resync_file_name
+        self.resync_conn = None
+        self.resync_file_name = None
+        self.resync_pri_dao = None
+        with self.cond:
+            if self.recover_file_name:
+                os.unlink(self.recover_file_name)
+            self.recover_file_name = temp_file_name
+            self.is_resyncing = False
+            self.cond.notify()
+        return True
+
+    def _cancel_resync(self):
+        """Abandon any resync in progress, and remove its temporary file."""
+        if self.resync_conn is not None:
+            try:
+                self.resync_conn.close()
+            except sqlite3.Error:
+                pass
+            self.resync_conn = None
+        self._unlink_temp_file(self.resync_file_name)
+        self.resync_file_name = None
+        self.resync_pri_dao = None
+        self.resync_tables = []
+        with self.cond:
+            if self.is_resyncing:
+                self.is_resyncing = False
+                self.cond.notify()
+
+    def _get_temp_file_name(self):
+        """Create and return a temporary file next to the public database."""
+        return mkstemp(
+            prefix=self.DB_FILE_BASE_NAME,
+            dir=os.path.dirname(self.db_file_name))[1]
+
+    def _set_temp_file_mode(self, temp_file_name):
+        """Give temporary file the same mode as the public database file."""
+        open(self.db_file_name, "a").close()  # touch
+        os.chmod(temp_file_name, os.stat(self.db_file_name).st_mode)
+
+    def _unlink_temp_file(self, temp_file_name):
+        """Remove a temporary file, and any of its journal files."""
+        if temp_file_name:
+            for suffix in self.JOURNAL_SUFFIXES:
+                try:
+                    os.unlink(temp_file_name + suffix)
+                except OSError:
+                    pass
+
+    def _run(self):
+        """Writer thread: write items handed over, until stopped."""
+        unwritten = CylcSuiteDAOQueue(self.tables)
+        retry_time = None
+        while True:
+            with self.cond:
+                while not (
+                        self.stopping or self.recover_file_name or
+                        self.is_discarding or
+                        not self.is_resyncing and (
+                            retry_time is None and self.queue.n_items or
+                            retry_time is not None and
+                            time() >= retry_time)):
+                    if retry_time is None or self.is_resyncing:
+                        self.cond.wait()
+                    else:
+                        self.cond.wait(retry_time - time())
+                stopping = self.stopping
+                if self.is_discarding:
+                    # Unwritten items are in the private database
+                    self.is_discarding = False
+                    unwritten = CylcSuiteDAOQueue(self.tables)
+                    retry_time = None
+                    self.unwritten_n_items = 0
+                    self.unwritten_time = None
+                if self.is_resyncing and not stopping:
+                    # Hold items until the resync is complete
+                    continue
+                recover_file_name = self.recover_file_name
+                self.recover_file_name = None
+                queue = self.queue
+                self.queue = CylcSuiteDAOQueue(self.tables)
+                self.is_writing = True
+            if recover_file_name:
+                # Unwritten items are in the private database copy
+                unwritten = CylcSuiteDAOQueue(self.tables)
+                retry_time = None
+                try:
+                    # Any journal left by readers of the old file is invalid
+                    for suffix in self.JOURNAL_SUFFIXES[1:]:
+                        try:
+                            os.unlink(self.db_file_name + suffix)
+                        except OSError:
+                            pass
+                    os.rename(recover_file_name, self.db_file_name)
+                except OSError as exc:
+                    ERR.warning("%s: cannot recover: %s\n" % (
+                        self.db_file_name, exc))
+                    try:
+                        os.unlink(recover_file_name)
+                    except OSError:
+                        pass
+                else:
+                    self.n_tries = 0
+            unwritten.extend(queue)
+            if unwritten.n_items:
+                if self._execute_stmts(unwritten.get_stmts()):
+                    unwritten = CylcSuiteDAOQueue(self.tables)
+                    retry_time = None
+                else:
+                    retry_time = time() + self.RETRY_DELAY
+            with self.cond:
+                if self.recover_file_name is None:
+                    self.unwritten_n_items = unwritten.n_items
+                    self.unwritten_time = unwritten.time
+                self.is_writing = False
+            if stopping:
+                return
+
+
+class CylcSuiteDBArchiver(object):
+    """Move old history of a suite into archive database files.
+
+    The task_events, task_jobs and broadcast_events tables would otherwise
+    grow for the life of the suite. Rows older than a retention interval are
+    copied from the private database into files named after the month of
+    their time, "YYYY-MM.db", in a "db-archive" directory next to the public
+    database. They are then deleted from the private and public databases,
+    with the usual queued items, so these remain the same.
+
+    Each call to "archive" only moves a batch of rows of each table, so the
+    main loop can carry on in between. When there is nothing left to move, it
+    does nothing until PASS_DELAY seconds later.
+
+    Rows of task_jobs are only archived for tasks that are no longer in the
+    task pool, as a restart needs the jobs of tasks in the pool.
+
+    CylcSuiteDAO.select_history and the other readers of the archive files
+    look for them next to their database file.
+
+    """
+
+    ARCHIVE_FILE_EXT = ".db"
+    # Maximum number of rows to archive in each table per call
+    BATCH_SIZE = 1000
+    # Delay between archiving passes (seconds)
+    PASS_DELAY = 600.0
+    # [(table_name, time_column_name), ...]
+    TABLES = [
+        (CylcSuiteDAO.TABLE_BROADCAST_EVENTS, "time"),
+        (CylcSuiteDAO.TABLE_TASK_EVENTS, "time"),
+        (CylcSuiteDAO.TABLE_TASK_JOBS, "time_submit"),
+    ]
+
+    def __init__(self, pri_dao, pub_dao):
+        self.pri_dao = pri_dao
+        self.pub_dao = pub_dao
+        self.archive_dir = os.path.join(
+            os.path.dirname(pub_dao.db_file_name),
+            CylcSuiteDAO.ARCHIVE_DIR_BASE_NAME)
+        self.next_pass_time = None
+
+    def archive(self, retention):
+        """Archive a batch of rows older than retention seconds, if due.
+
+        Archived rows are queued for deletion in the private and public
+        databases. The private database must then execute its queued items
+        before the next call.
+
+        Return the number of rows archived.
+
+        """
+        now = time()
+        if self.next_pass_time is not None and now < self.next_pass_time:
+            return 0
+        cutoff = get_time_string_from_unix_time(now - retention)
+        n_rows = 0
+        try:
+            for table_name, time_key in self.TABLES:
+                n_rows += self._archive_table(table_name, time_key, cutoff)
+        except (IOError, OSError, sqlite3.Error) as exc:
+            # E.g. archive file locked by a reader, try again later
+            LOG.warning("%s: cannot archive: %s" % (self.archive_dir, exc))
+            n_rows = 0
+        if not n_rows:
+            self.next_pass_time = now + self.PASS_DELAY
+        return n_rows
+
+    def _archive_table(self, table_name, time_key, cutoff):
+        """Archive a batch of rows of a table, with time_key before cutoff.
+
+        Return the number of rows archived.
+
+        """
+        table = self.pri_dao.tables[table_name]
+        column_names = [column.name for column in table.columns]
+        time_index = 1 + column_names.index(time_key)
+        columns_str = ", ".join(["rowid"] + column_names)
+        stmt = r"SELECT %s FROM %s WHERE %s<?" % (
+            columns_str, table_name, time_key)
+        if table_name == CylcSuiteDAO.TABLE_TASK_JOBS:
+            stmt += (
+                r" AND NOT EXISTS (SELECT 1 FROM %(task_pool)s" +
+                r" WHERE %(task_pool)s.cycle==%(task_jobs)s.cycle" +
+                r" AND %(task_pool)s.name==%(task_jobs)s.name)") % {
+                    "task_pool": CylcSuiteDAO.TABLE_TASK_POOL,
+                    "task_jobs": table_name}
+        stmt += r" ORDER BY %s LIMIT %d" % (time_key, self.BATCH_SIZE)
+        pri_conn = self.pri_dao.connect()
+        rows = pri_conn.execute(stmt, [cutoff]).fetchall()
+        if not rows:
+            return 0
+        key_names = [
+            column.name for column in table.columns if column.is_primary_key]
+        if not key_names:
+            # Rows are deleted by time, so all rows with the last time of the
+            # batch must be archived with it.
+            key_names = [time_key]
+            if len(rows) == self.BATCH_SIZE:
+                rowids = set(row[0] for row in rows)
+                for row in pri_conn.execute(
+                        r"SELECT %s FROM %s WHERE %s==?" % (
+                            columns_str, table_name, time_key),
+                        [rows[-1][time_index]]):
+                    if row[0] not in rowids:
+                        rows.append(row)
+        period_rows = {}
+        for row in rows:
+            period = str(row[time_index])[0:7]  # YYYY-MM
+            period_rows.setdefault(period, [])
+            period_rows[period].append(row)
+        for period, rows_of_period in sorted(period_rows.items()):
+            self._write_archive(
+                period, table, [row[1:] for row in rows_of_period])
+        where_values_set = set()
+        for row in rows:
+            where_values_set.add(tuple(
+                row[1 + column_names.index(key)] for key in key_names))
+        for where_values in sorted(where_values_set):
+            where_args = dict(zip(key_names, where_values))
+            for dao in self.pri_dao, self.pub_dao:
+                dao.add_delete_item(table_name, where_args)
+        return len(rows)
+
+    def _write_archive(self, period, table, rows):
+        """Write rows of a table to archive of period.
+
+        Rows are inserted without the rowid of the private database, which
+        SQLite reuses once a table has been emptied. If rows are written
+        again (e.g. if the suite dies before they are deleted), they replace
+        the earlier copy with the same primary key, or are skipped if the
+        table has no primary key and an identical row exists.
+
+        """
+        if not os.path.isdir(self.archive_dir):
+            os.makedirs(self.archive_dir)
+        conn = sqlite3.connect(
+            os.path.join(self.archive_dir, period + self.ARCHIVE_FILE_EXT),
+            CylcSuiteDAO.CONN_TIMEOUT)
+        try:
+            names = [row[0] for row in conn.execute(
+                r"SELECT name FROM sqlite_master WHERE type==?", ["table"])]
+            # Create all archived tables, for readers of any archive file
+            for name, _ in self.TABLES:
+                if name not in names:
+                    archive_table = self.pri_dao.tables[name]
+                    conn.execute(archive_table.get_create_stmt())
+                    for stmt in archive_table.get_create_index_stmts():
+                        conn.execute(stmt)
+            column_names = [column.name for column in table.columns]
+            values_str = ", ".join("?" * len(column_names))
+            if any(column.is_primary_key for column in table.columns):
+                conn.executemany(
+                    r"INSERT OR REPLACE INTO %s(%s) VALUES(%s)" % (
+                        table.name, ", ".join(column_names), values_str),
+                    rows)
+            else:
+                conn.executemany(
+                    (r"INSERT INTO %s(%s) SELECT %s" +
+                     r" WHERE NOT EXISTS (SELECT 1 FROM %s WHERE %s)") % (
+                        table.name, ", ".join(column_names), values_str,
+                        table.name,
+                        " AND ".join(
+                            "%s IS ?" % name for name in column_names)),
+                    [list(row) + list(row) for row in rows])
+            conn.commit()
+        finally:
+            conn.close()
+
+
+class TestCylcSuiteDAOQueue(unittest.TestCase):
+    """Unit tests for CylcSuiteDAOQueue."""
+
+    def setUp(self):
+        self.dao = CylcSuiteDAO.__new__(CylcSuiteDAO)
+        self.dao.tables = {}
+        for name, attrs in CylcSuiteDAO.TABLES_ATTRS.items():
+            self.dao.tables[name] = CylcSuiteDAOTable(name, attrs)
+        self.queue = CylcSuiteDAOQueue(self.dao.tables)
+
+    def _add_queued(self):
+        """Add items queued in self.dao to self.queue."""
+        for name, table in self.dao.tables.items():
+            for stmt, stmt_args_list in table.get_queued_stmts():
+                for stmt_args in stmt_args_list:
+                    self.queue.add(name, stmt, stmt_args)
+            table.clear_queues()
+
+    def test_delete_all(self):
+        """Test DELETE of all rows supersedes earlier items."""
+        self.dao.add_delete_item(CylcSuiteDAO.TABLE_TASK_POOL)
+        self.dao.add_insert_item(
+            CylcSuiteDAO.TABLE_TASK_POOL, ["1", "foo", 0, "running"])
+        self._add_queued()
+        self.dao.add_delete_item(CylcSuiteDAO.TABLE_TASK_POOL)
+        self.dao.add_insert_item(
+            CylcSuiteDAO.TABLE_TASK_POOL, ["1", "bar", 0, "waiting"])
+        self.dao.add_delete_item(
+            CylcSuiteDAO.TABLE_TASK_EVENTS, {"name": "foo"})
+        self._add_queued()
+        self.assertEqual(3, self.queue.n_items)
+        stmts = self.queue.get_stmts()
+        self.assertEqual(3, len(stmts))
+        self.assertTrue(
+            ("DELETE FROM task_events WHERE name==?", [["foo"]]) in stmts)
+        index = stmts.index(("DELETE FROM task_pool", [[]]))
+        self.assertEqual(
+            ("INSERT OR REPLACE INTO task_pool VALUES(?, ?, ?, ?, ?)",
+             [["1", "bar", 0, "waiting", None]]),
+            stmts[index + 1])
+
+    def test_insert(self):
+        """Test INSERT supersedes earlier INSERT of same primary key."""
+        for status in "submitted", "running":
+            self.dao.add_insert_item(
+                CylcSuiteDAO.TABLE_TASK_STATES,
+                {"name": "foo", "cycle": "1", "status": status})
+            self.dao.add_insert_item(
+                CylcSuiteDAO.TABLE_TASK_EVENTS,
+                {"name": "foo", "cycle": "1", "event": status})
+            self._add_queued()
+        self.assertEqual(3, self.queue.n_items)
+        stmts = dict(self.queue.get_stmts())
+        self.assertEqual(2, len(stmts[
+            self.dao.tables[CylcSuiteDAO.TABLE_TASK_EVENTS].get_insert_stmt()
+        ]))
+        self.assertEqual(
+            [["foo", "1", None, None, None, "running"]],
+            stmts[
+                self.dao.tables[
+                    CylcSuiteDAO.TABLE_TASK_STATES].get_insert_stmt()])
+
+    def test_update(self):
+        """Test UPDATE supersedes earlier UPDATE, unless WHERE is changed."""
+        where_args = {"name": "foo", "cycle": "1", "submit_num": 1}
+        for status in "submitted", "running":
+            self.dao.add_update_item(
+                CylcSuiteDAO.TABLE_TASK_STATES, {"status": status},
+                where_args)
+            self._add_queued()
+        self.assertEqual(1, self.queue.n_items)
+        self.assertEqual(
+            [("UPDATE task_states SET status=? " +
+              "WHERE name==? AND cycle==? AND submit_num==?",
+              [["running", "foo", "1", 1]])],
+            self.queue.get_stmts())
+        # UPDATE that sets a WHERE column in between
+        self.dao.add_update_item(
+            CylcSuiteDAO.TABLE_TASK_STATES,
+            {"submit_num": 2}, {"name": "foo", "cycle": "1"})
+        self.dao.add_update_item(
+            CylcSuiteDAO.TABLE_TASK_STATES, {"status": "failed"},
+            where_args)
+        self._add_queued()
+        self.assertEqual(3, self.queue.n_items)
+
+    def test_extend(self):
+        """Test extend coalesces items, and keeps time of oldest item."""
+        self.dao.add_delete_item(CylcSuiteDAO.TABLE_TASK_POOL)
+        self._add_queued()
+        self.queue.time -= 10.0
+        old_queue = self.queue
+        self.queue = CylcSuiteDAOQueue(self.dao.tables)
+        self.dao.add_delete_item(CylcSuiteDAO.TABLE_TASK_POOL)
+        self._add_queued()
+        old_queue.extend(self.queue)
+        self.assertEqual(1, old_queue.n_items)
+        self.assertTrue(old_queue.time < self.queue.time)
+
+
+class TestCylcSuiteDAO(unittest.TestCase):
+    """Unit tests for CylcSuiteDAO connections."""
+
+    def setUp(self):
+        from tempfile import mkdtemp
+        self.temp_dir = mkdtemp()
+        self.db_file_name = os.path.join(self.temp_dir, "db")
+
+    def tearDown(self):
+        from shutil import rmtree
+        rmtree(self.temp_dir)
+
+    @staticmethod
+    def _put_task_state(dao, status):
+        """Add and execute an insert to task_states."""
+        dao.add_insert_item(
+            CylcSuiteDAO.TABLE_TASK_STATES,
+            {"name": "foo", "cycle": "1", "status": status})
+        dao.execute_queued_items()
+
+    def test_not_persistent(self):
+        """Test connection is closed after each write."""
+        dao = CylcSuiteDAO(self.db_file_name)
+        self._put_task_state(dao, "running")
+        self.assertTrue(dao.conn is None)
+
+    def test_persistent(self):
+        """Test connection is kept, with pragmas, until file is removed."""
+        dao = CylcSuiteDAO(
+            self.db_file_name, is_persistent=True,
+            pragmas=[("journal_mode", "WAL"), ("synchronous", "NORMAL")])
+        self._put_task_state(dao, "running")
+        conn = dao.conn
+        self._put_task_state(dao, "succeeded")
+        self.assertTrue(conn is dao.conn)
+        self.assertEqual(
+            [("wal",)], list(conn.execute("PRAGMA journal_mode")))
+        self.assertEqual([(1,)], list(conn.execute("PRAGMA synchronous")))
+        for suffix in "", "-wal", "-shm":
+            os.unlink(self.db_file_name + suffix)
+        self.assertRaises(
+            sqlite3.Error, self._put_task_state, dao, "failed")
+        dao.close()
+
+    def test_query_plans(self):
+        """Test frequent queries use indexes, instead of full table scans."""
+        from cylc.dbstatecheck import CylcSuiteDBChecker
+
+        class _QueryPlanRecorder(object):
+            """Record query plan of each statement, before executing it."""
+
+            def __init__(self, target):
+                self.target = target
+                self.plans = []
+
+            def execute(self, stmt, stmt_args=None):
+                stmt_args = stmt_args or []
+                self.plans.append(" ".join(
+                    row[-1] for row in self.target.execute(
+                        "EXPLAIN QUERY PLAN " + stmt, stmt_args)))
+                return self.target.execute(stmt, stmt_args)
+
+            def __getattr__(self, name):
+                return getattr(self.target, name)
+
+        os.mkdir(os.path.join(self.temp_dir, "log"))
+        dao = CylcSuiteDAO(os.path.join(self.temp_dir, "log", "db"))
+        dao_recorder = _QueryPlanRecorder(dao.connect())
+        dao.conn = dao_recorder
+        dao.select_task_job(None, "1", "foo")
+        dao.select_task_job(None, "1", "foo", 1)
+        dao.select_task_states_by_task_ids(None, [["foo", "1"], ["bar", "1"]])
+        checker = CylcSuiteDBChecker(*os.path.split(self.temp_dir))
+        checker_recorder = _QueryPlanRecorder(checker.c)
+        checker.c = checker_recorder
+        checker.task_state_met("foo", "1", "succeeded")
+        checker.task_state_met("foo", "1", "x", check_message=True)
+        checker.suite_state_query(cycle="1")
+        checker.suite_state_query(status="fail")
+        dao.close()
+        checker.conn.close()
+        for plans, index_names in [
+                (dao_recorder.plans, [
+                    "sqlite_autoindex_task_jobs_1",
+                    "sqlite_autoindex_task_jobs_1",
+                    "sqlite_autoindex_task_states_1"]),
+                (checker_recorder.plans, [
+                    "sqlite_autoindex_task_states_1",
+                    "task_events_name_cycle",
+                    "task_states_cycle",
+                    "task_states_status"])]:
+            self.assertEqual(len(index_names), len(plans))
+            for plan, index_name in zip(plans, index_names):
+                self.assertTrue(
+                    "INDEX " + index_name in plan and "SCAN" not in plan,
+                    plan)
+
+    def test_upgrade_pickle_to_json(self):
+        """Test upgrade of task_action_timers table with pickle columns."""
+        from cylc.task_proxy import CustomTaskEventHandlerContext
+        conn = sqlite3.connect(self.db_file_name)
+        conn.execute(
+            r"CREATE TABLE task_action_timers(cycle TEXT, name TEXT," +
+            r" ctx_key_pickle TEXT, ctx_pickle TEXT, delays_pickle TEXT," +
+            r" num INTEGER, delay TEXT, timeout TEXT," +
+            r" PRIMARY KEY(cycle, name, ctx_key_pickle))")
+        ctx_key = (("event-handler-00", "failed"), 1)
+        ctx = CustomTaskEventHandlerContext(
+            ("event-handler-00", "failed"), "event-handler", "echo hello")
+        for cycle, ctx_key_pickle, ctx_pickle, delays_pickle in [
+                ("1", cPickle.dumps(("try_timers", "execution")),
+                 cPickle.dumps(None), cPickle.dumps([60.0, 120.0])),
+                ("1", cPickle.dumps(ctx_key), cPickle.dumps(ctx),
+                 cPickle.dumps([0.0])),
+                ("2", cPickle.dumps("junk"), "junk", "junk")]:
+            conn.execute(
+                r"INSERT INTO task_action_timers VALUES(?,?,?,?,?,?,?,?)",
+                [cycle, "foo", ctx_key_pickle, ctx_pickle, delays_pickle, 1,
+                 60.0, 1000000000.0])
+        conn.commit()
+        conn.close()
+        dao = CylcSuiteDAO(self.db_file_name)
+        dao.upgrade_pickle_to_json()
+        rows = []
+        dao.select_task_action_timers(
+            lambda row_idx, row: rows.append(tuple(row)))
+        self.assertEqual(
+            [
+                ("1", "foo", '["try_timers","execution"]', None, None,
+                 "[60.0,120.0]", 1, 60.0, 1000000000.0),
+                ("1", "foo", '[["event-handler-00","failed"],1]',
+                 "event-handler",
+                 '{"key":["event-handler-00","failed"],"cmd":"echo hello"}',
+                 "[0.0]", 1, 60.0, 1000000000.0),
+            ],
+            sorted(rows))
+        # Upgrade again should do nothing
+        dao.upgrade_pickle_to_json()
+        dao.close()
+
+    def test_task_action_timer_db_values(self):
+        """Test task action timers and keys load as they were dumped."""
+        from cylc.task_proxy import (
+            CustomTaskEventHandlerContext, TaskActionTimer, dump_json_value,
+            load_json_value)
+        ctx_key = (("event-handler-00", "failed"), 1)
+        self.assertEqual(ctx_key, load_json_value(dump_json_value(ctx_key)))
+        self.assertEqual(
+            str, type(load_json_value(dump_json_value(ctx_key))[0][0]))
+        timer = TaskActionTimer(
+            CustomTaskEventHandlerContext(
+                ("event-handler-00", "failed"), "event-handler", "echo hi"),
+            [0, 30], 1, 30, 1000000000.0)
+        values = timer.get_db_values()
+        timer2 = TaskActionTimer.from_db_values(
+            values["ctx_type"], values["ctx_args"], values["delays"],
+            values["num"], values["delay"], values["timeout"])
+        self.assertEqual(timer.ctx, timer2.ctx)
+        self.assertEqual(
+            [timer.delays, timer.num, timer.delay, timer.timeout],
+            [timer2.delays, timer2.num, timer2.delay, timer2.timeout])
+        for bad_str in ['', ' [1]', '[1] ', '[1]junk', '[1']:
+            self.assertRaises(ValueError, load_json_value, bad_str)
+
+
+class TestCylcSuitePubDAO(unittest.TestCase):
+    """Unit tests for CylcSuitePubDAO."""
+
+    def setUp(self):
+        from tempfile import mkdtemp
+        self.temp_dir = mkdtemp()
+        self.pri_dao = CylcSuiteDAO(os.path.join(self.temp_dir, "pri.db"))
+        self.pub_dao = CylcSuitePubDAO(
+            os.path.join(self.temp_dir, "pub.db"), max_lag=0.5)
+        self.pub_dao.RETRY_DELAY = 0.1
+        self.pub_dao.recover(self.pri_dao)
+
+    def tearDown(self):
+        from shutil import rmtree
+        self.pub_dao.close()
+        rmtree(self.temp_dir)
+
+    def _put_task_state(self, name, status):
+        """Add and execute an insert to task_states in both databases."""
+        for dao in self.pri_dao, self.pub_dao:
+            dao.add_insert_item(
+                CylcSuiteDAO.TABLE_TASK_STATES,
+                {"name": name, "cycle": "1", "status": status})
+            dao.execute_queued_items()
+
+    def _get_task_states(self, timeout=5.0):
+        """Wait for writer, and return rows in task_states of public db."""
+        timeout += time()
+        while time() < timeout:
+            if self.pub_dao.is_up_to_date():
+                break
+            threading.Event().wait(0.05)
+        conn = sqlite3.connect(self.pub_dao.db_file_name)
+        try:
+            return list(conn.execute(
+                "SELECT name, status FROM task_states ORDER BY name"))
+        finally:
+            conn.close()
+
+    def test_write(self):
+        """Test items are written by the writer thread."""
+        self._put_task_state("foo", "running")
+        self.assertEqual([("foo", "running")], self._get_task_states())
+        self.assertFalse(self.pub_dao.is_stuck())
+
+    def test_locked(self):
+        """Test main thread not held up by locked database, and recovery."""
+        self._get_task_states()
+        conn = sqlite3.connect(self.pub_dao.db_file_name)
+        conn.execute("BEGIN EXCLUSIVE")
+        try:
+            start = time()
+            for status in "submitted", "running", "succeeded":
+                self._put_task_state("foo", status)
+            self.assertTrue(time() - start < CylcSuiteDAO.CONN_TIMEOUT)
+            threading.Event().wait(self.pub_dao.max_lag + 0.5)
+            self.assertTrue(self.pub_dao.n_tries > 0)
+            self.assertTrue(self.pub_dao.is_stuck())
+        finally:
+            conn.rollback()
+            conn.close()
+        # Writer catches up when database is no longer locked
+        self.assertEqual([("foo", "succeeded")], self._get_task_states())
+        self.assertFalse(self.pub_dao.is_stuck())
+        # Recover from private database, which has later items
+        self.pri_dao.add_insert_item(
+            CylcSuiteDAO.TABLE_TASK_STATES,
+            {"name": "bar", "cycle": "1", "status": "waiting"})
+        self.pri_dao.execute_queued_items()
+        self.pub_dao.recover(self.pri_dao)
+        self.assertEqual(
+            [("bar", "waiting"), ("foo", "succeeded")],
+            self._get_task_states())
+
+    def test_resync(self):
+        """Test incremental resync, with items handed over in the middle."""
+        self.pub_dao.RESYNC_BATCH_SIZE = 2
+        for name in "abcde":
+            self._put_task_state(name, "waiting")
+        self._get_task_states()
+        # Lose an item in the public database only
+        self.pri_dao.add_insert_item(
+            CylcSuiteDAO.TABLE_TASK_STATES,
+            {"name": "f", "cycle": "1", "status": "waiting"})
+        self.pri_dao.execute_queued_items()
+        self.pub_dao.resync(self.pri_dao)
+        self.assertTrue(self.pub_dao.is_resyncing)
+        self.assertFalse(self.pub_dao.is_stuck())
+        self.assertFalse(self.pub_dao.resync_step(0))
+        # Items handed over during the resync, changing rows before and after
+        # those already copied
+        self._put_task_state("a", "running")
+        self._put_task_state("e", "running")
+        self._put_task_state("g", "waiting")
+        for dao in self.pri_dao, self.pub_dao:
+            dao.add_delete_item(CylcSuiteDAO.TABLE_TASK_STATES, {"name": "c"})
+            dao.execute_queued_items()
+        with self.pub_dao.cond:
+            self.assertEqual(4, self.pub_dao.queue.n_items)
+        n_steps = 1
+        while not self.pub_dao.resync_step(0):
+            n_steps += 1
+        self.assertTrue(n_steps > 1)
+        self.assertFalse(self.pub_dao.is_resyncing)
+        self.assertFalse(self.pub_dao.resync_step())
+        expected = [
+            ("a", "running"), ("b", "waiting"), ("d", "waiting"),
+            ("e", "running"), ("f", "waiting"), ("g", "waiting")]
+        self.assertEqual(expected, self._get_task_states())
+        conn = sqlite3.connect(self.pri_dao.db_file_name)
+        try:
+            self.assertEqual(expected, list(conn.execute(
+                "SELECT name, status FROM task_states ORDER BY name")))
+        finally:
+            conn.close()
+        # No temporary file left behind
+        self.assertEqual([], glob(os.path.join(
+            self.temp_dir, CylcSuiteDAO.DB_FILE_BASE_NAME + "*")))
+
+    def test_resync_on_close(self):
+        """Test resync in progress is completed on close."""
+        self.pub_dao.RESYNC_BATCH_SIZE = 1
+        self._put_task_state("foo", "waiting")
+        self._put_task_state("bar", "waiting")
+        self.pub_dao.resync(self.pri_dao)
+        self._put_task_state("foo", "running")
+        self.pub_dao.close()
+        self.assertEqual(
+            [("bar", "waiting"), ("foo", "running")],
+            self._get_task_states())
+
+    def test_recover_wal(self):
+        """Test recover from private database in WAL journal mode."""
+        self.pri_dao = CylcSuiteDAO(
+            os.path.join(self.temp_dir, "pri-wal.db"), is_persistent=True,
+            pragmas=[("journal_mode", "WAL")])
+        self._put_task_state("foo", "running")
+        self.pub_dao.recover(self.pri_dao)
+        self.assertEqual([("foo", "running")], self._get_task_states())
+        conn = sqlite3.connect(self.pub_dao.db_file_name)
+        try:
+            self.assertEqual(
+                [("delete",)], list(conn.execute("PRAGMA journal_mode")))
+        finally:
+            conn.close()
+        self.pri_dao.close()
+
+
+class TestCylcSuiteDBArchiver(unittest.TestCase):
+    """Unit tests for CylcSuiteDBArchiver and reading of archives."""
+
+    def setUp(self):
+        from tempfile import mkdtemp
+        self.temp_dir = mkdtemp()
+        os.mkdir(os.path.join(self.temp_dir, "log"))
+        self.pri_dao = CylcSuiteDAO(os.path.join(self.temp_dir, "pri.db"))
+        self.pub_dao = CylcSuitePubDAO(
+            os.path.join(self.temp_dir, "log", CylcSuiteDAO.DB_FILE_BASE_NAME))
+        self.pub_dao.recover(self.pri_dao)
+        self.archiver = CylcSuiteDBArchiver(self.pri_dao, self.pub_dao)
+        self.archiver.BATCH_SIZE = 2
+        now = get_current_time_string()
+        for table_name, args in [
+                (CylcSuiteDAO.TABLE_BROADCAST_EVENTS, {
+                    "time": "2000-01-02T00:00:00Z", "change": "+"}),
+                (CylcSuiteDAO.TABLE_TASK_EVENTS, {
+                    "name": "foo", "cycle": "1", "submit_num": 1,
+                    "time": "2000-01-31T00:00:00Z", "event": "submitted"}),
+                (CylcSuiteDAO.TABLE_TASK_EVENTS, {
+                    "name": "foo", "cycle": "1", "submit_num": 1,
+                    "time": "2000-01-31T00:00:00Z", "event": "started"}),
+                (CylcSuiteDAO.TABLE_TASK_EVENTS, {
+                    "name": "foo", "cycle": "1", "submit_num": 1,
+                    "time": "2000-01-31T00:00:00Z", "event": "message normal",
+                    "message": "hello"}),
+                (CylcSuiteDAO.TABLE_TASK_EVENTS, {
+                    "name": "foo", "cycle": "1", "submit_num": 1,
+                    "time": "2000-02-01T00:00:00Z", "event": "succeeded"}),
+                (CylcSuiteDAO.TABLE_TASK_EVENTS, {
+                    "name": "foo", "cycle": "2", "submit_num": 1,
+                    "time": now, "event": "submitted"}),
+                (CylcSuiteDAO.TABLE_TASK_JOBS, {
+                    "cycle": "1", "name": "foo", "submit_num": 1,
+                    "time_submit": "2000-01-31T00:00:00Z",
+                    "user_at_host": "me@old"}),
+                (CylcSuiteDAO.TABLE_TASK_JOBS, {
+                    "cycle": "1", "name": "bar", "submit_num": 1,
+                    "time_submit": "2000-01-31T00:00:00Z"}),
+                (CylcSuiteDAO.TABLE_TASK_JOBS, {
+                    "cycle": "2", "name": "foo", "submit_num": 1,
+                    "time_submit": now, "user_at_host": "me@new"}),
+                (CylcSuiteDAO.TABLE_TASK_POOL, {
+                    "cycle": "1", "name": "bar", "status": "failed"})]:
+            for dao in self.pri_dao, self.pub_dao:
+                dao.add_insert_item(table_name, args)
+        self._execute_queued_items()
+
+    def tearDown(self):
+        from shutil import rmtree
+        self.pub_dao.close()
+        rmtree(self.temp_dir)
+
+    def _execute_queued_items(self, timeout=5.0):
+        """Execute queued items in both databases, and wait for writer."""
+        self.pri_dao.execute_queued_items()
+        self.pub_dao.execute_queued_items()
+        timeout += time()
+        while time() < timeout:
+            if self.pub_dao.is_up_to_date():
+                break
+            threading.Event().wait(0.05)
+
+    @staticmethod
+    def _select(db_file_name, stmt):
+        """Return rows of stmt in db_file_name."""
+        conn = sqlite3.connect(db_file_name)
+        try:
+            return list(conn.execute(stmt))
+        finally:
+            conn.close()
+
+    def test_archive(self):
+        """Test old rows are moved to archives, in batches."""
+        n_calls = 0
+        while self.archiver.archive(86400.0):
+            n_calls += 1
+            self._execute_queued_items()
+        # 1st batch of task_events is all 3 rows at the same time
+        self.assertEqual(2, n_calls)
+        # Not due for another pass
+        self.assertEqual(0, self.archiver.archive(0.0))
+        for dao in self.pri_dao, self.pub_dao:
+            self.assertEqual(
+                [(u"foo", u"2", u"submitted")],
+                self._select(
+                    dao.db_file_name,
+                    "SELECT name, cycle, event FROM task_events"))
+            self.assertEqual(
+                [(u"1", u"bar"), (u"2", u"foo")],
+                self._select(
+                    dao.db_file_name,
+                    "SELECT cycle, name FROM task_jobs ORDER BY cycle"))
+            self.assertEqual(
+                [],
+                self._select(
+                    dao.db_file_name, "SELECT time FROM broadcast_events"))
+        file_names = CylcSuiteDAO.get_archive_file_names(
+            self.pub_dao.db_file_name)
+        self.assertEqual(
+            ["2000-01.db", "2000-02.db"],
+            [os.path.basename(file_name) for file_name in file_names])
+        self.assertEqual(
+            [(1, 3, 1), (0, 1, 0)],
+            [self._select(file_name, (
+                "SELECT" +
+                " (SELECT COUNT(*) FROM broadcast_events)," +
+                " (SELECT COUNT(*) FROM task_events)," +
+                " (SELECT COUNT(*) FROM task_jobs)"))[0]
+             for file_name in file_names])
+
+    def test_archive_after_empty(self):
+        """Test rows archived after a table is emptied keep earlier rows.
+
+        SQLite reuses rowids once a table is empty, so archived rows must
+        not be keyed by rowid.
+        """
+        while self.archiver.archive(86400.0):
+            self._execute_queued_items()
+        for dao in self.pri_dao, self.pub_dao:
+            dao.add_delete_item(CylcSuiteDAO.TABLE_TASK_EVENTS)
+            dao.add_insert_item(CylcSuiteDAO.TABLE_TASK_EVENTS, {
+                "name": "bar", "cycle": "1", "submit_num": 1,
+                "time": "2000-01-15T00:00:00Z", "event": "submitted"})
+        self._execute_queued_items()
+        self.archiver.next_pass_time = None
+        while self.archiver.archive(86400.0):
+            self._execute_queued_items()
+        file_name = CylcSuiteDAO.get_archive_file_names(
+            self.pub_dao.db_file_name)[0]
+        self.assertEqual(
+            [(u"bar", u"submitted"), (u"foo", u"message normal"),
+             (u"foo", u"started"), (u"foo", u"submitted")],
+            self._select(
+                file_name,
+                "SELECT name, event FROM task_events ORDER BY name, event"))
+
+    def test_archive_again(self):
+        """Test rows written to archives again are not duplicated."""
+        rows = self.pri_dao.connect().execute(
+            "SELECT rowid, * FROM task_events WHERE time<?",
+            ["2000-02"]).fetchall()
+        job_rows = self.pri_dao.connect().execute(
+            "SELECT rowid, * FROM task_jobs WHERE time_submit<?",
+            ["2000-02"]).fetchall()
+        while self.archiver.archive(86400.0):
+            self._execute_queued_items()
+        # As if the suite died before the rows were deleted
+        self.archiver._archive_table("task_events", "time", "2000-02")
+        for table_name, table_rows in [
+                (CylcSuiteDAO.TABLE_TASK_EVENTS, rows),
+                (CylcSuiteDAO.TABLE_TASK_JOBS, job_rows)]:
+            self.archiver._write_archive(
+                "2000-01", self.pri_dao.tables[table_name],
+                [row[1:] for row in table_rows])
+        file_name = CylcSuiteDAO.get_archive_file_names(
+            self.pub_dao.db_file_name)[0]
+        self.assertEqual(
+            [(3, 2)],
+            self._select(file_name, (
+                "SELECT" +
+                " (SELECT COUNT(*) FROM task_events)," +
+                " (SELECT COUNT(*) FROM task_jobs)")))
+
+    def test_select(self):
+        """Test reading of history spans archives and live database."""
+        while self.archiver.archive(86400.0):
+            self._execute_queued_items()
+        # Read as "cylc cat-log" does, not via the connection of the writer
+        # thread of the public database.
+        dao = CylcSuiteDAO(self.pub_dao.db_file_name, is_public=True)
+        try:
+            self.assertEqual(
+                [u"submitted", u"started", u"message normal", u"succeeded",
+                 u"submitted"],
+                [row[0] for row in dao.select_history(
+                    "SELECT event FROM task_events")])
+            self.assertEqual(
+                {"user_at_host": u"me@old"},
+                dao.select_task_job(["user_at_host"], "1", "foo"))
+            self.assertEqual(
+                {"user_at_host": u"me@new"},
+                dao.select_task_job(["user_at_host"], "2", "foo", 1))
+            self.assertEqual(
+                None, dao.select_task_job(["user_at_host"], "3", "foo"))
+        finally:
+            dao.close()
+        from cylc.dbstatecheck import CylcSuiteDBChecker
+        checker = CylcSuiteDBChecker(*os.path.split(self.temp_dir))
+        try:
+            self.assertTrue(checker.task_state_met(
+                "foo", "1", "hello", check_message=True))
+            self.assertFalse(checker.task_state_met(
+                "foo", "1", "bye", check_message=True))
+        finally:
+            checker.conn.close()
+
+
+def benchmark_task_action_timers(num_timers=20000):
+    """Time dumping and loading task action timers, as pickles and as JSON.
+
+    Half of the timers are custom event handler timers, and half are poll
+    timers. The pickle columns are dumped with pickle.dumps and loaded with
+    cPickle.loads, as before the task_action_timers table had JSON columns.
+
+    Return {"pickle": (dump_time, load_time, size), "json": (...)}, where
+    times are in seconds and size is the total length of the dumped columns.
+
+    """
+    import pickle
+    import timeit
+    from cylc.task_proxy import (
+        CustomTaskEventHandlerContext, TaskActionTimer, dump_json_value,
+        load_json_value)
+    items = []
+    for i in range(num_timers // 2):
+        key1 = ("event-handler-00", "succeeded")
+        items.append(((key1, 1), TaskActionTimer(
+            CustomTaskEventHandlerContext(
+                key1, "event-handler",
+                "echo 'succeeded' 'suite' 'foo.%d' 'job succeeded'" % i),
+            [0.0, 30.0, 60.0])))
+        items.append((("poll_timers", "execution"), TaskActionTimer(
+            None, [60.0, 120.0, 300.0], 2, 120.0, 1000000000.0 + i)))
+
+    def dump_pickle():
+        """Return rows of the old columns."""
+        return [
+            (pickle.dumps(ctx_key), pickle.dumps(timer.ctx),
+             pickle.dumps(timer.delays), timer.num, timer.delay,
+             timer.timeout)
+            for ctx_key, timer in items]
+
+    def load_pickle(rows):
+        """Load rows of the old columns."""
+        for ctx_key_pickle, ctx_pickle, delays_pickle, num, delay, timeout in (
+                rows):
+            cPickle.loads(ctx_key_pickle)
+            TaskActionTimer(
+                cPickle.loads(ctx_pickle), cPickle.loads(delays_pickle), num,
+                delay, timeout)
+
+    def dump_json():
+        """Return rows of the new columns."""
+        rows = []
+        for ctx_key, timer in items:
+            values = timer.get_db_values()
+            rows.append((
+                dump_json_value(ctx_key), values["ctx_type"],
+                values["ctx_args"], values["delays"], values["num"],
+                values["delay"], values["timeout"]))
+        return rows
+
+    def load_json(rows):
+        """Load rows of the new columns."""
+        for row in rows:
+            load_json_value(row[0])
+            TaskActionTimer.from_db_values(*row[1:])
+
+    results = {}
+    for name, dump, load, num_dumped in [
+            ("pickle", dump_pickle, load_pickle, 3),
+            ("json", dump_json, load_json, 4)]:
+        rows = dump()
+        size = sum(
+            len(value) for row in rows for value in row[0:num_dumped]
+            if value is not None)
+        results[name] = (
+            min(timeit.repeat(dump, repeat=3, number=1)),
+            min(timeit.repeat(lambda: load(rows), repeat=3, number=1)),
+            size)
+    return results
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ["benchmark"]:
+        for name, (dump_time, load_time, size) in sorted(
+                benchmark_task_action_timers().items(), reverse=True):
+            print "%s: dump %.3fs, load %.3fs, size %.1fMB" % (
+                name, dump_time, load_time, size / 1e6)
+        sys.exit()
+    unittest.main()
@@ -20,14 +20,12 @@
 from copy import deepcopy
 import logging
 import os
-import pickle
 from pipes import quote
 from Queue import Empty
 import shlex
 from shutil import copy, copytree, rmtree
 from subprocess import call, Popen, PIPE
 import sys
-from tempfile import mkstemp
 from time import sleep, time
 import traceback
 
@@ -49,6 +47,7 @@ from cylc.get_task_proxy import get_task_proxy
 from cylc.job_file import JobFile
 from cylc.job_host import RemoteJobHostManager, RemoteJobHostInitError
 from cylc.log_diagnosis import LogSpec
+from cylc.main_loop_waker import MainLoopWaker
 from cylc.mp_pool import SuiteProcContext, SuiteProcPool
 from cylc.network import (
     COMMS_SUITEID_OBJ_NAME, COMMS_STATE_OBJ_NAME,
@@ -63,17 +62,18 @@ from cylc.network.suite_info_server import SuiteInfoServer
 from cylc.network.suite_log_server import SuiteLogServer
 from cylc.network.suite_state_server import StateSummaryServer
 from cylc.owner import USER
+from cylc.ssh_multiplexer import SSHMultiplexer
 from cylc.suite_host import is_remote_host
 from cylc.suite_srv_files_mgr import (
     SuiteSrvFilesManager, SuiteServiceFileError)
-from cylc.rundb import CylcSuiteDAO
+from cylc.rundb import CylcSuiteDAO, CylcSuiteDBArchiver, CylcSuitePubDAO
 from cylc.suite_host import get_suite_host
 from cylc.suite_logging import SuiteLog, OUT, ERR, LOG
 from cylc.taskdef import TaskDef
 from cylc.task_id import TaskID
 from cylc.task_pool import TaskPool
 from cylc.task_proxy import (
-    TaskProxy, TaskProxySequenceBoundsError, TaskActionTimer)
+    TaskProxy, TaskProxySequenceBoundsError, TaskActionTimer, load_json_value)
 from cylc.task_state import (
     TASK_STATUS_HELD, TASK_STATUS_WAITING,
     TASK_STATUS_QUEUED, TASK_STATUS_READY, TASK_STATUS_SUBMITTED,
@@ -107,6 +107,7 @@ class Scheduler(object):
     EVENT_STALLED = 'stalled'
 
     # Intervals in seconds
+    # (Maximum time the main loop waits for work before an idle iteration.)
     INTERVAL_MAIN_LOOP = 1.0
     INTERVAL_STOP_KILL = 10.0
     INTERVAL_STOP_PROCESS_POOL_EMPTY = 0.5
@@ -222,9 +223,14 @@ class Scheduler(object):
 
         self.pri_dao = None
         self.pub_dao = None
+        self.db_archiver = None
+        # For loading tasks on restart only
+        self.restart_itasks = None
+        self.is_restart_db_rows_current = False
 
         self.suite_log = None
         self.log = LOG
+        self.waker = None
 
         self.ref_test_allowed_failures = []
         self.next_task_event_mail_time = None
@@ -248,6 +254,9 @@ class Scheduler(object):
             else:
                 slog.pimp()
 
+            # Must exist before the comms daemon and the process pool, which
+            # use it to wake up the main loop.
+            self.waker = MainLoopWaker.get_inst()
             self.configure_comms_daemon()
             self.configure()
             self.profiler.start()
@@ -370,6 +379,9 @@ conditions; see `cylc conditions`.
         else:
             pri_dao = CylcSuiteDAO(pri_db_path)
 
+        # Backward compat, upgrade task_action_timers table if necessary
+        pri_dao.upgrade_pickle_to_json()
+
         # Vacuum the primary/private database file
         OUT.info("Vacuuming the suite db ...")
         pri_dao.vacuum()
@@ -475,27 +487,59 @@ conditions; see `cylc conditions`.
             self.pool.add_to_runahead_pool(itask)
 
     def load_tasks_for_restart(self):
-        """Load tasks for restart."""
-        self.pri_dao.select_suite_params(
-            self._load_suite_params, self.options.checkpoint)
-        self.pri_dao.select_broadcast_states(
-            self._load_broadcast_states, self.options.checkpoint)
-        self.pri_dao.select_task_job_run_times(self._load_task_run_times)
-        self.pri_dao.select_task_pool_for_restart(
-            self._load_task_pool, self.options.checkpoint)
-        self.pri_dao.select_task_action_timers(self._load_task_action_timers)
+        """Load tasks for restart.
+
+        Log the number of rows loaded, and the time taken, for each table.
+        """
+        start_time = time()
+        # Loaded task proxies, by ID, for loading their action timers.
+        self.restart_itasks = {}
+        # Unless restarting from a checkpoint, rows loaded from the task_pool
+        # and task_action_timers tables are what is in them now, so the task
+        # pool only has to put changes back.
+        self.is_restart_db_rows_current = self.options.checkpoint in [
+            None, CylcSuiteDAO.CHECKPOINT_LATEST_ID]
+        load_stats = []
+        for label, select, callback, args in [
+                ("suite parameters", self.pri_dao.select_suite_params,
+                 self._load_suite_params, [self.options.checkpoint]),
+                ("broadcast states", self.pri_dao.select_broadcast_states,
+                 self._load_broadcast_states, [self.options.checkpoint]),
+                ("task run times", self.pri_dao.select_task_job_run_times,
+                 self._load_task_run_times, []),
+                ("task proxies", self.pri_dao.select_task_pool_for_restart,
+                 self._load_task_pool, [self.options.checkpoint]),
+                ("task action timers", self.pri_dao.select_task_action_timers,
+                 self._load_task_action_timers, [])]:
+            load_start_time = time()
+            n_rows = [0]
+
+            def _callback(row_idx, row, callback=callback, n_rows=n_rows):
+                """Count rows, and load each with callback."""
+                n_rows[0] += 1
+                callback(row_idx, row)
+
+            select(_callback, *args)
+            load_stats.append("%d %s (%.3fs)" % (
+                n_rows[0], label, time() - load_start_time))
+        self.restart_itasks = None
         # Re-initialise run directory for user@host for each submitted and
         # running tasks.
         # Note: tasks should all be in the runahead pool at this point.
+        job_hosts = set()
         for itask in self.pool.get_rh_tasks():
             if itask.state.status in [
                     TASK_STATUS_SUBMITTED, TASK_STATUS_RUNNING]:
-                try:
-                    RemoteJobHostManager.get_inst().init_suite_run_dir(
-                        self.suite, itask.task_host, itask.task_owner)
-                except RemoteJobHostInitError as exc:
-                    self.log.error(str(exc))
+                job_hosts.add((itask.task_host, itask.task_owner))
+        for host, owner in sorted(job_hosts):
+            try:
+                RemoteJobHostManager.get_inst().init_suite_run_dir(
+                    self.suite, host, owner)
+            except RemoteJobHostInitError as exc:
+                self.log.error(str(exc))
         self.pool.poll_task_jobs()
+        self.log.info("Restart loaded %s, total %.3fs" % (
+            ", ".join(load_stats), time() - start_time))
 
     def _load_broadcast_states(self, row_idx, row):
         """Load a setting in the previous broadcast states."""
@@ -644,39 +688,49 @@ conditions; see `cylc conditions`.
                 OUT.info("+ %s.%s %s (%s)" % (name, cycle, status, hold_swap))
             else:
                 OUT.info("+ %s.%s %s" % (name, cycle, status))
-            self.pool.add_to_runahead_pool(itask)
+            if self.pool.add_to_runahead_pool(itask):
+                self.restart_itasks[itask.identity] = itask
+        if self.is_restart_db_rows_current:
+            self.pool.load_db_task_pool_row(
+                cycle, name, spawned, status, hold_swap)
 
     def _load_task_action_timers(self, row_idx, row):
         """Load a task action timer, e.g. event handlers, retry states."""
         if row_idx == 0:
             OUT.info("LOADING task action timers")
         (
-            cycle, name, ctx_key_pickle, ctx_pickle, delays_pickle, num, delay,
+            cycle, name, ctx_key_str, ctx_type, ctx_args, delays, num, delay,
             timeout,
         ) = row
         id_ = TaskID.get(name, cycle)
-        itask = self.pool.get_task_by_id(id_)
+        itask = self.restart_itasks.get(id_)
+        ctx_key = "?"
+        timer = None
         if itask is None:
             ERR.warning("%(id)s: task not found, skip" % {"id": id_})
-            return
-        ctx_key = "?"
-        try:
-            ctx_key = pickle.loads(str(ctx_key_pickle))
-            ctx = pickle.loads(str(ctx_pickle))
-            delays = pickle.loads(str(delays_pickle))
-            if ctx_key and ctx_key[0] in ["poll_timers", "try_timers"]:
-                getattr(itask, ctx_key[0])[ctx_key[1]] = TaskActionTimer(
-                    ctx, delays, num, delay, timeout)
+        else:
+            try:
+                ctx_key = load_json_value(ctx_key_str)
+                timer = TaskActionTimer.from_db_values(
+                    ctx_type, ctx_args, delays, num, delay, timeout)
+            except (AttributeError, TypeError, LookupError, ValueError):
+                ERR.warning(
+                    "%(id)s: skip action timer %(ctx_key)s" %
+                    {"id": id_, "ctx_key": ctx_key})
+                ERR.warning(traceback.format_exc())
+                timer = None
             else:
-                itask.event_handler_try_timers[ctx_key] = TaskActionTimer(
-                    ctx, delays, num, delay, timeout)
-        except (EOFError, TypeError, LookupError, ValueError):
-            ERR.warning(
-                "%(id)s: skip action timer %(ctx_key)s" %
-                {"id": id_, "ctx_key": ctx_key})
-            ERR.warning(traceback.format_exc())
-            return
-        OUT.info("+ %s.%s %s" % (name, cycle, ctx_key))
+                if ctx_key and ctx_key[0] in ["poll_timers", "try_timers"]:
+                    getattr(itask, ctx_key[0])[ctx_key[1]] = timer
+                else:
+                    itask.event_handler_try_timers[ctx_key] = timer
+                OUT.info("+ %s.%s %s" % (name, cycle, ctx_key))
+        if self.is_restart_db_rows_current:
+            if timer is None:
+                # Skipped, record under a key that no timer has, for deletion
+                ctx_key = (None, ctx_key_str)
+            self.pool.load_db_task_action_timer_row(
+                cycle, name, ctx_key, ctx_key_str, timer)
 
     def process_command_queue(self):
         """Process queued commands."""
@@ -1008,6 +1062,8 @@ conditions; see `cylc conditions`.
                 ['task messaging', 'retry interval']))),
             mgr.KEY_TASK_MSG_TIMEOUT: str(float(GLOBAL_CFG.get(
                 ['task messaging', 'connection timeout']))),
+            mgr.KEY_TASK_MSG_AGGREGATE: str(GLOBAL_CFG.get(
+                ['task messaging', 'local aggregation'])),
             mgr.KEY_VERSION: CYLC_VERSION}
         try:
             mgr.dump_contact_file(self.suite, contact_data)
@@ -1073,6 +1129,23 @@ conditions; see `cylc conditions`.
         if key not in self.template_vars:
             self.template_vars[key] = value
 
+    @staticmethod
+    def _get_pri_dao(pri_db_path):
+        """Return data access object for the private suite database."""
+        is_persistent = GLOBAL_CFG.get(
+            ['cylc', 'private database persistent connection'])
+        pragmas = []
+        if is_persistent:
+            pragmas.append(("journal_mode", "WAL"))
+        for key, name in [
+                ('private database synchronous', 'synchronous'),
+                ('private database cache size', 'cache_size')]:
+            value = GLOBAL_CFG.get(['cylc', key])
+            if value is not None:
+                pragmas.append((name, value))
+        return CylcSuiteDAO(
+            pri_db_path, is_persistent=is_persistent, pragmas=pragmas)
+
     def configure_suite(self, reconfigure=False):
         """Load and process the suite definition."""
 
@@ -1085,7 +1158,7 @@ conditions; see `cylc conditions`.
             pri_db_path = os.path.join(
                 self.suite_srv_files_mgr.get_suite_srv_dir(self.suite),
                 CylcSuiteDAO.DB_FILE_BASE_NAME)
-            self.pri_dao = CylcSuiteDAO(pri_db_path)
+            self.pri_dao = self._get_pri_dao(pri_db_path)
             self.pri_dao.select_suite_params(self._load_initial_cycle_point)
             self.pri_dao.select_suite_template_vars(self._load_template_vars)
             # Take checkpoint and commit immediately so that checkpoint can be
@@ -1124,19 +1197,28 @@ conditions; see `cylc conditions`.
             pub_db_path = os.path.join(
                 self.suite_run_dir, 'log', CylcSuiteDAO.DB_FILE_BASE_NAME)
             if not self.is_restart:
-                # Remove database created by previous runs
+                # Remove database and its archive created by previous runs
                 try:
                     os.unlink(pri_db_path)
                 except OSError:
                     # Just in case the path is a directory!
                     rmtree(pri_db_path, ignore_errors=True)
+                rmtree(
+                    os.path.join(
+                        self.suite_run_dir, 'log',
+                        CylcSuiteDAO.ARCHIVE_DIR_BASE_NAME),
+                    ignore_errors=True)
             # Ensure that:
             # * public database is in sync with private database
             # * private database file is private
-            self.pri_dao = CylcSuiteDAO(pri_db_path)
+            self.pri_dao = self._get_pri_dao(pri_db_path)
             os.chmod(pri_db_path, 0600)
-            self.pub_dao = CylcSuiteDAO(pub_db_path, is_public=True)
-            self._copy_pri_db_to_pub_db()
+            self.pub_dao = CylcSuitePubDAO(
+                pub_db_path,
+                GLOBAL_CFG.get(['cylc', 'public database maximum lag']),
+                GLOBAL_CFG.get(['cylc', 'public database journal mode']))
+            self.pub_dao.recover(self.pri_dao)
+            self.db_archiver = CylcSuiteDBArchiver(self.pri_dao, self.pub_dao)
             pub_db_path_symlink = os.path.join(
                 self.suite_run_dir, CylcSuiteDAO.OLD_DB_FILE_BASE_NAME)
             try:
@@ -1459,7 +1541,13 @@ conditions; see `cylc conditions`.
                         "END TASK PROCESSING (took %s seconds)" %
                         (time() - time0))
 
+            if self.options.profile_mode:
+                task_messages_start_time = time()
             self.pool.process_queued_task_messages()
+            if self.options.profile_mode:
+                self._update_profile_info(
+                    "process_queued_task_messages dt (s)",
+                    time() - task_messages_start_time, amount_format="%.3f")
             self.process_queued_task_event_handlers()
             self.process_command_queue()
             if cylc.flags.iflag or self.do_update_state_summary:
@@ -1467,25 +1555,38 @@ conditions; see `cylc conditions`.
                 self.do_update_state_summary = False
                 self.pool.put_rundb_task_pool()
                 self.update_state_summary()
+            # Move a batch of old history into archive files
+            retention = self._get_cylc_conf('database history retention')
+            if retention is not None:
+                self.db_archiver.archive(retention)
+            if self.options.profile_mode:
+                db_ops_start_time = time()
             try:
                 self.pool.process_queued_db_ops()
             except OSError as err:
                 raise SchedulerError(str(err))
-            # If public database is stuck, blast it away by copying the content
-            # of the private database into it.
-            if self.pub_dao.n_tries >= self.pub_dao.MAX_TRIES:
-                try:
-                    self._copy_pri_db_to_pub_db()
-                except (IOError, OSError) as exc:
-                    # Something has to be very wrong here, so stop the suite
-                    raise SchedulerError(str(exc))
-                else:
+            if self.options.profile_mode:
+                self._update_profile_info(
+                    "process_queued_db_ops dt (s)",
+                    time() - db_ops_start_time, amount_format="%.3f")
+            # If public database is stuck, rebuild it from the private
+            # database, a few rows in each iteration of the main loop.
+            try:
+                if self.pub_dao.is_stuck():
+                    self.log.warning(
+                        "%(pub_db_name)s: resync from %(pri_db_name)s" % {
+                            "pub_db_name": self.pub_dao.db_file_name,
+                            "pri_db_name": self.pri_dao.db_file_name})
+                    self.pub_dao.resync(self.pri_dao)
+                if self.pub_dao.resync_step():
                     # No longer stuck
                     self.log.warning(
                         "%(pub_db_name)s: recovered from %(pri_db_name)s" % {
                             "pub_db_name": self.pub_dao.db_file_name,
                             "pri_db_name": self.pri_dao.db_file_name})
-                    self.pub_dao.n_tries = 0
+            except (IOError, OSError) as exc:
+                # Something has to be very wrong here, so stop the suite
+                raise SchedulerError(str(exc))
 
             self.check_suite_timer()
             if self._get_events_conf(self.EVENT_INACTIVITY_TIMEOUT):
@@ -1586,13 +1687,26 @@ conditions; see `cylc conditions`.
                         count, get_current_time_string()))
                 count += 1
 
-            sleep(self.INTERVAL_MAIN_LOOP)
+            # Block until there is work to do: incoming task messages,
+            # commands, external triggers and process pool results wake up
+            # the main loop early. Don't wait if task processing is pending,
+            # e.g. after a task message has completed an output. Wake up in
+            # time for the next due task timer.
+            if cylc.flags.pflag or self.do_process_tasks:
+                self.waker.wait(0)
+            else:
+                timeout = self.INTERVAL_MAIN_LOOP
+                due_time = self.pool.get_next_timer_due_time()
+                if due_time is not None:
+                    timeout = max(0, min(timeout, due_time - time()))
+                self.waker.wait(timeout)
             # END MAIN LOOP
 
     def update_state_summary(self):
         """Update state summary, e.g. for GUI."""
+        itasks, itasks_rh, removed_ids = self.pool.get_summary_changes()
         self.suite_state.update(
-            self.pool.get_tasks(), self.pool.get_rh_tasks(),
+            itasks, itasks_rh, removed_ids,
             self.pool.get_min_point(), self.pool.get_max_point(),
             self.pool.get_max_point_runahead(), self.paused(),
             self.will_pause_at(), self.stop_mode is not None,
@@ -1717,7 +1831,11 @@ conditions; see `cylc conditions`.
         ctx_groups = {}
         env = None
         now = time()
-        for itask in self.pool.get_tasks():
+        itasks = self.pool.get_event_timer_due_tasks(now)
+        if self.stop_mode is not None:
+            # Don't hold back mail notifications on shutdown
+            itasks = set(itasks + self.pool.get_tasks())
+        for itask in itasks:
             for key, try_timer in itask.event_handler_try_timers.items():
                 # This should not happen, ignore for now.
                 if try_timer.ctx is None:
@@ -1774,6 +1892,18 @@ conditions; see `cylc conditions`.
                     key1, submit_num = key
                     ctx_groups[try_timer.ctx].append(
                         (key1, str(itask.point), itask.tdef.name, submit_num))
+            # Check the task again when its next timer is due
+            due_time = None
+            for try_timer in itask.event_handler_try_timers.values():
+                if try_timer.is_waiting:
+                    continue
+                timeout = try_timer.timeout
+                if (try_timer.ctx.ctx_type == TaskProxy.EVENT_MAIL and
+                        self.next_task_event_mail_time is not None):
+                    timeout = max(timeout, self.next_task_event_mail_time)
+                if due_time is None or timeout < due_time:
+                    due_time = timeout
+            itask.set_event_handler_timers_due(due_time)
 
         next_task_event_mail_time = (
             now + self._get_cylc_conf("task event mail interval"))
@@ -1856,6 +1986,7 @@ conditions; see `cylc conditions`.
                     itask.command_log(log_ctx)
                 else:
                     try_timers[(key1, submit_num)].unset_waiting()
+                    itask.set_event_handler_timers_due()
             except KeyError:
                 if cylc.flags.debug:
                     ERR.debug(traceback.format_exc())
@@ -1868,6 +1999,10 @@ conditions; see `cylc conditions`.
             s_user, s_host = (None, ctx.user_at_host)
         ssh_tmpl = str(GLOBAL_CFG.get_host_item(
             "remote shell template", s_host, s_user))
+        control_path = SSHMultiplexer.get_inst().connect(s_host, s_user)
+        if control_path is not None:
+            ssh_tmpl = " ".join(
+                [ssh_tmpl] + SSHMultiplexer.get_ssh_options(control_path))
         rsync_str = str(GLOBAL_CFG.get_host_item(
             "retrieve job logs command", s_host, s_user))
 
@@ -1918,6 +2053,7 @@ conditions; see `cylc conditions`.
                     del try_timers[(key1, submit_num)]
                 else:
                     try_timers[(key1, submit_num)].unset_waiting()
+                    itask.set_event_handler_timers_due()
             except KeyError:
                 if cylc.flags.debug:
                     ERR.debug(traceback.format_exc())
@@ -1967,6 +2103,8 @@ conditions; see `cylc conditions`.
             proc_pool.handle_results_async()
 
         if self.comms_daemon:
+            # Don't hold up shutdown for clients waiting for task states
+            StateSummaryServer.get_inst().release_waiters()
             ifaces = [self.command_queue,
                       SuiteIdServer.get_inst(), StateSummaryServer.get_inst(),
                       ExtTriggerServer.get_inst(), BroadcastServer.get_inst()]
@@ -1980,6 +2118,9 @@ conditions; see `cylc conditions`.
                     pass
             self.comms_daemon.shutdown()
 
+        if self.waker is not None:
+            self.waker.close()
+
         # Flush errors and info before removing suite contact file
         sys.stdout.flush()
         sys.stderr.flush()
@@ -1992,11 +2133,14 @@ conditions; see `cylc conditions`.
                 ERR.warning("failed to remove suite contact file: %s\n%s\n" % (
                     fname, exc))
         RemoteJobHostManager.get_inst().unlink_suite_contact_files(self.suite)
+        SSHMultiplexer.get_inst().close()
 
         # disconnect from suite-db, stop db queue
-        if getattr(self, "db", None) is not None:
-            self.pri_dao.close()
+        # (public first, as it may need to complete a resync from private)
+        if self.pub_dao is not None:
             self.pub_dao.close()
+        if self.pri_dao is not None:
+            self.pri_dao.close()
 
         if getattr(self, "config", None) is not None:
             # run shutdown handlers
@@ -2131,29 +2275,6 @@ conditions; see `cylc conditions`.
         else:
             return False
 
-    def _copy_pri_db_to_pub_db(self):
-        """Copy content of primary database file to public database file.
-
-        Use temporary file to ensure that we do not end up with a partial file.
-
-        """
-        temp_pub_db_file_name = None
-        self.pub_dao.close()
-        try:
-            self.pub_dao.conn = None  # reset connection
-            open(self.pub_dao.db_file_name, "a").close()  # touch
-            st_mode = os.stat(self.pub_dao.db_file_name).st_mode
-            temp_pub_db_file_name = mkstemp(
-                prefix=self.pub_dao.DB_FILE_BASE_NAME,
-                dir=os.path.dirname(self.pub_dao.db_file_name))[1]
-            copy(self.pri_dao.db_file_name, temp_pub_db_file_name)
-            os.rename(temp_pub_db_file_name, self.pub_dao.db_file_name)
-            os.chmod(self.pub_dao.db_file_name, st_mode)
-        except (IOError, OSError):
-            if temp_pub_db_file_name:
-                os.unlink(temp_pub_db_file_name)
-            raise
-
     def _update_profile_info(self, category, amount, amount_format="%s"):
         """Update the 1, 5, 15 minute dt averages for a given category."""
         now = time()
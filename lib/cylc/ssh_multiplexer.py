@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2017 NIWA
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Share SSH connections from the suite daemon to each remote user@host.
+
+If "[hosts][HOST]use ssh control master" is set, the suite daemon starts an
+OpenSSH control master process for the user@host the first time it needs to
+run a remote command there, and keeps it running until shutdown (restarting it
+if it dies). Remote commands then run as sessions over the master's existing
+connection, instead of each having to set up and authenticate a new one.
+
+Clients only use the master via "-oControlMaster=no", so a command issued
+while the master is down, or still connecting, simply makes its own
+connection as before.
+
+Remote job commands are run by "cylc jobs-*" in the process pool. These get
+the control path in the CYLC_SSH_CONTROL_PATH environment variable, and
+cylc.remote.remrun adds the relevant options to its SSH command.
+"""
+
+import os
+import shlex
+from shutil import rmtree
+from subprocess import Popen
+from tempfile import mkdtemp
+from time import sleep, time
+import unittest
+
+from cylc.cfgspec.globalcfg import GLOBAL_CFG
+from cylc.suite_logging import LOG
+
+
+class SSHMultiplexer(object):
+    """Manage SSH control masters to remote user@host."""
+
+    ENV_CONTROL_PATH = "CYLC_SSH_CONTROL_PATH"
+    # Don't restart a failed control master more often than this (seconds)
+    RESTART_DELAY = 60.0
+    # Allow control masters this long to exit on shutdown (seconds)
+    STOP_TIMEOUT = 5.0
+
+    _INSTANCE = None
+
+    @classmethod
+    def get_inst(cls):
+        """Return a singleton instance of this class."""
+        if cls._INSTANCE is None:
+            cls._INSTANCE = cls()
+        return cls._INSTANCE
+
+    def __init__(self):
+        self.control_dir = None
+        # {(host, owner): (proc, start_time), ...}
+        self.masters = {}
+        # {(host, owner): failed_time, ...}
+        self.failed_times = {}
+
+    @staticmethod
+    def get_ssh_options(control_path):
+        """Return SSH options for a client of the control master."""
+        return ["-oControlMaster=no", "-oControlPath=%s" % control_path]
+
+    def connect(self, host, owner):
+        """Ensure a control master is running for host, owner, if configured.
+
+        Return the control path, or None if SSH multiplexing is not in use for
+        host, owner.
+
+        """
+        if not host:
+            host = "localhost"
+        if not GLOBAL_CFG.get_host_item(
+                "use ssh control master", host, owner):
+            return None
+        user_at_host = host
+        if owner:
+            user_at_host = owner + "@" + host
+        if self.control_dir is None:
+            self.control_dir = mkdtemp(prefix="cylc-ssh-")
+        control_path = os.path.join(self.control_dir, user_at_host)
+        proc = self.masters.get((host, owner), (None, None))[0]
+        if proc is not None:
+            if proc.poll() is None:
+                return control_path
+            LOG.warning("%s: SSH control master exited (%d)" % (
+                user_at_host, proc.returncode))
+            del self.masters[(host, owner)]
+            self.failed_times[(host, owner)] = time()
+        failed_time = self.failed_times.get((host, owner))
+        if failed_time is not None:
+            if time() < failed_time + self.RESTART_DELAY:
+                return None
+            del self.failed_times[(host, owner)]
+        ssh_tmpl = GLOBAL_CFG.get_host_item(
+            "remote shell template", host, owner)
+        cmd = shlex.split(str(ssh_tmpl)) + [
+            "-N", "-oControlMaster=yes", "-oControlPath=%s" % control_path,
+            user_at_host]
+        devnull = open(os.devnull, "r+")
+        try:
+            proc = Popen(
+                cmd, stdin=devnull, stdout=devnull, stderr=devnull,
+                close_fds=True)
+        except OSError as exc:
+            LOG.warning("%s: cannot start SSH control master: %s" % (
+                user_at_host, exc))
+            self.failed_times[(host, owner)] = time()
+            return None
+        finally:
+            devnull.close()
+        self.masters[(host, owner)] = (proc, time())
+        LOG.info("%s: started SSH control master" % user_at_host)
+        return control_path
+
+    def get_env(self, host, owner):
+        """Return environment for a command that runs SSH to host, owner.
+
+        Return None (i.e. inherit environment) if no control master.
+
+        """
+        control_path = self.connect(host, owner)
+        if control_path is None:
+            return None
+        env = dict(os.environ)
+        env[self.ENV_CONTROL_PATH] = control_path
+        return env
+
+    def get_ssh_cmd(self, tmpl_key, host, owner):
+        """Return SSH (or SCP) command for host, owner as a list.
+
+        tmpl_key is the name of the host setting for the command template,
+        e.g. "remote shell template" or "remote copy template".
+
+        """
+        cmd = shlex.split(str(GLOBAL_CFG.get_host_item(tmpl_key, host, owner)))
+        control_path = self.connect(host, owner)
+        if control_path is not None:
+            cmd += self.get_ssh_options(control_path)
+        return cmd
+
+    def close(self):
+        """Stop all control masters."""
+        for proc, _ in self.masters.values():
+            if proc.poll() is None:
+                try:
+                    proc.terminate()
+                except OSError:
+                    pass
+        timeout = time() + self.STOP_TIMEOUT
+        while (time() < timeout and
+                any(proc.poll() is None for proc, _ in self.masters.values())):
+            sleep(0.1)
+        for proc, _ in self.masters.values():
+            if proc.poll() is None:
+                try:
+                    proc.kill()
+                except OSError:
+                    pass
+                proc.wait()
+        self.masters.clear()
+        self.failed_times.clear()
+        if self.control_dir is not None:
+            rmtree(self.control_dir, ignore_errors=True)
+            self.control_dir = None
+
+
+class TestSSHMultiplexer(unittest.TestCase):
+    """Unit tests for SSHMultiplexer, with "sleep" standing in for SSH."""
+
+    def setUp(self):
+        self.mux = SSHMultiplexer()
+        self.items = {
+            "use ssh control master": True,
+            "remote shell template": "bash -c 'exec sleep 60'",
+            "remote copy template": "true"}
+        self.orig_get_host_item = GLOBAL_CFG.get_host_item
+        GLOBAL_CFG.get_host_item = (
+            lambda key, host=None, owner=None: self.items[key])
+
+    def tearDown(self):
+        self.mux.close()
+        GLOBAL_CFG.get_host_item = self.orig_get_host_item
+
+    def test_connect_disabled(self):
+        """Test no control master if not configured."""
+        self.items["use ssh control master"] = False
+        self.assertEqual(None, self.mux.connect("foo", None))
+        self.assertEqual(None, self.mux.get_env("foo", None))
+        self.assertEqual(
+            ["true"],
+            self.mux.get_ssh_cmd("remote copy template", "foo", None))
+        self.assertEqual({}, self.mux.masters)
+
+    def test_connect(self):
+        """Test one control master per user@host, with options for clients."""
+        control_path = self.mux.connect("foo", "me")
+        self.assertEqual(
+            os.path.join(self.mux.control_dir, "me@foo"), control_path)
+        proc = self.mux.masters[("foo", "me")][0]
+        self.assertEqual(control_path, self.mux.connect("foo", "me"))
+        self.assertTrue(proc is self.mux.masters[("foo", "me")][0])
+        self.assertEqual(
+            control_path,
+            self.mux.get_env("foo", "me")[SSHMultiplexer.ENV_CONTROL_PATH])
+        self.assertEqual(
+            ["true", "-oControlMaster=no", "-oControlPath=" + control_path],
+            self.mux.get_ssh_cmd("remote copy template", "foo", "me"))
+        self.mux.connect("bar", None)
+        self.assertEqual(2, len(self.mux.masters))
+
+    def test_restart(self):
+        """Test a dead control master is restarted, but not too soon."""
+        self.mux.connect("foo", None)
+        proc = self.mux.masters[("foo", None)][0]
+        proc.terminate()
+        proc.wait()
+        self.assertEqual(None, self.mux.connect("foo", None))
+        self.assertEqual({}, self.mux.masters)
+        # Not restarted until RESTART_DELAY after the failure.
+        self.assertEqual(None, self.mux.connect("foo", None))
+        self.assertEqual({}, self.mux.masters)
+        self.mux.failed_times[("foo", None)] -= SSHMultiplexer.RESTART_DELAY
+        self.assertNotEqual(None, self.mux.connect("foo", None))
+        self.assertFalse(proc is self.mux.masters[("foo", None)][0])
+        self.assertEqual({}, self.mux.failed_times)
+
+    def test_start_fail(self):
+        """Test a control master that cannot start is not retried too soon."""
+        self.items["remote shell template"] = "/no/such/ssh"
+        self.assertEqual(None, self.mux.connect("foo", None))
+        self.assertTrue(("foo", None) in self.mux.failed_times)
+        self.items["remote shell template"] = "bash -c 'exec sleep 60'"
+        self.assertEqual(None, self.mux.connect("foo", None))
+        self.assertEqual({}, self.mux.masters)
+
+    def test_close(self):
+        """Test close stops control masters and removes control directory."""
+        self.mux.connect("foo", None)
+        proc = self.mux.masters[("foo", None)][0]
+        control_dir = self.mux.control_dir
+        self.mux.close()
+        self.assertNotEqual(None, proc.poll())
+        self.assertFalse(os.path.exists(control_dir))
+        self.assertEqual({}, self.mux.masters)
+
+
+if __name__ == '__main__':
+    unittest.main()
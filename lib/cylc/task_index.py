@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2017 NIWA
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Index the task proxies of the task pool, for task selection.
+
+The index holds the task proxies of the task pool (including the runahead
+pool) by identity, by task and family name, by cycle point and by status.
+The indexes are maintained incrementally:
+ * The task pool calls "add" and "remove" as tasks enter and leave the pool.
+ * Task states call "status_changed" when their status changes.
+
+Exact names and points are then dict lookups, and glob patterns are matched
+against the distinct names and points in the pool, instead of against every
+task proxy.
+
+"""
+
+from fnmatch import fnmatchcase
+import unittest
+
+
+class TaskIndex(object):
+    """Index task proxies by identity, name, point and status."""
+
+    # Characters that make a name or point string a glob pattern.
+    GLOB_CHARS = "*?["
+
+    def __init__(self):
+        # itasks[identity] = itask, for all task proxies in the index.
+        self.itasks = {}
+        # namespaces[identity] = set of task name and family names.
+        self.namespaces = {}
+        # by_namespace[task or family name] = {identity: itask, ...}
+        self.by_namespace = {}
+        # by_point[point_str] = {identity: itask, ...}
+        self.by_point = {}
+        # by_status[status] = {identity: itask, ...}
+        self.by_status = {}
+
+    def add(self, itask):
+        """Add a task proxy to the index."""
+        if itask.identity in self.itasks:
+            self.remove(self.itasks[itask.identity])
+        identity = itask.identity
+        self.itasks[identity] = itask
+        itask.state.task_index = self
+        namespaces = set(itask.tdef.namespace_hierarchy)
+        namespaces.add(itask.tdef.name)
+        self.namespaces[identity] = namespaces
+        for namespace in namespaces:
+            self.by_namespace.setdefault(namespace, {})
+            self.by_namespace[namespace][identity] = itask
+        self.by_point.setdefault(str(itask.point), {})
+        self.by_point[str(itask.point)][identity] = itask
+        self.by_status.setdefault(itask.state.status, {})
+        self.by_status[itask.state.status][identity] = itask
+
+    def remove(self, itask):
+        """Remove a task proxy from the index."""
+        identity = itask.identity
+        if self.itasks.get(identity) is not itask:
+            return
+        del self.itasks[identity]
+        itask.state.task_index = None
+        for namespace in self.namespaces.pop(identity):
+            self._discard(self.by_namespace, namespace, identity)
+        self._discard(self.by_point, str(itask.point), identity)
+        self._discard(self.by_status, itask.state.status, identity)
+
+    def status_changed(self, identity, old_status, new_status):
+        """Register a change of status of a task proxy."""
+        try:
+            itask = self.itasks[identity]
+        except KeyError:
+            return
+        self._discard(self.by_status, old_status, identity)
+        self.by_status.setdefault(new_status, {})
+        self.by_status[new_status][identity] = itask
+
+    def get(self, identity):
+        """Return the task proxy with identity, or None."""
+        return self.itasks.get(identity)
+
+    def select(self, point_str, name_str, status=None):
+        """Return task proxies that match point_str, name_str and status.
+
+        point_str and name_str may be glob patterns. name_str matches the task
+        name or the name of any family of the task. If status is specified,
+        it must match the status of the task exactly.
+        """
+        names = self._match_keys(self.by_namespace, name_str)
+        point_strs = self._match_keys(self.by_point, point_str)
+        candidates_list = [
+            [self.by_namespace[name] for name in names],
+            [self.by_point[point_str] for point_str in point_strs]]
+        if status is not None:
+            candidates_list.append([self.by_status.get(status, {})])
+        # Go through the smallest list of candidates, and check the others.
+        candidates = min(
+            candidates_list,
+            key=lambda itask_maps: sum(len(item) for item in itask_maps))
+        results = {}
+        for itask_map in candidates:
+            for identity, itask in itask_map.items():
+                if (identity not in results and
+                        str(itask.point) in point_strs and
+                        (status is None or itask.state.status == status) and
+                        not names.isdisjoint(self.namespaces[identity])):
+                    results[identity] = itask
+        return results.values()
+
+    @classmethod
+    def _match_keys(cls, itask_maps, pattern):
+        """Return the set of keys of itask_maps that match pattern."""
+        if any(char in pattern for char in cls.GLOB_CHARS):
+            return set(key for key in itask_maps if fnmatchcase(key, pattern))
+        elif pattern in itask_maps:
+            return set([pattern])
+        else:
+            return set()
+
+    @staticmethod
+    def _discard(itask_maps, key, identity):
+        """Remove identity from itask_maps[key], and key if empty."""
+        try:
+            del itask_maps[key][identity]
+        except KeyError:
+            return
+        if not itask_maps[key]:
+            del itask_maps[key]
+
+
+class TestTaskIndex(unittest.TestCase):
+    """Unit tests for TaskIndex."""
+
+    class _FakeTaskDef(object):
+        """Minimal stand-in for TaskDef."""
+
+        def __init__(self, name, namespace_hierarchy):
+            self.name = name
+            self.namespace_hierarchy = namespace_hierarchy
+
+    class _FakeTaskState(object):
+        """Minimal stand-in for TaskState."""
+
+        def __init__(self, identity, status):
+            self.identity = identity
+            self.status = status
+            self.task_index = None
+
+        def set_state(self, status):
+            old_status = self.status
+            self.status = status
+            if self.task_index is not None:
+                self.task_index.status_changed(
+                    self.identity, old_status, status)
+
+    class _FakeTaskProxy(object):
+        """Minimal stand-in for TaskProxy."""
+
+        def __init__(self, name, namespace_hierarchy, point, status):
+            self.identity = "%s.%s" % (name, point)
+            self.point = point
+            self.tdef = TestTaskIndex._FakeTaskDef(
+                name, namespace_hierarchy)
+            self.state = TestTaskIndex._FakeTaskState(self.identity, status)
+
+    def setUp(self):
+        self.index = TaskIndex()
+        self.itasks = {}
+        for name, namespace_hierarchy, point, status in [
+                ("foo", ["root", "FAM", "foo"], 1, "running"),
+                ("bar", ["root", "FAM", "bar"], 1, "waiting"),
+                ("baz", ["root", "baz"], 1, "waiting"),
+                ("foo", ["root", "FAM", "foo"], 2, "waiting"),
+                ("foo", ["root", "FAM", "foo"], 10, "waiting")]:
+            itask = self._FakeTaskProxy(
+                name, namespace_hierarchy, point, status)
+            self.itasks[itask.identity] = itask
+            self.index.add(itask)
+
+    def _select(self, point_str, name_str, status=None):
+        """Return sorted identities of selected task proxies."""
+        return sorted(
+            itask.identity
+            for itask in self.index.select(point_str, name_str, status))
+
+    def test_get(self):
+        """Test get task proxy by identity."""
+        self.assertTrue(self.index.get("foo.2") is self.itasks["foo.2"])
+        self.assertEqual(None, self.index.get("foo.3"))
+
+    def test_select(self):
+        """Test select by exact and glob names, points and statuses."""
+        self.assertEqual(["foo.1"], self._select("1", "foo"))
+        self.assertEqual(["bar.1", "foo.1"], self._select("1", "FAM"))
+        self.assertEqual(
+            ["bar.1", "baz.1", "foo.1"], self._select("1", "*"))
+        self.assertEqual(["bar.1", "baz.1"], self._select("1", "ba?"))
+        self.assertEqual(
+            ["foo.1", "foo.10", "foo.2"], self._select("*", "foo"))
+        self.assertEqual(["foo.1", "foo.10"], self._select("1*", "f*"))
+        self.assertEqual(
+            ["bar.1", "foo.10", "foo.2"], self._select("*", "FAM", "waiting"))
+        self.assertEqual(["foo.1"], self._select("*", "*", "running"))
+        self.assertEqual([], self._select("3", "*"))
+        self.assertEqual([], self._select("*", "qux"))
+        self.assertEqual([], self._select("*", "*", "failed"))
+
+    def test_status_changed(self):
+        """Test select by status after status changes."""
+        self.itasks["foo.1"].state.set_state("succeeded")
+        self.itasks["foo.2"].state.set_state("running")
+        self.assertEqual(["foo.2"], self._select("*", "*", "running"))
+        self.assertEqual(["foo.1"], self._select("*", "*", "succeeded"))
+
+    def test_remove(self):
+        """Test removed task proxies are no longer selected."""
+        self.index.remove(self.itasks["foo.1"])
+        self.index.remove(self.itasks["baz.1"])
+        self.assertEqual(None, self.index.get("foo.1"))
+        self.assertEqual(["bar.1"], self._select("1", "*"))
+        self.assertEqual([], self._select("*", "baz"))
+        self.assertFalse("baz" in self.index.by_namespace)
+        # Status changes of removed tasks are ignored.
+        self.itasks["foo.1"].state.set_state("failed")
+        self.assertEqual([], self._select("*", "*", "failed"))
+        # Re-add.
+        self.index.add(self.itasks["foo.1"])
+        self.assertEqual(["foo.1"], self._select("*", "*", "failed"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -17,9 +17,13 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """Task to cylc progress messaging."""
 
+import errno
+import fcntl
+import json
 import os
 import sys
-from time import sleep
+from tempfile import NamedTemporaryFile
+from time import sleep, time
 from cylc.remote import remrun
 from cylc.wallclock import get_current_time_string
 import cylc.flags
@@ -52,6 +56,10 @@ class TaskMessage(object):
     MSG_MAX_TRIES = 7
     MSG_TIMEOUT = 30.0
 
+    DIR_BASE_MSG_SPOOL = "messages"
+    MSG_SPOOL_EXT = ".json"
+    MSG_SPOOL_LOCK = "lock"
+
     def __init__(self, priority=NORMAL):
         if priority in self.PRIORITIES:
             self.priority = priority
@@ -99,7 +107,28 @@ class TaskMessage(object):
         handle.flush()
 
     def _send_by_remote_port(self, messages):
-        """Send message by talking to the daemon (remote?) port."""
+        """Send messages by talking to the daemon (remote?) port.
+
+        All messages are sent in a single request. With local aggregation,
+        they may be sent together with messages from other jobs.
+
+        """
+        items = []
+        for message in messages:
+            items.append(
+                (self.task_id, self.priority, message, self.true_event_time))
+        if self.env_map.get(
+                SuiteSrvFilesManager.KEY_TASK_MSG_AGGREGATE) == 'True':
+            self._send_aggregated(items)
+        else:
+            self._put_messages(items)
+
+    def _put_messages(self, items):
+        """Send (task_id, priority, message, event_time) items to the suite.
+
+        Return True on success.
+
+        """
         from cylc.network import ConnectionError, ConnectionInfoError
         from cylc.network.task_msg_client import TaskMessageClient
 
@@ -120,8 +149,7 @@ class TaskMessage(object):
                 SuiteSrvFilesManager.KEY_TASK_MSG_TIMEOUT, self.MSG_TIMEOUT)))
         for i in range(1, max_tries + 1):  # 1..max_tries inclusive
             try:
-                for message in messages:
-                    client.put(self.task_id, self.priority, message)
+                client.put_messages(items)
             except ConnectionError as exc:
                 sys.stderr.write("Send message: try %s of %s failed: %s\n" % (
                     i, max_tries, exc))
@@ -132,6 +160,7 @@ class TaskMessage(object):
                 if i >= max_tries or isinstance(exc, ConnectionInfoError):
                     # Issue a warning and let the task carry on
                     sys.stderr.write("WARNING: MESSAGE SEND FAILED\n")
+                    return False
                 else:
                     sys.stderr.write(
                         "   retry in %s seconds, timeout is %s\n" % (
@@ -148,7 +177,92 @@ class TaskMessage(object):
                     sys.stderr.write(
                         "Send message: try %s of %s succeeded\n" % (
                             i, max_tries))
-                break
+                return True
+        return False
+
+    def _send_aggregated(self, items):
+        """Spool messages, and send all spooled messages if no one else is.
+
+        Jobs on the same host share the spool directory. The process holding
+        the lock on the spool directory sends the messages of all jobs, in the
+        order they were spooled, so other processes can return immediately.
+
+        """
+        spool_dir = os.path.join(
+            SuiteSrvFilesManager().get_suite_srv_dir(self.suite),
+            self.DIR_BASE_MSG_SPOOL)
+        try:
+            os.makedirs(spool_dir)
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                raise
+        # Spool: write to a temporary file, then rename to make it visible.
+        name = '%017.6f-%d%s' % (time(), os.getpid(), self.MSG_SPOOL_EXT)
+        handle = NamedTemporaryFile(dir=spool_dir, prefix='.', delete=False)
+        json.dump(items, handle)
+        handle.close()
+        os.rename(handle.name, os.path.join(spool_dir, name))
+
+        lock_handle = open(os.path.join(spool_dir, self.MSG_SPOOL_LOCK), 'a')
+        try:
+            while self._get_spooled(spool_dir):
+                try:
+                    fcntl.flock(lock_handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except IOError as exc:
+                    if exc.errno not in [errno.EAGAIN, errno.EACCES]:
+                        raise
+                    # Lock holder will send our messages.
+                    return
+                try:
+                    if not self._send_spooled(spool_dir):
+                        # Leave messages for the next lock holder, or for
+                        # the suite to poll the jobs.
+                        return
+                finally:
+                    fcntl.flock(lock_handle, fcntl.LOCK_UN)
+                # Check for messages spooled by others as the lock was held.
+        finally:
+            lock_handle.close()
+
+    def _get_spooled(self, spool_dir):
+        """Return sorted names of spooled message files in spool_dir."""
+        return sorted(
+            name for name in os.listdir(spool_dir)
+            if name.endswith(self.MSG_SPOOL_EXT))
+
+    def _send_spooled(self, spool_dir):
+        """Send spooled messages until there are no more.
+
+        Spooled messages are removed once sent, or if they cannot be read.
+        Return False if messages cannot be sent, leaving them in spool_dir.
+
+        """
+        while True:
+            names = self._get_spooled(spool_dir)
+            if not names:
+                return True
+            items = []
+            for name in list(names):
+                try:
+                    with open(os.path.join(spool_dir, name)) as handle:
+                        items.extend(json.load(handle))
+                except (IOError, ValueError) as exc:
+                    sys.stderr.write("WARNING: %s: %s\n" % (name, exc))
+                    names.remove(name)
+                    self._unlink_spooled(spool_dir, name)
+            if items and not self._put_messages(items):
+                return False
+            for name in names:
+                self._unlink_spooled(spool_dir, name)
+
+    @staticmethod
+    def _unlink_spooled(spool_dir, name):
+        """Remove spooled message file name from spool_dir, if it exists."""
+        try:
+            os.unlink(os.path.join(spool_dir, name))
+        except OSError as exc:
+            if exc.errno != errno.ENOENT:
+                raise
 
     def _send_by_ssh(self):
         """Send message via SSH."""
@@ -211,7 +325,7 @@ class TaskMessage(object):
             except IOError as exc:
                 if cylc.flags.debug:
                     print >> sys.stderr, exc
-        for i, message in enumerate(messages):
+        for message in messages:
             if job_status_file:
                 if message == TASK_OUTPUT_STARTED:
                     job_id = os.getppid()
@@ -253,7 +367,6 @@ class TaskMessage(object):
                     job_status_file.write("%s=%s|%s|%s\n" % (
                         self.CYLC_MESSAGE, self.true_event_time, self.priority,
                         message))
-            messages[i] += ' at ' + self.true_event_time
         if job_status_file:
             try:
                 job_status_file.close()
@@ -33,7 +33,7 @@ TASK_OUTPUT_FAILED = "failed"
 class TaskOutputs(object):
 
     # Memory optimization - constrain possible attributes to this list.
-    __slots__ = ["owner_id", "completed", "not_completed"]
+    __slots__ = ["owner_id", "completed", "not_completed", "broker"]
 
     def __init__(self, owner_id):
 
@@ -48,6 +48,10 @@ class TaskOutputs(object):
         self.completed = {}
         self.not_completed = {}
 
+        # Dependency broker of the task pool, to be told of changes to
+        # completed outputs (set by the broker while in the task pool).
+        self.broker = None
+
     def count(self):
         return len(self.completed) + len(self.not_completed)
 
@@ -80,6 +84,8 @@ class TaskOutputs(object):
         except:
             pass
         self.completed[message] = self.owner_id
+        if self.broker is not None:
+            self.broker.output_completed(message, self.owner_id)
 
     def exists(self, msg):
         message = self._qualify(msg)
@@ -89,11 +95,15 @@ class TaskOutputs(object):
         for message in self.completed.keys():
             del self.completed[message]
             self.not_completed[message] = self.owner_id
+            if self.broker is not None:
+                self.broker.output_not_completed(message)
 
     def set_all_completed(self):
         for message in self.not_completed.keys():
             del self.not_completed[message]
             self.completed[message] = self.owner_id
+            if self.broker is not None:
+                self.broker.output_completed(message, self.owner_id)
 
     def add(self, msg, completed=False):
         # Add a new output message, prepend my task ID.
@@ -106,6 +116,8 @@ class TaskOutputs(object):
             self.not_completed[message] = self.owner_id
         else:
             self.completed[message] = self.owner_id
+            if self.broker is not None:
+                self.broker.output_completed(message, self.owner_id)
 
     def remove(self, msg):
         """Remove an output, if it exists."""
@@ -117,3 +129,6 @@ class TaskOutputs(object):
                 del self.not_completed[message]
             except:
                 pass
+        else:
+            if self.broker is not None:
+                self.broker.output_not_completed(message)
@@ -31,10 +31,10 @@ tasks against the new stop cycle.
 
 """
 
+from collections import OrderedDict
 from fnmatch import fnmatchcase
 from logging import DEBUG, INFO, WARNING, getLogger
 import os
-import pickle
 import Queue
 from time import time
 import traceback
@@ -44,6 +44,7 @@ from cylc.network.task_msg_server import TaskMessageServer
 from cylc.batch_sys_manager import BATCH_SYS_MANAGER
 from cylc.cfgspec.globalcfg import GLOBAL_CFG
 from cylc.config import SuiteConfig
+from cylc.dependency_broker import DependencyBroker
 from cylc.cycling.loader import (
     get_interval, get_interval_cls, get_point, ISO8601_CYCLING_TYPE,
     standardise_point_string)
@@ -54,7 +55,10 @@ from cylc.network.ext_trigger_server import ExtTriggerServer
 from cylc.network.suite_broadcast_server import BroadcastServer
 from cylc.owner import is_remote_user
 from cylc.rundb import CylcSuiteDAO
+from cylc.runahead_tracker import RunaheadTracker
+from cylc.ssh_multiplexer import SSHMultiplexer
 from cylc.suite_host import is_remote_host
+from cylc.task_proxy import dump_json_value
 from cylc.task_state import (
     TASK_STATUSES_ACTIVE, TASK_STATUSES_NOT_STALLED, TASK_STATUSES_FINAL,
     TASK_STATUS_HELD, TASK_STATUS_WAITING, TASK_STATUS_EXPIRED,
@@ -62,6 +66,9 @@ from cylc.task_state import (
     TASK_STATUS_SUBMIT_FAILED, TASK_STATUS_SUBMIT_RETRYING,
     TASK_STATUS_RUNNING, TASK_STATUS_SUCCEEDED, TASK_STATUS_FAILED,
     TASK_STATUS_RETRYING)
+from cylc.task_index import TaskIndex
+from cylc.task_queue_tracker import TaskQueueTracker
+from cylc.task_timer_heap import TaskTimerHeap
 from cylc.wallclock import (get_current_time_string,
                             get_time_string_from_unix_time)
 
@@ -113,8 +120,12 @@ class TaskPool(object):
 
         self.pool = {}
         self.runahead_pool = {}
+        self.broker = DependencyBroker()
+        self.runahead_tracker = RunaheadTracker()
+        self.task_index = TaskIndex()
         self.myq = {}
         self.queues = {}
+        self.queue_tracker = TaskQueueTracker()
         self.assign_queues()
 
         self.pool_list = []
@@ -139,6 +150,26 @@ class TaskPool(object):
             self.TABLE_CHECKPOINT_ID: [],
             self.TABLE_TASK_POOL: [],
             self.TABLE_TASK_ACTION_TIMERS: []}
+        # Rows last put to the task_pool table, or None before the first put:
+        # {(cycle, name): (spawned, status, hold_swap), ...}
+        self.db_task_pool_rows = None
+        # Rows last put to the task_action_timers table:
+        # {(cycle, name): {ctx_key: (ctx_key_str, timer_values), ...}, ...}
+        self.db_task_action_timers_rows = {}
+        # Task proxies in the pool (including the runahead pool) with queued
+        # DB operations. Task proxies add themselves when they queue one.
+        self.db_dirty_itasks = set()
+        # IDs of task proxies in the pool (including the runahead pool) with
+        # changed state summaries, or removed from the pool. Task proxies add
+        # themselves when their summaries or statuses change.
+        self.summary_dirty_ids = set()
+        # Elapsed times of task definitions at the last state summary:
+        # {name: (elapsed_time, ...), ...}
+        self.summary_elapsed_times = {}
+        # Task proxies by time of next check of their submission/execution
+        # timeout and poll timers, and of their event handler timers.
+        self.poll_timer_heap = TaskTimerHeap()
+        self.event_timer_heap = TaskTimerHeap()
 
     def assign_queues(self):
         """self.myq[taskname] = qfoo"""
@@ -278,6 +309,20 @@ class TaskPool(object):
         self.runahead_pool.setdefault(itask.point, {})
         self.runahead_pool[itask.point][itask.identity] = itask
         self.rhpool_changed = True
+        self.runahead_tracker.add(itask)
+        self.task_index.add(itask)
+        itask.db_dirty_itasks = self.db_dirty_itasks
+        if itask.has_queued_db_ops():
+            self.db_dirty_itasks.add(itask)
+        itask.summary.dirty_ids = self.summary_dirty_ids
+        itask.state.summary_dirty_ids = self.summary_dirty_ids
+        self.summary_dirty_ids.add(itask.identity)
+        if self.run_mode != 'simulation':
+            # Poll timers are not checked in simulation mode
+            self.poll_timer_heap.add(itask)
+            itask.state.poll_timer_heap = self.poll_timer_heap
+        self.event_timer_heap.add(itask)
+        itask.event_timer_heap = self.event_timer_heap
         return True
 
     def release_runahead_tasks(self):
@@ -291,36 +336,20 @@ class TaskPool(object):
 
         # Any finished tasks can be released immediately (this can happen at
         # restart when all tasks are initially loaded into the runahead pool).
-        for itask_id_maps in self.runahead_pool.values():
-            for itask in itask_id_maps.values():
-                if itask.state.status in [TASK_STATUS_FAILED,
-                                          TASK_STATUS_SUCCEEDED,
-                                          TASK_STATUS_EXPIRED]:
-                    self.release_runahead_task(itask)
-                    self.rhpool_changed = True
+        for itask in self.runahead_tracker.pop_new_finished():
+            if itask.identity in self.runahead_pool.get(itask.point, {}):
+                self.release_runahead_task(itask)
+                self.rhpool_changed = True
 
         limit = self.max_num_active_cycle_points
 
-        points = []
-        for point, itasks in sorted(
-                self.get_tasks_by_point(incl_runahead=True).items()):
-            has_unfinished_itasks = False
-            for itask in itasks:
-                if itask.state.status not in [TASK_STATUS_FAILED,
-                                              TASK_STATUS_SUCCEEDED,
-                                              TASK_STATUS_EXPIRED]:
-                    has_unfinished_itasks = True
-                    break
-            if not points and not has_unfinished_itasks:
-                # We need to begin with an unfinished cycle point.
-                continue
-            points.append(point)
-
-        if not points:
+        # Get the earliest point with unfinished tasks.
+        runahead_base_point = self.runahead_tracker.get_base_point()
+        if runahead_base_point is None:
             return False
 
-        # Get the earliest point with unfinished tasks.
-        runahead_base_point = min(points)
+        # Get the first points with tasks, from the runahead base point.
+        points = self.runahead_tracker.get_points(runahead_base_point, limit)
 
         # Get all cycling points possible after the runahead base point.
         if (self._prev_runahead_base_point is not None and
@@ -384,9 +413,12 @@ class TaskPool(object):
         if queue not in self.queues:
             self.queues[queue] = {}
         self.queues[queue][itask.identity] = itask
+        self.queue_tracker.add(itask, queue)
         self.pool.setdefault(itask.point, {})
         self.pool[itask.point][itask.identity] = itask
         self.pool_changed = True
+        self.broker.add(itask)
+        self.summary_dirty_ids.add(itask.identity)
         cylc.flags.pflag = True
         itask.log(DEBUG, "released to the task pool")
         del self.runahead_pool[itask.point][itask.identity]
@@ -398,6 +430,17 @@ class TaskPool(object):
 
     def remove(self, itask, reason=None):
         """Remove a task proxy from the pool."""
+        itask.db_dirty_itasks = None
+        self.db_dirty_itasks.discard(itask)
+        itask.summary.dirty_ids = None
+        itask.state.summary_dirty_ids = None
+        self.summary_dirty_ids.add(itask.identity)
+        self.runahead_tracker.remove(itask)
+        self.task_index.remove(itask)
+        itask.state.poll_timer_heap = None
+        self.poll_timer_heap.remove(itask)
+        itask.event_timer_heap = None
+        self.event_timer_heap.remove(itask)
         try:
             del self.runahead_pool[itask.point][itask.identity]
         except KeyError:
@@ -411,10 +454,12 @@ class TaskPool(object):
         # remove from queue
         if itask.tdef.name in self.myq:  # A reload can remove a task
             del self.queues[self.myq[itask.tdef.name]][itask.identity]
+        self.queue_tracker.remove(itask)
         del self.pool[itask.point][itask.identity]
         if not self.pool[itask.point]:
             del self.pool[itask.point]
         self.pool_changed = True
+        self.broker.remove(itask)
         msg = "task proxy removed"
         if reason:
             msg += " (" + reason + ")"
@@ -423,6 +468,40 @@ class TaskPool(object):
             self.set_max_future_offset()
         del itask
 
+    def get_summary_changes(self):
+        """Return task proxies with changed state summaries since last call.
+
+        Return (itasks, itasks_rh, removed_ids): task proxies in the pool and
+        in the runahead pool, and IDs of task proxies removed from the pool.
+
+        """
+        dirty_ids = self.summary_dirty_ids
+        # The mean elapsed time in the summaries of all the tasks of a task
+        # definition changes when one of them succeeds.
+        for identity in list(dirty_ids):
+            itask = self.task_index.get(identity)
+            if itask is None:
+                continue
+            name = itask.tdef.name
+            elapsed_times = tuple(itask.tdef.elapsed_times)
+            if self.summary_elapsed_times.get(name) != elapsed_times:
+                self.summary_elapsed_times[name] = elapsed_times
+                for itask_of_name in self.task_index.select("*", name):
+                    dirty_ids.add(itask_of_name.identity)
+        itasks = []
+        itasks_rh = []
+        removed_ids = []
+        for identity in dirty_ids:
+            itask = self.task_index.get(identity)
+            if itask is None:
+                removed_ids.append(identity)
+            elif identity in self.runahead_pool.get(itask.point, {}):
+                itasks_rh.append(itask)
+            else:
+                itasks.append(itask)
+        dirty_ids.clear()
+        return itasks, itasks_rh, removed_ids
+
     def get_all_tasks(self):
         """Return a list of all task proxies."""
         return self.get_rh_tasks() + self.get_tasks()
@@ -464,11 +543,7 @@ class TaskPool(object):
 
         Return None if task does not exist.
         """
-        for itask_ids in self.runahead_pool.values() + self.queues.values():
-            try:
-                return itask_ids[id_]
-            except KeyError:
-                pass
+        return self.task_index.get(id_)
 
     def submit_tasks(self):
         """
@@ -492,44 +567,57 @@ class TaskPool(object):
         """
 
         # 1) queue unqueued tasks that are ready to run or manually forced
-        for itask in self.get_tasks():
-            if not itask.state.status == TASK_STATUS_QUEUED:
-                # only need to check that unqueued tasks are ready
-                if itask.manual_trigger or itask.ready_to_run():
-                    # queue the task
-                    itask.state.set_state(TASK_STATUS_QUEUED)
-                    itask.reset_manual_trigger()
+        # Only tasks that may have become ready since the last check (e.g.
+        # prerequisites satisfied, status reset, clock trigger or retry delay
+        # due) need checking.
+        manual_itasks = []
+        for itask in self.queue_tracker.pop_ready_check_due(time()):
+            if itask.state.status == TASK_STATUS_QUEUED:
+                if itask.manual_trigger:
+                    manual_itasks.append(itask)
+            elif itask.manual_trigger or itask.ready_to_run():
+                # queue the task
+                itask.state.set_state(TASK_STATUS_QUEUED)
+                itask.reset_manual_trigger()
+            else:
+                # check again on clock trigger or retry delay, if any
+                self.queue_tracker.set_ready_check_due(
+                    itask.identity, itask.get_ready_due_time())
 
         # 2) submit queued tasks if manually forced or not queue-limited
+        # 2.1) release queued tasks if manually forced
         ready_tasks = []
+        n_manual = {}
+        for itask in manual_itasks:
+            queue = self.myq[itask.tdef.name]
+            n_manual[queue] = n_manual.get(queue, 0) + 1
+            ready_tasks.append(itask)
+        manual_ids = set(itask.identity for itask in manual_itasks)
         config = SuiteConfig.get_inst()
         qconfig = config.cfg['scheduling']['queues']
         for queue in self.queues:
-            # 2.1) count active tasks and compare to queue limit
-            n_active = 0
-            n_release = 0
+            # 2.2) compare active tasks to queue limit
             n_limit = qconfig[queue]['limit']
-            tasks = self.queues[queue].values()
+            n_release = 0
             if n_limit:
-                for itask in tasks:
-                    if itask.state.status in [TASK_STATUS_READY,
-                                              TASK_STATUS_SUBMITTED,
-                                              TASK_STATUS_RUNNING]:
-                        n_active += 1
-                n_release = n_limit - n_active
-
-            # 2.2) release queued tasks if not limited or if manually forced
-            for itask in tasks:
-                if not itask.state.status == TASK_STATUS_QUEUED:
-                    # (This excludes tasks remaining TASK_STATUS_READY because
-                    # job submission has been stopped with 'cylc shutdown').
+                n_release = (
+                    n_limit - self.queue_tracker.get_n_active(queue) -
+                    n_manual.get(queue, 0))
+                if n_release <= 0:
+                    continue
+
+            # 2.3) release queued tasks in order, up to the queue limit
+            # (This excludes tasks remaining TASK_STATUS_READY because job
+            # submission has been stopped with 'cylc shutdown').
+            for itask in self.queue_tracker.iter_queued(queue):
+                if n_limit and n_release <= 0:
+                    break
+                if itask.identity in manual_ids:
                     continue
-                if itask.manual_trigger or not n_limit or n_release > 0:
-                    # manual release, or no limit, or not currently limited
-                    n_release -= 1
-                    ready_tasks.append(itask)
-                    itask.reset_manual_trigger()
-                # else leaved queued
+                n_release -= 1
+                ready_tasks.append(itask)
+        for itask in ready_tasks:
+            itask.reset_manual_trigger()
 
         self.log.debug('%d task(s) de-queued' % len(ready_tasks))
 
@@ -586,9 +674,14 @@ class TaskPool(object):
                     kwargs[key] = value
             if remote_mode:
                 cmd.append('--remote-mode')
+                kwargs['env'] = SSHMultiplexer.get_inst().get_env(host, owner)
+            else:
+                # Submit local jobs in the process pool worker.
+                kwargs['in_process'] = True
             cmd.append("--")
-            cmd.append(GLOBAL_CFG.get_derived_host_item(
-                self.suite_name, 'suite job log directory', host, owner))
+            job_log_root = GLOBAL_CFG.get_derived_host_item(
+                self.suite_name, 'suite job log directory', host, owner)
+            cmd.append(job_log_root)
             stdin_file_paths = []
             job_log_dirs = []
             for itask in sorted(itasks, key=lambda itask: itask.identity):
@@ -602,6 +695,7 @@ class TaskPool(object):
                     self.JOBS_SUBMIT,
                     cmd,
                     stdin_file_paths=stdin_file_paths,
+                    job_log_root=job_log_root,
                     job_log_dirs=job_log_dirs,
                     **kwargs
                 ),
@@ -702,6 +796,7 @@ class TaskPool(object):
                 if key not in new_queues:
                     new_queues[key] = {}
                 new_queues[key][id_] = itask
+                self.queue_tracker.add(itask, key)
         self.queues = new_queues
 
         # find any old tasks that have been removed from the suite
@@ -735,6 +830,7 @@ class TaskPool(object):
                 else:
                     # Keep active orphaned task, but stop it from spawning.
                     itask.has_spawned = True
+                    itask.summary.set_dirty()
                     itask.log(WARNING, "last instance (orphaned by reload)")
             else:
                 new_task = get_task_proxy(
@@ -1024,22 +1120,20 @@ class TaskPool(object):
         """Run time dependency negotiation.
 
         Tasks attempt to get their prerequisites satisfied by other tasks'
-        outputs. Brokered negotiation is O(n) in number of tasks.
+        outputs. Brokered negotiation is O(n) in number of outputs completed,
+        and tasks added or reset, since the last negotiation.
 
         """
-        all_outputs = {}   # all_outputs[message] = taskid
-        for itask in self.get_tasks():
-            all_outputs.update(itask.state.outputs.completed)
-        all_output_msgs = set(all_outputs)
-        for itask in self.get_tasks():
-            # Try to satisfy itask if not already satisfied.
-            if itask.state.prerequisites_are_not_all_satisfied():
-                itask.state.satisfy_me(all_output_msgs, all_outputs)
+        self.broker.match()
 
     def process_queued_task_messages(self):
-        """Handle incoming task messages for each task proxy."""
+        """Handle incoming task messages for each task proxy.
+
+        Messages are routed to their task proxies in the main pool, in order
+        of arrival. Messages for other tasks are logged and ignored.
+        """
         queue = self.message_queue.get_queue()
-        task_id_messages = {}
+        task_id_messages = OrderedDict()
         while queue.qsize():
             try:
                 task_id, priority, message = queue.get(block=False)
@@ -1048,15 +1142,24 @@ class TaskPool(object):
             queue.task_done()
             task_id_messages.setdefault(task_id, [])
             task_id_messages[task_id].append((priority, message))
-        for itask in self.get_tasks():
-            if itask.identity in task_id_messages:
-                for priority, message in task_id_messages[itask.identity]:
-                    itask.process_incoming_message(priority, message)
+        for task_id, messages in task_id_messages.items():
+            itask = self.task_index.get(task_id)
+            if itask is None or task_id not in self.pool.get(itask.point, {}):
+                for _, message in messages:
+                    self.log.warning(
+                        "%s: task not in the pool, message ignored: %s" % (
+                            task_id, message))
+                continue
+            for priority, message in messages:
+                itask.process_incoming_message(priority, message)
 
     def process_queued_db_ops(self):
         """Handle queued db operations for each task proxy."""
-        for itask in self.get_all_tasks():
-            # (runahead pool tasks too, to get new state recorders).
+        # Only task proxies that have queued db operations since last time,
+        # (runahead pool tasks too, to get new state recorders).
+        itasks = list(self.db_dirty_itasks)
+        self.db_dirty_itasks.clear()
+        for itask in itasks:
             if any(itask.db_inserts_map.values()):
                 for table_name, db_inserts in sorted(
                         itask.db_inserts_map.items()):
@@ -1105,14 +1208,11 @@ class TaskPool(object):
                         self.pri_dao.add_insert_item(table_name, db_insert)
                         self.pub_dao.add_insert_item(table_name, db_insert)
 
-        # Previously, we used a separate thread for database writes. This has
-        # now been removed. For the private database, there is no real
-        # advantage in using a separate thread as it needs to be always in sync
-        # with what is current. For the public database, which does not need to
-        # be fully in sync, there is some advantage of using a separate
-        # thread/process, if writing to it becomes a bottleneck. At the moment,
-        # there is no evidence that this is a bottleneck, so it is better to
-        # keep the logic simple.
+        # For the private database, there is no real advantage in using a
+        # separate thread as it needs to be always in sync with what is
+        # current. The public database, which does not need to be fully in
+        # sync, is written by a separate thread, so that readers locking it
+        # cannot hold up the suite.
         self.pri_dao.execute_queued_items()
         self.pub_dao.execute_queued_items()
 
@@ -1264,6 +1364,7 @@ class TaskPool(object):
             itask.manual_trigger = True
             if not itask.state.status == TASK_STATUS_QUEUED:
                 itask.state.reset_state(TASK_STATUS_READY)
+            self.queue_tracker.set_ready_check_due(itask.identity)
         return n_warnings
 
     def dry_run_task(self, items):
@@ -1287,12 +1388,34 @@ class TaskPool(object):
         """
         now = time()
         poll_task_ids = set()
-        for itask in self.get_tasks():
+        for itask in self.poll_timer_heap.pop_due(now):
             if itask.check_poll_ready(now):
                 poll_task_ids.add(itask.identity)
+            self.poll_timer_heap.schedule(
+                itask.identity, itask.get_poll_due_time())
         if poll_task_ids:
             self.poll_task_jobs(poll_task_ids)
 
+    def get_event_timer_due_tasks(self, now):
+        """Return task proxies with event handler timers due before now.
+
+        Callers should reschedule the returned task proxies with
+        "TaskProxy.set_event_handler_timers_due" after processing their
+        event handler timers.
+        """
+        return self.event_timer_heap.pop_due(now)
+
+    def get_next_timer_due_time(self):
+        """Return the time of the next due task timer check, or None."""
+        due_times = [
+            due_time for due_time in [
+                self.poll_timer_heap.get_next_due_time(),
+                self.event_timer_heap.get_next_due_time()]
+            if due_time is not None]
+        if due_times:
+            return min(due_times)
+        return None
+
     def check_auto_shutdown(self):
         """Check if we should do a normal automatic shutdown."""
         shutdown = True
@@ -1327,15 +1450,11 @@ class TaskPool(object):
     def waiting_tasks_ready(self):
         """Waiting tasks can become ready for internal reasons.
 
-        Namely clock-triggers or retry-delay timers
+        Namely clock-triggers or retry-delay timers. Return True if any task
+        is due for a check in "submit_tasks".
 
         """
-        result = False
-        for itask in self.get_tasks():
-            if itask.ready_to_run():
-                result = True
-                break
-        return result
+        return self.queue_tracker.is_ready_check_due(time())
 
     def task_succeeded(self, id_):
         res = False
@@ -1417,8 +1536,8 @@ class TaskPool(object):
         """See if any queued external event messages can trigger tasks."""
         ets = ExtTriggerServer.get_inst()
         for itask in self.get_tasks():
-            if itask.state.external_triggers:
-                ets.retrieve(itask)
+            if itask.state.external_triggers and ets.retrieve(itask):
+                self.queue_tracker.set_ready_check_due(itask.identity)
 
     def put_rundb_suite_params(self, initial_point, final_point, format=None):
         """Put run mode, initial/final cycle point in runtime database.
@@ -1447,51 +1566,135 @@ class TaskPool(object):
             self.db_inserts_map[self.TABLE_SUITE_TEMPLATE_VARS].append(
                 {"key": key, "value": value})
 
+    def load_db_task_pool_row(self, cycle, name, spawned, status, hold_swap):
+        """Record a row loaded from the task_pool table on restart.
+
+        Rows loaded before the first put_rundb_task_pool call are taken to be
+        the content of the table, so that call only puts changes to them,
+        instead of rewriting the table in full.
+        """
+        if self.db_task_pool_rows is None:
+            self.db_task_pool_rows = {}
+        self.db_task_pool_rows[(cycle, name)] = (
+            int(spawned), status, hold_swap)
+
+    def load_db_task_action_timer_row(
+            self, cycle, name, ctx_key, ctx_key_str, timer):
+        """Record a row loaded from the task_action_timers table on restart.
+
+        See load_db_task_pool_row. Record a row that is not loaded with a
+        timer of None, so it is deleted.
+        """
+        if self.db_task_pool_rows is None:
+            self.db_task_pool_rows = {}
+        timer_values = None
+        if timer is not None:
+            timer_values = self._get_task_action_timer_values(timer)
+        self.db_task_action_timers_rows.setdefault((cycle, name), {})
+        self.db_task_action_timers_rows[(cycle, name)][ctx_key] = (
+            ctx_key_str, timer_values)
+
     def put_rundb_task_pool(self):
         """Put statements to update the task_pool table in runtime database.
 
         Update the task_pool table and the task_action_timers table.
-        Queue delete (everything) statements to wipe the tables, and queue the
-        relevant insert statements for the current tasks in the pool.
+        Compare the current tasks in the pool, and their action timers, with
+        the rows put last time. Queue insert (or replace) statements for new
+        or changed rows, and delete statements for rows of tasks or timers
+        that have gone. On the first call, unless rows have been loaded on
+        restart, queue delete (everything) statements to wipe the tables,
+        (e.g. of rows left by a previous run of the suite), and insert
+        statements for all current rows.
+
+        (Tables are kept as if rewritten in full each time, so checkpoints
+        taken from them are unaffected.)
         """
-        self.db_deletes_map[self.TABLE_TASK_POOL].append({})
-        self.db_deletes_map[self.TABLE_TASK_ACTION_TIMERS].append({})
+        if self.db_task_pool_rows is None:
+            self.db_deletes_map[self.TABLE_TASK_POOL].append({})
+            self.db_deletes_map[self.TABLE_TASK_ACTION_TIMERS].append({})
+            self.db_task_pool_rows = {}
+            self.db_task_action_timers_rows = {}
+        task_pool_rows = {}
+        task_action_timers_rows = {}
         for itask in self.get_all_tasks():
-            self.db_inserts_map[self.TABLE_TASK_POOL].append({
-                "name": itask.tdef.name,
-                "cycle": str(itask.point),
-                "spawned": int(itask.has_spawned),
-                "status": itask.state.status,
-                "hold_swap": itask.state.hold_swap})
-            for ctx_key_0 in ["poll_timers", "try_timers"]:
-                for ctx_key_1, timer in getattr(itask, ctx_key_0).items():
-                    if timer is None:
-                        continue
-                    self.db_inserts_map[self.TABLE_TASK_ACTION_TIMERS].append({
-                        "name": itask.tdef.name,
-                        "cycle": str(itask.point),
-                        "ctx_key_pickle": pickle.dumps((ctx_key_0, ctx_key_1)),
-                        "ctx_pickle": pickle.dumps(timer.ctx),
-                        "delays_pickle": pickle.dumps(timer.delays),
-                        "num": timer.num,
-                        "delay": timer.delay,
-                        "timeout": timer.timeout})
-            for ctx_key, timer in itask.event_handler_try_timers.items():
-                self.db_inserts_map[self.TABLE_TASK_ACTION_TIMERS].append({
-                    "name": itask.tdef.name,
-                    "cycle": str(itask.point),
-                    "ctx_key_pickle": pickle.dumps(ctx_key),
-                    "ctx_pickle": pickle.dumps(timer.ctx),
-                    "delays_pickle": pickle.dumps(timer.delays),
-                    "num": timer.num,
-                    "delay": timer.delay,
-                    "timeout": timer.timeout})
+            cycle = str(itask.point)
+            name = itask.tdef.name
+            row = (
+                int(itask.has_spawned),
+                itask.state.status,
+                itask.state.hold_swap)
+            task_pool_rows[(cycle, name)] = row
+            if self.db_task_pool_rows.get((cycle, name)) != row:
+                self.db_inserts_map[self.TABLE_TASK_POOL].append({
+                    "name": name,
+                    "cycle": cycle,
+                    "spawned": row[0],
+                    "status": row[1],
+                    "hold_swap": row[2]})
+            prev_timers_rows = self.db_task_action_timers_rows.get(
+                (cycle, name), {})
+            timers_rows = {}
+            for ctx_key, timer in self._get_task_action_timers(itask):
+                timer_values = self._get_task_action_timer_values(timer)
+                try:
+                    ctx_key_str, prev_timer_values = prev_timers_rows[
+                        ctx_key]
+                except KeyError:
+                    ctx_key_str = dump_json_value(ctx_key)
+                    prev_timer_values = None
+                timers_rows[ctx_key] = (ctx_key_str, timer_values)
+                if timer_values != prev_timer_values:
+                    args = timer.get_db_values()
+                    args.update({
+                        "name": name,
+                        "cycle": cycle,
+                        "ctx_key": ctx_key_str})
+                    self.db_inserts_map[self.TABLE_TASK_ACTION_TIMERS].append(
+                        args)
+            for ctx_key, (ctx_key_str, _) in prev_timers_rows.items():
+                if ctx_key not in timers_rows:
+                    self.db_deletes_map[self.TABLE_TASK_ACTION_TIMERS].append({
+                        "name": name,
+                        "cycle": cycle,
+                        "ctx_key": ctx_key_str})
+            if timers_rows:
+                task_action_timers_rows[(cycle, name)] = timers_rows
+        # Tasks that have left the pool
+        for table_name, prev_rows in [
+                (self.TABLE_TASK_POOL, self.db_task_pool_rows),
+                (self.TABLE_TASK_ACTION_TIMERS,
+                 self.db_task_action_timers_rows)]:
+            for cycle, name in prev_rows:
+                if (cycle, name) not in task_pool_rows:
+                    self.db_deletes_map[table_name].append({
+                        "name": name,
+                        "cycle": cycle})
+        self.db_task_pool_rows = task_pool_rows
+        self.db_task_action_timers_rows = task_action_timers_rows
         self.db_inserts_map[self.TABLE_CHECKPOINT_ID].append({
             # id = -1 for latest
             "id": CylcSuiteDAO.CHECKPOINT_LATEST_ID,
             "time": get_current_time_string(),
             "event": CylcSuiteDAO.CHECKPOINT_LATEST_EVENT})
 
+    @staticmethod
+    def _get_task_action_timers(itask):
+        """Return [(ctx_key, timer), ...] for the action timers of itask."""
+        timers = []
+        for ctx_key_0 in ["poll_timers", "try_timers"]:
+            for ctx_key_1, timer in getattr(itask, ctx_key_0).items():
+                if timer is not None:
+                    timers.append(((ctx_key_0, ctx_key_1), timer))
+        timers.extend(itask.event_handler_try_timers.items())
+        return timers
+
+    @staticmethod
+    def _get_task_action_timer_values(timer):
+        """Return values of a task action timer to compare with last put."""
+        return (
+            timer.ctx, tuple(timer.delays), timer.num, timer.delay,
+            timer.timeout)
+
     def _filter_task_proxies(self, items):
         """Return task proxies that match names, points, states in items.
 
@@ -1518,16 +1721,10 @@ class TaskPool(object):
                     except ValueError:
                         # point_str may be a glob
                         pass
-                tasks_found = False
-                for itask in self.get_all_tasks():
-                    nss = itask.tdef.namespace_hierarchy
-                    if (fnmatchcase(str(itask.point), point_str) and
-                            (not status or itask.state.status == status) and
-                            (fnmatchcase(itask.tdef.name, name_str) or
-                             any([fnmatchcase(ns, name_str) for ns in nss]))):
-                        itasks.append(itask)
-                        tasks_found = True
-                if not tasks_found:
+                item_itasks = self.task_index.select(
+                    point_str, name_str, status or None)
+                itasks += item_itasks
+                if not item_itasks:
                     self.log.warning(self.ERR_PREFIX_TASKID_MATCH + item)
                     bad_items.append(item)
         return itasks, bad_items
@@ -1565,25 +1762,36 @@ class TaskPool(object):
             cmd = ["cylc", cmd_key]
             if cylc.flags.debug:
                 cmd.append("--debug")
+            remote_mode = False
             try:
                 if is_remote_host(host):
                     cmd.append("--host=%s" % (host))
                     kwargs["host"] = host
+                    remote_mode = True
             except IOError:
                 # Bad host, run the command any way, command will fail and
                 # callback will deal with it
                 cmd.append("--host=%s" % (host))
                 kwargs["host"] = host
+                remote_mode = True
             if is_remote_user(owner):
                 cmd.append("--user=%s" % (owner))
                 kwargs["user"] = owner
+                remote_mode = True
+            # Run commands for local jobs in the process pool worker.
+            kwargs["in_process"] = not remote_mode
+            kwargs["env"] = None
+            if remote_mode:
+                kwargs["env"] = SSHMultiplexer.get_inst().get_env(host, owner)
             cmd.append("--")
-            cmd.append(GLOBAL_CFG.get_derived_host_item(
-                self.suite_name, "suite job log directory", host, owner))
+            job_log_root = GLOBAL_CFG.get_derived_host_item(
+                self.suite_name, "suite job log directory", host, owner)
+            cmd.append(job_log_root)
             job_log_dirs = []
             for itask in sorted(itasks, key=lambda itask: itask.identity):
                 job_log_dirs.append(itask.get_job_log_path())
             cmd += job_log_dirs
+            kwargs["job_log_root"] = job_log_root
             kwargs["job_log_dirs"] = job_log_dirs
             SuiteProcPool.get_inst().put_command(
                 SuiteProcContext(cmd_key, cmd, **kwargs), callback)
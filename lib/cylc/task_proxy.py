@@ -20,6 +20,7 @@
 
 from collections import namedtuple
 from copy import copy
+import json
 from logging import (
     getLevelName, getLogger, CRITICAL, ERROR, WARNING, INFO, DEBUG)
 import os
@@ -60,12 +61,17 @@ from parsec.config import ItemNotFoundError
 from cylc.task_state import (
     TaskState, TASK_STATUSES_ACTIVE, TASK_STATUS_WAITING,
     TASK_STATUS_READY, TASK_STATUS_SUBMITTED, TASK_STATUS_SUBMIT_FAILED,
-    TASK_STATUS_RUNNING, TASK_STATUS_SUCCEEDED, TASK_STATUS_FAILED)
+    TASK_STATUS_SUBMIT_RETRYING, TASK_STATUS_RUNNING, TASK_STATUS_SUCCEEDED,
+    TASK_STATUS_FAILED, TASK_STATUS_RETRYING)
 from cylc.task_outputs import (
     TASK_OUTPUT_STARTED, TASK_OUTPUT_SUCCEEDED, TASK_OUTPUT_FAILED)
 from cylc.suite_logging import LOG
 
 
+# Decoder of JSON values in the runtime DB, see _decode_json_value.
+_JSON_DECODER = json.JSONDecoder()
+
+
 CustomTaskEventHandlerContext = namedtuple(
     "CustomTaskEventHandlerContext",
     ["key", "ctx_type", "cmd"])
@@ -92,7 +98,7 @@ class TaskActionTimer(object):
         if delays is None:
             self.delays = [float(0)]
         else:
-            self.delays = [float(delay) for delay in delays]
+            self.delays = [float(item) for item in delays]
         self.num = int(num)
         if delay is not None:
             delay = float(delay)
@@ -149,6 +155,116 @@ class TaskActionTimer(object):
         """Return the timeout as an ISO8601 date-time string."""
         return get_time_string_from_unix_time(self.timeout)
 
+    def get_db_values(self):
+        """Return values of columns to store this timer in the runtime DB.
+
+        ctx_type is None if the timer has no context, and ctx_args is a JSON
+        object of the other fields of the context. delays is a JSON list.
+        """
+        ctx_type = None
+        ctx_args = None
+        if self.ctx is not None:
+            ctx_fields = self.ctx._asdict()
+            ctx_type = ctx_fields.pop("ctx_type")
+            ctx_args = dump_json_value(ctx_fields)
+        return {
+            "ctx_type": ctx_type,
+            "ctx_args": ctx_args,
+            "delays": dump_json_value(self.delays),
+            "num": self.num,
+            "delay": self.delay,
+            "timeout": self.timeout}
+
+    @classmethod
+    def from_db_values(cls, ctx_type, ctx_args, delays, num, delay, timeout):
+        """Return a timer from values of columns in the runtime DB.
+
+        Reverse of get_db_values. Raise AttributeError, LookupError, TypeError
+        or ValueError if the values are not valid.
+        """
+        ctx = None
+        if ctx_type is not None:
+            ctx = TASK_ACTION_TIMER_CONTEXTS[ctx_type](
+                ctx_type=ctx_type, **load_json_value(ctx_args))
+        # Delays are numbers, and are converted to floats by __init__.
+        return cls(ctx, _decode_json_value(delays), num, delay, timeout)
+
+
+def dump_json_value(value):
+    """Return value, e.g. a task action timer key, as a compact JSON string."""
+    return json.dumps(value, separators=(",", ":"))
+
+
+def load_json_value(value_str):
+    """Return a value from a string returned by dump_json_value.
+
+    Arrays are loaded as tuples, and strings (including object keys) as str,
+    so keys of task action timers compare and hash as before they were
+    dumped.
+    """
+    return _from_json_value(_decode_json_value(value_str))
+
+
+def _decode_json_value(value_str):
+    """Return the value of a JSON string returned by dump_json_value.
+
+    This is called for every JSON value loaded on restart. The strings have
+    no surrounding whitespace, so skip the whitespace matching of
+    JSONDecoder.decode, which costs more than the decoding of short values.
+    """
+    value, end = _JSON_DECODER.raw_decode(value_str)
+    if end != len(value_str):
+        raise ValueError("Extra data: %r" % value_str[end:])
+    return value
+
+
+def _from_json_value(value):
+    """Helper for load_json_value.
+
+    This is called for every value loaded on restart, so check exact types,
+    most common first, and avoid generator expressions.
+    """
+    value_type = type(value)
+    if value_type is unicode:
+        return value.encode("utf-8")
+    elif value_type is list:
+        return tuple([_from_json_value(item) for item in value])
+    elif value_type is dict:
+        return dict([
+            (key.encode("utf-8"), _from_json_value(item))
+            for key, item in value.iteritems()])
+    return value
+
+
+class TaskSummary(dict):
+    """State summary of a task proxy.
+
+    Setting or deleting an item adds the task ID to dirty_ids, the set of IDs
+    of task proxies with changed state summaries of the task pool, if set.
+    (Containers in the summary must be changed with an item set as well.)
+
+    """
+
+    __slots__ = ["identity", "dirty_ids"]
+
+    def __init__(self, identity, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+        self.identity = identity
+        self.dirty_ids = None
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self.set_dirty()
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self.set_dirty()
+
+    def set_dirty(self):
+        """Register a change of the summary with the task pool."""
+        if self.dirty_ids is not None:
+            self.dirty_ids.add(self.identity)
+
 
 class TaskProxySequenceBoundsError(ValueError):
     """Error on TaskProxy.__init__ with out of sequence bounds start point."""
@@ -186,9 +302,10 @@ class TaskProxy(object):
                  "point_as_seconds", "stop_point", "manual_trigger",
                  "is_manual_submit", "summary", "local_job_file_path",
                  "retries_configured", "try_timers",
-                 "event_handler_try_timers", "db_inserts_map",
-                 "db_updates_map", "suite_name", "task_host", "task_owner",
-                 "job_vacated", "poll_timers",
+                 "event_handler_try_timers", "event_timer_heap",
+                 "db_inserts_map",
+                 "db_updates_map", "db_dirty_itasks", "suite_name",
+                 "task_host", "task_owner", "job_vacated", "poll_timers",
                  "event_hooks", "sim_mode_run_length",
                  "delayed_start_str", "delayed_start", "expire_time_str",
                  "expire_time", "state"]
@@ -277,7 +394,7 @@ class TaskProxy(object):
         self.manual_trigger = False
         self.is_manual_submit = False
 
-        self.summary = {
+        self.summary = TaskSummary(self.identity, {
             'latest_message': "",
             'submitted_time': None,
             'submitted_time_string': None,
@@ -293,7 +410,7 @@ class TaskProxy(object):
             'logfiles': [],
             'job_hosts': {},
             'execution_time_limit': None,
-        }
+        })
         for lfile in self.tdef.rtconfig['extra log files']:
             self.summary['logfiles'].append(expandvars(lfile))
 
@@ -305,8 +422,12 @@ class TaskProxy(object):
             self.KEY_EXECUTE: TaskActionTimer(delays=[]),
             self.KEY_SUBMIT: TaskActionTimer(delays=[])}
         self.event_handler_try_timers = {}
+        # Event handler timer heap of the task pool
+        self.event_timer_heap = None
         self.poll_timers = {}
 
+        # Set of task proxies with queued DB operations, of the task pool
+        self.db_dirty_itasks = None
         self.db_inserts_map = {
             self.TABLE_TASK_JOBS: [],
             self.TABLE_TASK_STATES: [],
@@ -333,13 +454,13 @@ class TaskProxy(object):
         # or restarting the suite, the task proxies already have this db entry.
         if (not self.validate_mode and not is_reload_or_restart and
                 self.submit_num == 0):
-            self.db_inserts_map[self.TABLE_TASK_STATES].append({
+            self._queue_db_insert(self.TABLE_TASK_STATES, {
                 "time_created": get_current_time_string(),
                 "time_updated": get_current_time_string(),
                 "status": status})
 
         if not self.validate_mode and self.submit_num > 0:
-            self.db_updates_map[self.TABLE_TASK_STATES].append({
+            self._queue_db_update(self.TABLE_TASK_STATES, {
                 "time_updated": get_current_time_string(),
                 "status": status})
 
@@ -446,16 +567,34 @@ class TaskProxy(object):
         elif ctx.cmd:
             LOG.debug(ctx_str)
 
+    def has_queued_db_ops(self):
+        """Return True if there are queued DB inserts or updates."""
+        return (
+            any(self.db_inserts_map.values()) or
+            any(self.db_updates_map.values()))
+
+    def _queue_db_insert(self, table_name, args):
+        """Queue a DB insert, and register with the task pool's dirty set."""
+        self.db_inserts_map[table_name].append(args)
+        if self.db_dirty_itasks is not None:
+            self.db_dirty_itasks.add(self)
+
+    def _queue_db_update(self, table_name, set_args):
+        """Queue a DB update, and register with the task pool's dirty set."""
+        self.db_updates_map[table_name].append(set_args)
+        if self.db_dirty_itasks is not None:
+            self.db_dirty_itasks.add(self)
+
     def db_events_insert(self, event="", message=""):
         """Record an event to the DB."""
-        self.db_inserts_map[self.TABLE_TASK_EVENTS].append({
+        self._queue_db_insert(self.TABLE_TASK_EVENTS, {
             "time": get_current_time_string(),
             "event": event,
             "message": message})
 
     def db_update_status(self):
         """Update suite runtime DB task states table."""
-        self.db_updates_map[self.TABLE_TASK_STATES].append({
+        self._queue_db_update(self.TABLE_TASK_STATES, {
             "time_updated": get_current_time_string(),
             "submit_num": self.submit_num,
             "try_num": self.try_timers[self.KEY_EXECUTE].num + 1,
@@ -483,6 +622,33 @@ class TaskProxy(object):
             return False
         return ready
 
+    def get_ready_due_time(self):
+        """Return the next time when "ready_to_run" may be True, or None.
+
+        Return None if the task is waiting on something other than a clock
+        trigger or a retry delay.
+        """
+        if self.state.status == TASK_STATUS_WAITING:
+            if not (self.state.prerequisites_are_all_satisfied() and
+                    all(self.state.external_triggers.values())):
+                return None
+            due_time = 0.0
+        elif self.state.status in [
+                TASK_STATUS_SUBMIT_RETRYING, TASK_STATUS_RETRYING]:
+            timeouts = [
+                self.try_timers[key].timeout
+                for key in [self.KEY_EXECUTE, self.KEY_SUBMIT]
+                if self.try_timers[key].is_timeout_set()]
+            if not timeouts:
+                return None
+            due_time = min(timeouts)
+        else:
+            return None
+        if self.tdef.clocktrigger_offset is not None:
+            self.start_time_reached()  # sets self.delayed_start
+            due_time = max(due_time, self.delayed_start)
+        return due_time
+
     def get_point_as_seconds(self):
         """Compute and store my cycle point as seconds."""
         if self.point_as_seconds is None:
@@ -722,6 +888,13 @@ class TaskProxy(object):
         self.setup_job_logs_retrieval(event, message)
         self.setup_event_mail(event, message)
         self.setup_custom_event_handlers(event, message)
+        self.set_event_handler_timers_due()
+
+    def set_event_handler_timers_due(self, due_time=0.0):
+        """Tell the task pool to check the event handler timers by due_time.
+        """
+        if self.event_timer_heap is not None:
+            self.event_timer_heap.schedule(self.identity, due_time)
 
     def setup_job_logs_retrieval(self, event, _=None):
         """Set up remote job logs retrieval."""
@@ -819,6 +992,7 @@ class TaskProxy(object):
                 del self.event_handler_try_timers[result.cmd_key]
             else:
                 self.event_handler_try_timers[result.cmd_key].unset_waiting()
+                self.set_event_handler_timers_due()
         except KeyError:
             pass
 
@@ -827,7 +1001,7 @@ class TaskProxy(object):
         self.log(ERROR, 'submission failed')
         if event_time is None:
             event_time = get_current_time_string()
-        self.db_updates_map[self.TABLE_TASK_JOBS].append({
+        self._queue_db_update(self.TABLE_TASK_JOBS, {
             "time_submit_exit": get_current_time_string(),
             "submit_status": 1,
         })
@@ -873,7 +1047,7 @@ class TaskProxy(object):
         self.log(INFO, 'submission succeeded')
         now = time.time()
         now_string = get_time_string_from_unix_time(now)
-        self.db_updates_map[self.TABLE_TASK_JOBS].append({
+        self._queue_db_update(self.TABLE_TASK_JOBS, {
             "time_submit_exit": now,
             "submit_status": 0,
             "batch_sys_job_id": self.summary.get('submit_method_id')})
@@ -918,7 +1092,7 @@ class TaskProxy(object):
             self.summary['finished_time'] = float(
                 get_unix_time_from_time_string(event_time))
             self.summary['finished_time_string'] = event_time
-        self.db_updates_map[self.TABLE_TASK_JOBS].append({
+        self._queue_db_update(self.TABLE_TASK_JOBS, {
             "run_status": 1,
             "time_run_exit": self.summary['finished_time_string'],
         })
@@ -1077,7 +1251,7 @@ class TaskProxy(object):
         self.summary['submit_num'] = self.submit_num
         self.local_job_file_path = None
         self.db_events_insert(event="incrementing submit number")
-        self.db_inserts_map[self.TABLE_TASK_JOBS].append({
+        self._queue_db_insert(self.TABLE_TASK_JOBS, {
             "is_manual_submit": self.is_manual_submit,
             "try_num": self.try_timers[self.KEY_EXECUTE].num + 1,
             "time_submit": get_current_time_string(),
@@ -1131,7 +1305,7 @@ class TaskProxy(object):
 
         RemoteJobHostManager.get_inst().init_suite_run_dir(
             self.suite_name, self.task_host, self.task_owner)
-        self.db_updates_map[self.TABLE_TASK_JOBS].append({
+        self._queue_db_update(self.TABLE_TASK_JOBS, {
             "user_at_host": user_at_host,
             "batch_sys_name": self.summary['batch_sys_name'],
         })
@@ -1391,7 +1565,7 @@ class TaskProxy(object):
             self.summary['started_time'] = float(
                 get_unix_time_from_time_string(event_time))
             self.summary['started_time_string'] = event_time
-            self.db_updates_map[self.TABLE_TASK_JOBS].append({
+            self._queue_db_update(self.TABLE_TASK_JOBS, {
                 "time_run": self.summary['started_time_string']})
             if self.summary['execution_time_limit']:
                 execution_timeout = self.summary['execution_time_limit']
@@ -1419,7 +1593,7 @@ class TaskProxy(object):
             self.summary['finished_time'] = float(
                 get_unix_time_from_time_string(event_time))
             self.summary['finished_time_string'] = event_time
-            self.db_updates_map[self.TABLE_TASK_JOBS].append({
+            self._queue_db_update(self.TABLE_TASK_JOBS, {
                 "run_status": 0,
                 "time_run_exit": self.summary['finished_time_string'],
             })
@@ -1444,8 +1618,8 @@ class TaskProxy(object):
             # capture and record signals sent to task proxy
             self.db_events_insert(event="signaled", message=message)
             signal = message.replace(TaskMessage.FAIL_MESSAGE_PREFIX, "")
-            self.db_updates_map[self.TABLE_TASK_JOBS].append(
-                {"run_signal": signal})
+            self._queue_db_update(
+                self.TABLE_TASK_JOBS, {"run_signal": signal})
 
         elif message.startswith(TaskMessage.VACATION_MESSAGE_PREFIX):
             flags.pflag = True
@@ -1477,6 +1651,7 @@ class TaskProxy(object):
     def spawn(self, state):
         """Spawn the successor of this task proxy."""
         self.has_spawned = True
+        self.summary.set_dirty()
         next_point = self.next_point()
         if next_point:
             return TaskProxy(
@@ -1507,13 +1682,18 @@ class TaskProxy(object):
                     self.state.is_greater_than(TASK_STATUS_READY))
 
     def get_state_summary(self):
-        """Return a dict containing the state summary of this task proxy."""
-        self.summary['state'] = self.state.status
-        self.summary['spawned'] = str(self.has_spawned)
-        self.summary['mean_elapsed_time'] = (
+        """Return a dict containing the state summary of this task proxy.
+
+        The dict shares its containers with the summary of the task proxy.
+
+        """
+        summary = dict(self.summary)
+        summary['state'] = self.state.status
+        summary['spawned'] = str(self.has_spawned)
+        summary['mean_elapsed_time'] = (
             float(sum(self.tdef.elapsed_times)) /
             max(len(self.tdef.elapsed_times), 1))
-        return self.summary
+        return summary
 
     def next_point(self):
         """Return the next cycle point."""
@@ -1564,6 +1744,29 @@ class TaskProxy(object):
             )
         )
 
+    def get_poll_due_time(self):
+        """Return the next time when "check_poll_ready" may be True, or None.
+        """
+        if self.state.status == TASK_STATUS_SUBMITTED:
+            key = self.KEY_SUBMIT
+            timeout = self.state.submission_timer_timeout
+        elif self.state.status == TASK_STATUS_RUNNING:
+            key = self.KEY_EXECUTE
+            timeout = self.state.execution_timer_timeout
+            timer = self.poll_timers.get(self.KEY_EXECUTE_TIME_LIMIT)
+            if (timeout is not None and
+                    self.summary['execution_time_limit'] and
+                    timer is not None and timer.is_timeout_set()):
+                # Execution time limit exceeded, polls on the timer
+                timeout = max(timeout, timer.timeout)
+        else:
+            return None
+        timer = self.poll_timers.get(key)
+        if timer is not None and timer.is_timeout_set():
+            if timeout is None or timer.timeout < timeout:
+                timeout = timer.timeout
+        return timeout
+
     def _check_poll_timer(self, key, now=None):
         """Set the next execution/submission poll time."""
         timer = self.poll_timers.get(key)
@@ -1583,3 +1786,11 @@ class TaskProxy(object):
             if delay is not None:
                 self.log(INFO, 'next job poll in %s (after %s)' % (
                     timer.delay_as_seconds(), timer.timeout_as_str()))
+
+
+# Task action timer context classes, by ctx_type
+TASK_ACTION_TIMER_CONTEXTS = {
+    TaskProxy.CUSTOM_EVENT_HANDLER: CustomTaskEventHandlerContext,
+    TaskProxy.EVENT_MAIL: TaskEventMailContext,
+    TaskProxy.JOB_LOGS_RETRIEVE: TaskJobLogsRetrieveContext,
+}
@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2017 NIWA
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Keep track of ready, queued and active tasks of the internal queues.
+
+The tracker holds the task proxies of the (non-runahead) task pool, with:
+ * The task proxies that may have become ready to run, and need a check.
+   These are kept in a heap by the time of their next check, so a task proxy
+   waiting on a clock trigger or a retry delay is checked when it is due.
+ * The task proxies queued in each internal queue, in the order queued.
+ * The number of active task proxies in each internal queue.
+These are maintained incrementally:
+ * The task pool calls "add" and "remove" as tasks enter and leave the pool,
+   or change queue.
+ * Task states call "status_changed" when their status changes, and
+   "set_ready_check_due" when their prerequisites are satisfied.
+
+"""
+
+from collections import OrderedDict
+import unittest
+
+from cylc.task_state import (
+    TASK_STATUS_WAITING, TASK_STATUS_QUEUED, TASK_STATUS_READY,
+    TASK_STATUS_SUBMITTED, TASK_STATUS_SUBMIT_RETRYING, TASK_STATUS_RUNNING,
+    TASK_STATUS_RETRYING, TASK_STATUS_SUCCEEDED)
+from cylc.task_timer_heap import TaskTimerHeap
+
+
+class TaskQueueTracker(object):
+    """Track ready, queued and active tasks of the internal queues."""
+
+    # Statuses of active tasks, for queue limit purposes.
+    STATUSES_ACTIVE = set([
+        TASK_STATUS_READY, TASK_STATUS_SUBMITTED, TASK_STATUS_RUNNING])
+    # Statuses of tasks that may be ready to run, or manually triggered.
+    STATUSES_READY_CHECK = set([
+        TASK_STATUS_WAITING, TASK_STATUS_READY, TASK_STATUS_SUBMIT_RETRYING,
+        TASK_STATUS_RETRYING])
+
+    def __init__(self):
+        # itasks[identity] = (itask, queue), for all task proxies.
+        self.itasks = {}
+        # n_active[queue] = number of active task proxies in queue.
+        self.n_active = {}
+        # queued[queue] = {identity: itask, ...}, in the order queued.
+        self.queued = {}
+        # Task proxies by time of next ready check.
+        self.ready_check_heap = TaskTimerHeap()
+
+    def add(self, itask, queue):
+        """Add a task proxy to queue, due for a ready check."""
+        if itask.identity in self.itasks:
+            self.remove(self.itasks[itask.identity][0])
+        self.itasks[itask.identity] = (itask, queue)
+        itask.state.queue_tracker = self
+        self.n_active.setdefault(queue, 0)
+        self.queued.setdefault(queue, OrderedDict())
+        if itask.state.status in self.STATUSES_ACTIVE:
+            self.n_active[queue] += 1
+        elif itask.state.status == TASK_STATUS_QUEUED:
+            self.queued[queue][itask.identity] = itask
+        self.ready_check_heap.add(itask)
+
+    def remove(self, itask):
+        """Remove a task proxy from the tracker."""
+        try:
+            itask_in, queue = self.itasks[itask.identity]
+        except KeyError:
+            return
+        if itask_in is not itask:
+            return
+        del self.itasks[itask.identity]
+        itask.state.queue_tracker = None
+        if itask.state.status in self.STATUSES_ACTIVE:
+            self.n_active[queue] -= 1
+        self.queued[queue].pop(itask.identity, None)
+        self.ready_check_heap.remove(itask)
+
+    def status_changed(self, identity, old_status, new_status):
+        """Register a change of status of a task proxy."""
+        try:
+            itask, queue = self.itasks[identity]
+        except KeyError:
+            return
+        if old_status in self.STATUSES_ACTIVE:
+            self.n_active[queue] -= 1
+        elif old_status == TASK_STATUS_QUEUED:
+            self.queued[queue].pop(identity, None)
+        if new_status in self.STATUSES_ACTIVE:
+            self.n_active[queue] += 1
+        elif new_status == TASK_STATUS_QUEUED:
+            self.queued[queue][identity] = itask
+        if new_status in self.STATUSES_READY_CHECK:
+            self.ready_check_heap.schedule(identity)
+
+    def set_ready_check_due(self, identity, due_time=0.0):
+        """Schedule a ready check of a task proxy by due_time.
+
+        Do nothing if due_time is None.
+        """
+        self.ready_check_heap.schedule(identity, due_time)
+
+    def pop_ready_check_due(self, now):
+        """Return the task proxies due for a ready check before now."""
+        return self.ready_check_heap.pop_due(now)
+
+    def is_ready_check_due(self, now):
+        """Return True if any task proxy is due for a ready check."""
+        due_time = self.ready_check_heap.get_next_due_time()
+        return due_time is not None and due_time < now
+
+    def get_n_active(self, queue):
+        """Return the number of active task proxies in queue."""
+        return self.n_active.get(queue, 0)
+
+    def iter_queued(self, queue):
+        """Iterate the queued task proxies of queue, in the order queued.
+
+        The status of the task proxies must not change during the iteration.
+        """
+        return self.queued.get(queue, {}).itervalues()
+
+
+class TestTaskQueueTracker(unittest.TestCase):
+    """Unit tests for TaskQueueTracker."""
+
+    class _FakeTaskState(object):
+        """Minimal stand-in for TaskState."""
+
+        def __init__(self, identity, status):
+            self.identity = identity
+            self.status = status
+            self.queue_tracker = None
+
+        def set_state(self, status):
+            old_status = self.status
+            self.status = status
+            if self.queue_tracker is not None:
+                self.queue_tracker.status_changed(
+                    self.identity, old_status, status)
+
+    class _FakeTaskProxy(object):
+        """Minimal stand-in for TaskProxy."""
+
+        def __init__(self, identity, status):
+            self.identity = identity
+            self.state = TestTaskQueueTracker._FakeTaskState(
+                identity, status)
+
+    def setUp(self):
+        self.tracker = TaskQueueTracker()
+        self.itasks = {}
+        for identity, queue, status in [
+                ("foo.1", "q1", TASK_STATUS_RUNNING),
+                ("bar.1", "q1", TASK_STATUS_QUEUED),
+                ("baz.1", "q1", TASK_STATUS_WAITING),
+                ("qux.1", "q2", TASK_STATUS_SUCCEEDED)]:
+            itask = self._FakeTaskProxy(identity, status)
+            self.itasks[identity] = itask
+            self.tracker.add(itask, queue)
+
+    def _pop_ready_check_due(self, now):
+        """Return sorted identities of task proxies due for a ready check."""
+        return sorted(
+            itask.identity
+            for itask in self.tracker.pop_ready_check_due(now))
+
+    def _get_queued(self, queue):
+        """Return identities of queued task proxies of queue, in order."""
+        return [itask.identity for itask in self.tracker.iter_queued(queue)]
+
+    def test_add(self):
+        """Test counts and ready checks on add."""
+        self.assertEqual(1, self.tracker.get_n_active("q1"))
+        self.assertEqual(0, self.tracker.get_n_active("q2"))
+        self.assertEqual(0, self.tracker.get_n_active("q3"))
+        self.assertEqual(["bar.1"], self._get_queued("q1"))
+        self.assertEqual([], self._get_queued("q3"))
+        self.assertTrue(self.tracker.is_ready_check_due(1.0))
+        self.assertEqual(
+            ["bar.1", "baz.1", "foo.1", "qux.1"],
+            self._pop_ready_check_due(1.0))
+        self.assertFalse(self.tracker.is_ready_check_due(1.0))
+
+    def test_status_changed(self):
+        """Test counts, queue order and ready checks on status changes."""
+        self._pop_ready_check_due(1.0)
+        self.itasks["baz.1"].state.set_state(TASK_STATUS_QUEUED)
+        self.itasks["qux.1"].state.set_state(TASK_STATUS_WAITING)
+        self.assertEqual(["qux.1"], self._pop_ready_check_due(1.0))
+        self.itasks["foo.1"].state.set_state(TASK_STATUS_RETRYING)
+        self.assertEqual(0, self.tracker.get_n_active("q1"))
+        self.assertEqual(["bar.1", "baz.1"], self._get_queued("q1"))
+        self.itasks["bar.1"].state.set_state(TASK_STATUS_READY)
+        self.assertEqual(1, self.tracker.get_n_active("q1"))
+        self.assertEqual(["baz.1"], self._get_queued("q1"))
+        self.assertEqual(["bar.1", "foo.1"], self._pop_ready_check_due(1.0))
+        self.tracker.set_ready_check_due("foo.1", 10.0)
+        self.tracker.set_ready_check_due("bar.1", None)
+        self.assertFalse(self.tracker.is_ready_check_due(10.0))
+        self.assertEqual(["foo.1"], self._pop_ready_check_due(20.0))
+
+    def test_remove(self):
+        """Test counts on remove, and re-add to another queue."""
+        self.tracker.remove(self.itasks["foo.1"])
+        self.tracker.remove(self.itasks["bar.1"])
+        self.assertEqual(0, self.tracker.get_n_active("q1"))
+        self.assertEqual([], self._get_queued("q1"))
+        self.assertEqual(["baz.1", "qux.1"], self._pop_ready_check_due(1.0))
+        # Status changes of removed tasks are ignored.
+        self.itasks["foo.1"].state.set_state(TASK_STATUS_SUBMITTED)
+        self.assertEqual(0, self.tracker.get_n_active("q1"))
+        # Re-add, and move to another queue.
+        self.tracker.add(self.itasks["foo.1"], "q1")
+        self.tracker.add(self.itasks["foo.1"], "q2")
+        self.assertEqual(0, self.tracker.get_n_active("q1"))
+        self.assertEqual(1, self.tracker.get_n_active("q2"))
+
+
+if __name__ == '__main__':
+    unittest.main()
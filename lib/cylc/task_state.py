@@ -170,7 +170,9 @@ class TaskState(object):
                  "_is_satisfied", "_suicide_is_satisfied", "prerequisites",
                  "suicide_prerequisites", "external_triggers", "outputs",
                  "kill_failed", "hold_swap", "run_mode",
-                 "submission_timer_timeout", "execution_timer_timeout"]
+                 "submission_timer_timeout", "execution_timer_timeout",
+                 "broker", "runahead_tracker", "poll_timer_heap",
+                 "queue_tracker", "task_index", "summary_dirty_ids"]
 
     # Associate status names with other properties.
     _STATUS_MAP = {
@@ -255,6 +257,25 @@ class TaskState(object):
         self._is_satisfied = False
         self._suicide_is_satisfied = False
 
+        # Dependency broker of the task pool (set by the broker while in the
+        # task pool).
+        self.broker = None
+        # Runahead tracker of the task pool (set by the tracker while in the
+        # task pool).
+        self.runahead_tracker = None
+        # Poll timer heap of the task pool (set by the task pool while in the
+        # task pool).
+        self.poll_timer_heap = None
+        # Queue tracker of the task pool (set by the tracker while in the
+        # task pool).
+        self.queue_tracker = None
+        # Task index of the task pool (set by the index while in the task
+        # pool).
+        self.task_index = None
+        # IDs of task proxies with changed state summaries, of the task pool
+        # (set by the task pool while in the task pool).
+        self.summary_dirty_ids = None
+
         # Prerequisites.
         self.prerequisites = []
         self.suicide_prerequisites = []
@@ -294,6 +315,9 @@ class TaskState(object):
             for preq in preqs:
                 if preq.satisfy_me(task_output_msgs, task_outputs):
                     self._recalc_satisfied = True
+        if self._recalc_satisfied and self.queue_tracker is not None:
+            # Task may be ready to run now
+            self.queue_tracker.set_ready_check_due(self.identity)
 
     def prerequisites_are_all_satisfied(self):
         """Return True if (non-suicide) prerequisites are fully satisfied."""
@@ -341,6 +365,9 @@ class TaskState(object):
         for prereq in self.prerequisites:
             prereq.set_not_satisfied()
         self._recalc_satisfied = True
+        if self.broker is not None:
+            # Prerequisites may need to be satisfied again by existing outputs.
+            self.broker.prerequisites_reset(self.identity)
 
     def prerequisites_dump(self):
         """Dump prerequisites."""
@@ -353,7 +380,8 @@ class TaskState(object):
         """Report who I triggered off."""
         satby = {}
         for req in self.prerequisites:
-            satby.update(req.satisfied_by)
+            if req.satisfied_by:
+                satby.update(req.satisfied_by)
         dep = satby.values()
         # order does not matter here; sort to allow comparison with
         # reference run task with lots of near-simultaneous triggers.
@@ -408,6 +436,20 @@ class TaskState(object):
             self.hold_swap = None
         else:
             self.log(loglvl, '%s => %s' % (self.status, status))
+        if self.runahead_tracker is not None:
+            self.runahead_tracker.status_changed(
+                self.identity, self.status, status)
+        if (self.poll_timer_heap is not None and
+                status in [TASK_STATUS_SUBMITTED, TASK_STATUS_RUNNING]):
+            # Submission/execution timeout and poll timers need checking
+            self.poll_timer_heap.schedule(self.identity)
+        if self.queue_tracker is not None:
+            self.queue_tracker.status_changed(
+                self.identity, self.status, status)
+        if self.task_index is not None:
+            self.task_index.status_changed(self.identity, self.status, status)
+        if self.summary_dirty_ids is not None:
+            self.summary_dirty_ids.add(self.identity)
         self.status = status
         flags.iflag = True
         self.db_update_status()
@@ -568,16 +610,16 @@ class TaskState(object):
         self._recalc_satisfied = True
 
         for sequence, exps in tdef.triggers.items():
+            if not sequence.is_valid(point):
+                # These triggers are not valid for current cycle (see NOTE
+                # just above)
+                continue
             for ctrig, exp in exps:
                 key = ctrig.keys()[0]
-                if not sequence.is_valid(point):
-                    # This trigger is not valid for current cycle (see NOTE
-                    # just above)
-                    continue
-
-                cpre = Prerequisite(identity, point, tdef.start_point)
-
-                for label in ctrig:
+                labels = []
+                messages = []
+                drop_these = []
+                for label in sorted(ctrig):
                     trig = ctrig[label]
                     if trig.graph_offset_string is not None:
                         prereq_offset_point = get_point_relative(
@@ -589,12 +631,21 @@ class TaskState(object):
                                      tdef.max_future_prereq_offset)):
                                 tdef.max_future_prereq_offset = (
                                     prereq_offset)
-                        cpre.add(trig.get_prereq(point), label,
-                                 ((prereq_offset_point < tdef.start_point) &
-                                  (point >= tdef.start_point)))
-                    else:
-                        cpre.add(trig.get_prereq(point), label)
-                cpre.set_condition(exp)
+                        if (prereq_offset_point < tdef.start_point and
+                                point >= tdef.start_point):
+                            # Drop pre-initial dependence.
+                            drop_these.append(label)
+                            continue
+                    if (tdef.start_point and point >= tdef.start_point and
+                            trig.get_point(point) < tdef.start_point):
+                        # Drop pre warm-start dependence.
+                        drop_these.append(label)
+                        continue
+                    labels.append(label)
+                    messages.append(trig.get_prereq(point))
+                cpre = Prerequisite(
+                    tdef.get_prereq_template(labels, exp, drop_these),
+                    messages)
                 if ctrig[key].suicide:
                     self.suicide_prerequisites.append(cpre)
                 else:
@@ -611,10 +662,14 @@ class TaskState(object):
                     adjusted.append(prv)
             if adjusted:
                 p_prev = max(adjusted)
-                cpre = Prerequisite(identity, point, tdef.start_point)
-                prereq = "%s %s" % (TaskID.get(tdef.name, p_prev),
-                                    TASK_STATUS_SUCCEEDED)
                 label = tdef.name
-                cpre.add(prereq, label, p_prev < tdef.start_point)
-                cpre.set_condition(label)
+                if p_prev < tdef.start_point:
+                    # Drop pre-initial dependence.
+                    cpre = Prerequisite(
+                        tdef.get_prereq_template([], label, [label]), [])
+                else:
+                    cpre = Prerequisite(
+                        tdef.get_prereq_template([label], label),
+                        ["%s %s" % (TaskID.get(tdef.name, p_prev),
+                                    TASK_STATUS_SUCCEEDED)])
                 self.prerequisites.append(cpre)
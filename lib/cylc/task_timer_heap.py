@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2017 NIWA
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Schedule task proxies for timer checks, by time of next timer check.
+
+The heap holds the task proxies of the task pool, each with the time when its
+timers (e.g. poll, timeout, or event handler retry timers) need checking next.
+ * The task pool calls "add" and "remove" as tasks enter and leave the pool.
+ * Task proxies, or their owner, call "schedule" when their timers change.
+ * The main loop calls "pop_due" to get the task proxies that are due for a
+   check, and reschedules each of them after the check.
+
+Entries are not removed from the heap on reschedule or on remove, but are
+dropped on access if they no longer match the due time of their task proxy.
+The heap is rebuilt on remove if it has too many of these stale entries.
+
+"""
+
+from heapq import heapify, heappop, heappush
+import unittest
+
+
+class TaskTimerHeap(object):
+    """Min-heap of task proxies keyed by time of next timer check."""
+
+    # Rebuild the heap if it has more than this many stale entries.
+    MAX_STALE_ENTRIES = 1000
+
+    def __init__(self):
+        # itasks[identity] = itask, for all task proxies in the heap.
+        self.itasks = {}
+        # due_times[identity] = time of next check, if task proxy is due.
+        self.due_times = {}
+        # Heap of (due_time, identity). May contain stale entries.
+        self.heap = []
+
+    def add(self, itask, due_time=0.0):
+        """Add a task proxy to the heap, due for a check at due_time.
+
+        By default, a new task proxy is due for a check immediately.
+        """
+        self.itasks[itask.identity] = itask
+        self.due_times.pop(itask.identity, None)
+        self.schedule(itask.identity, due_time)
+
+    def remove(self, itask):
+        """Remove a task proxy from the heap."""
+        if self.itasks.get(itask.identity) is itask:
+            del self.itasks[itask.identity]
+            self.due_times.pop(itask.identity, None)
+            if len(self.heap) - len(self.due_times) > self.MAX_STALE_ENTRIES:
+                self.heap = [
+                    (due_time, identity)
+                    for identity, due_time in self.due_times.items()]
+                heapify(self.heap)
+
+    def schedule(self, identity, due_time=0.0):
+        """Schedule a check of a task proxy no later than due_time.
+
+        Do nothing if due_time is None, or if the task proxy is not in the
+        heap, or if it is already due for a check on or before due_time.
+        """
+        if due_time is None or identity not in self.itasks:
+            return
+        prev_due_time = self.due_times.get(identity)
+        if prev_due_time is not None and prev_due_time <= due_time:
+            return
+        self.due_times[identity] = due_time
+        heappush(self.heap, (due_time, identity))
+
+    def get_next_due_time(self):
+        """Return the time of the next check, or None if nothing is due."""
+        heap = self.heap
+        while heap and self.due_times.get(heap[0][1]) != heap[0][0]:
+            heappop(heap)
+        if heap:
+            return heap[0][0]
+        return None
+
+    def pop_due(self, now):
+        """Return the task proxies due for a check before now.
+
+        The returned task proxies are no longer due for a check, until they
+        are scheduled again.
+        """
+        itasks = []
+        heap = self.heap
+        while heap and heap[0][0] < now:
+            due_time, identity = heappop(heap)
+            if self.due_times.get(identity) == due_time:
+                del self.due_times[identity]
+                itasks.append(self.itasks[identity])
+        return itasks
+
+
+class TestTaskTimerHeap(unittest.TestCase):
+    """Unit tests for TaskTimerHeap."""
+
+    class _FakeTaskProxy(object):
+        """Minimal stand-in for TaskProxy."""
+
+        def __init__(self, identity):
+            self.identity = identity
+
+    def setUp(self):
+        self.heap = TaskTimerHeap()
+        self.itasks = {}
+        for identity in ["foo.1", "bar.1", "baz.1"]:
+            self.itasks[identity] = self._FakeTaskProxy(identity)
+
+    def _pop_due(self, now):
+        """Return sorted identities of task proxies due before now."""
+        return sorted(itask.identity for itask in self.heap.pop_due(now))
+
+    def test_add(self):
+        """Test new task proxies are due immediately by default."""
+        self.heap.add(self.itasks["foo.1"])
+        self.heap.add(self.itasks["bar.1"], 20.0)
+        self.assertEqual(0.0, self.heap.get_next_due_time())
+        self.assertEqual(["foo.1"], self._pop_due(10.0))
+        self.assertEqual([], self._pop_due(10.0))
+        self.assertEqual(20.0, self.heap.get_next_due_time())
+        self.assertEqual(["bar.1"], self._pop_due(30.0))
+        self.assertEqual(None, self.heap.get_next_due_time())
+
+    def test_schedule(self):
+        """Test earliest due time wins, and reschedule after pop."""
+        for itask in self.itasks.values():
+            self.heap.add(itask, None)
+        self.assertEqual(None, self.heap.get_next_due_time())
+        self.heap.schedule("foo.1", 30.0)
+        self.heap.schedule("foo.1", 40.0)
+        self.heap.schedule("bar.1", 20.0)
+        self.heap.schedule("foo.1", 10.0)
+        self.heap.schedule("baz.1", None)
+        self.heap.schedule("qux.1", 5.0)
+        self.assertEqual(10.0, self.heap.get_next_due_time())
+        self.assertEqual([], self._pop_due(10.0))
+        self.assertEqual(["bar.1", "foo.1"], self._pop_due(25.0))
+        self.assertEqual(None, self.heap.get_next_due_time())
+        self.heap.schedule("foo.1", 40.0)
+        self.assertEqual(40.0, self.heap.get_next_due_time())
+        self.assertEqual(["foo.1"], self._pop_due(50.0))
+
+    def test_remove(self):
+        """Test removed task proxies are no longer due."""
+        self.heap.add(self.itasks["foo.1"], 10.0)
+        self.heap.add(self.itasks["bar.1"], 20.0)
+        self.heap.remove(self.itasks["foo.1"])
+        self.heap.schedule("foo.1", 5.0)
+        self.assertEqual(20.0, self.heap.get_next_due_time())
+        self.assertEqual(["bar.1"], self._pop_due(30.0))
+        # Re-add.
+        self.heap.add(self.itasks["foo.1"], 40.0)
+        self.assertEqual(["foo.1"], self._pop_due(50.0))
+
+    def test_remove_rebuild(self):
+        """Test stale entries are dropped on remove."""
+        self.heap.MAX_STALE_ENTRIES = 1
+        for itask in self.itasks.values():
+            self.heap.add(itask)
+        self.heap.remove(self.itasks["foo.1"])
+        self.assertEqual(3, len(self.heap.heap))
+        self.heap.remove(self.itasks["bar.1"])
+        self.assertEqual([(0.0, "baz.1")], self.heap.heap)
+        self.assertEqual(["baz.1"], self._pop_due(10.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
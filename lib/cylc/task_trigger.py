@@ -159,10 +159,14 @@ It generates a concrete prerequisite string given a task's cycle point value.
                 re.sub('\[.*\]', str(msg_point), preq))
         else:
             # Built-in trigger
-            if self.cycle_point:
-                point = self.cycle_point
-            elif self.graph_offset_string:
-                point = get_point_relative(
-                    self.graph_offset_string, point)
-            preq = TaskID.get(self.task_name, point) + ' ' + self.builtin
+            preq = (TaskID.get(self.task_name, self.get_point(point)) + ' ' +
+                    self.builtin)
         return preq
+
+    def get_point(self, point):
+        """Return the cycle point of the upstream task."""
+        if self.cycle_point:
+            return self.cycle_point
+        elif self.graph_offset_string:
+            return get_point_relative(self.graph_offset_string, point)
+        return point
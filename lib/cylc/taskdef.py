@@ -22,6 +22,7 @@ from collections import deque
 
 from cylc.cycling.loader import (
     get_point_relative, get_interval, is_offset_absolute)
+from cylc.prerequisite import PrerequisiteTemplate
 from cylc.task_id import TaskID
 
 
@@ -47,7 +48,7 @@ class TaskDef(object):
         "intercycle_offsets", "sequential", "is_coldstart",
         "suite_polling_cfg", "clocktrigger_offset", "expiration_offset",
         "namespace_hierarchy", "triggers", "outputs", "external_triggers",
-        "name", "elapsed_times"]
+        "name", "elapsed_times", "prereq_templates"]
 
     # Store the elapsed times for a maximum of 10 cycles
     MAX_LEN_ELAPSED_TIMES = 10
@@ -76,6 +77,9 @@ class TaskDef(object):
         self.namespace_hierarchy = []
         self.triggers = {}
         self.outputs = []
+        # Prerequisite structures shared by task proxies, see
+        # "get_prereq_template".
+        self.prereq_templates = {}
 
         self.external_triggers = []
 
@@ -88,6 +92,22 @@ class TaskDef(object):
             self.triggers[sequence] = []
         self.triggers[sequence].append([triggers, expression])
 
+    def get_prereq_template(self, labels, expression, drop_these=None):
+        """Return a (shared) PrerequisiteTemplate.
+
+        labels -- labels of the trigger expression left after dropping
+                  "drop_these" (pre-initial and pre-start-point labels).
+        """
+        if drop_these is None:
+            drop_these = []
+        key = (tuple(labels), expression, tuple(drop_these))
+        try:
+            return self.prereq_templates[key]
+        except KeyError:
+            self.prereq_templates[key] = PrerequisiteTemplate(
+                labels, expression, drop_these)
+            return self.prereq_templates[key]
+
     def add_sequence(self, sequence, is_implicit=False):
         """Add a sequence."""
         if sequence not in self.sequences:
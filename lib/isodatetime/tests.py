@@ -1183,6 +1183,45 @@ class TestSuite(unittest.TestCase):
             self.assertEqual(test_data, ctrl_data,
                              "UTC for " + expression)
 
+    def test_timepoint_parser_dump_format(self):
+        """Test parsing with and without the dump format regular expression.
+        """
+        for dump_format, timepoint_strings in [
+                ("CCYYMMDDThhmmZ", ["20000101T0000Z", "20000101T00"]),
+                ("CCYYMMDDThhmm+0530", ["20000101T0000+0530",
+                                        "19990101T0000-0100"]),
+                ("+XCCYYMMDDThhmmZ", ["+0020000101T0000Z",
+                                      "-0020000101T0000Z"]),
+                ("CCYY-MM-DDThh:mm:ss-03:00", ["2000-01-01T00:00:00+01:00",
+                                               "20000101T0000Z"]),
+                ("CCYYDDDThhZ", ["2000123T06Z", "2000-123T06"]),
+                ("CCYYMMDD", ["20000101", "2000-01-01"]),
+                ("%Y%m%dT%H%M", ["20000101T0000", "20000101T0000Z"])]:
+            parser = parsers.TimePointParser(
+                num_expanded_year_digits=2, dump_format=dump_format,
+                assumed_time_zone=(1, 0))
+            self.assertTrue(parser._dump_format_regex is not None)
+            ctrl_parser = parsers.TimePointParser(
+                num_expanded_year_digits=2, dump_format=dump_format,
+                assumed_time_zone=(1, 0))
+            ctrl_parser._dump_format_regex = None
+            for timepoint_string in timepoint_strings:
+                test_data = parser.parse(timepoint_string)
+                ctrl_data = ctrl_parser.parse(timepoint_string)
+                self.assertEqual(test_data.get_props(), ctrl_data.get_props())
+                self.assertEqual(str(test_data), str(ctrl_data))
+                test_data = parser.parse(
+                    timepoint_string, dump_as_parsed=True)
+                ctrl_data = ctrl_parser.parse(
+                    timepoint_string, dump_as_parsed=True)
+                self.assertEqual(str(test_data), str(ctrl_data))
+        # The generic parser is still used for anything else.
+        parser = parsers.TimePointParser(dump_format="hhmm")
+        self.assertTrue(parser._dump_format_regex is None)
+        self.assertEqual(
+            "20000101T06+01",
+            str(parser.parse("20000101T06+01", dump_as_parsed=True)))
+
     def test_timepoint_strftime_strptime(self):
         """Test the strftime/strptime for date/time expressions."""
         import datetime
@@ -1450,6 +1489,42 @@ def test_timepoint_at_year(test_year):
         my_date += timedelta
 
 
+def benchmark_timepoint_parser(dump_format="CCYYMMDDThhmmZ", num_points=10000):
+    """Time parsing timepoints in the dump format, with and without the
+    dump format regular expression.
+
+    Return the times taken, in seconds, without and with.
+
+    """
+    import timeit
+    timepoint = data.TimePoint(year=2000, month_of_year=1, day_of_month=1,
+                               hour_of_day=0, minute_of_hour=0,
+                               time_zone_hour=0, time_zone_minute=0,
+                               dump_format=dump_format)
+    timepoint_strings = []
+    for _ in range(num_points):
+        timepoint += data.Duration(hours=1)
+        timepoint_strings.append(str(timepoint))
+    results = []
+    for use_dump_format_regex in [False, True]:
+        parser = parsers.TimePointParser(dump_format=dump_format)
+        if not use_dump_format_regex:
+            parser._dump_format_regex = None
+        results.append(min(timeit.repeat(
+            lambda: [parser.parse(string) for string in timepoint_strings],
+            repeat=3, number=1)))
+    return tuple(results)
+
+
 if __name__ == "__main__":
+    import sys
+    if sys.argv[1:] == ["benchmark"]:
+        for dump_format in ["CCYYMMDDThhmmZ", "CCYY-MM-DDThh:mm:ss+05:30"]:
+            generic_time, dump_format_time = benchmark_timepoint_parser(
+                dump_format)
+            print "%s: generic %.3fs, dump format %.3fs (%.1fx)" % (
+                dump_format, generic_time, dump_format_time,
+                generic_time / dump_format_time)
+        sys.exit()
     suite = unittest.TestLoader().loadTestsFromTestCase(TestSuite)
     unittest.TextTestRunner(verbosity=2).run(suite)
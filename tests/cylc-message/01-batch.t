@@ -0,0 +1,37 @@
+#!/bin/bash
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2017 NIWA
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+# Test "cylc message" sends multiple messages in a single request.
+. "$(dirname "$0")/test_header"
+#-------------------------------------------------------------------------------
+set_test_number 4
+
+install_suite "${TEST_NAME_BASE}" "${TEST_NAME_BASE}"
+
+run_ok "${TEST_NAME_BASE}-validate" cylc validate "${SUITE_NAME}"
+suite_run_ok "${TEST_NAME_BASE}-run" \
+    cylc run --debug --no-detach "${SUITE_NAME}"
+
+SUITE_LOG="$(cylc cat-log -l "${SUITE_NAME}")"
+grep_ok "\\[t1\\.1\\] -(current:running)> hello 3 at " "${SUITE_LOG}"
+# started, 3 x hello, succeeded from t1; started, succeeded from t2.
+TEST_NAME="${TEST_NAME_BASE}-requests"
+grep -c '\[client-command\] task_messages ' "${SUITE_LOG}" >"${TEST_NAME}.out"
+cmp_ok "${TEST_NAME}.out" <<<'5'
+
+purge_suite "${SUITE_NAME}"
+exit
@@ -0,0 +1,65 @@
+#!/bin/bash
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2017 NIWA
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+# Test "cylc message" with local aggregation of messages.
+. "$(dirname "$0")/test_header"
+#-------------------------------------------------------------------------------
+set_test_number 8
+
+create_test_globalrc '' '
+[task messaging]
+    local aggregation = True'
+
+install_suite "${TEST_NAME_BASE}" "${TEST_NAME_BASE}"
+
+run_ok "${TEST_NAME_BASE}-validate" cylc validate "${SUITE_NAME}"
+suite_run_ok "${TEST_NAME_BASE}-run" \
+    cylc run --debug --no-detach "${SUITE_NAME}"
+
+SUITE_LOG="$(cylc cat-log -l "${SUITE_NAME}")"
+grep_ok "\\[done\\.1\\] -(current:running)> succeeded at " "${SUITE_LOG}"
+# All spooled messages are sent.
+SPOOL_DIR="${SUITE_RUN_DIR}/.service/messages"
+TEST_NAME="${TEST_NAME_BASE}-spool-empty"
+ls "${SPOOL_DIR}" >"${TEST_NAME}.out"
+cmp_ok "${TEST_NAME}.out" <<<'lock'
+# All messages are delivered.
+TEST_NAME="${TEST_NAME_BASE}-delivered"
+grep -c '\[t[0-9]\.1\] -(current:running)> hello at ' "${SUITE_LOG}" \
+    >"${TEST_NAME}.out"
+cmp_ok "${TEST_NAME}.out" <<<'10'
+# Messages that cannot be sent stay in the spool.
+cp "${SUITE_RUN_DIR}/contact.copy" "${SUITE_RUN_DIR}/.service/contact"
+sed -i \
+    -e 's/^\(CYLC_TASK_MSG_MAX_TRIES\)=.*$/\1=1/' \
+    -e 's/^\(CYLC_TASK_MSG_RETRY_INTVL\)=.*$/\1=1/' \
+    "${SUITE_RUN_DIR}/.service/contact"
+TEST_NAME="${TEST_NAME_BASE}-send-fail"
+CYLC_SUITE_NAME="${SUITE_NAME}" CYLC_TASK_ID='t0.1' \
+    run_ok "${TEST_NAME}" cylc message 'hello again'
+grep_ok 'WARNING: MESSAGE SEND FAILED' "${TEST_NAME}.stderr"
+TEST_NAME="${TEST_NAME_BASE}-spool-kept"
+ls "${SPOOL_DIR}" | sed 's/^[0-9.]*-[0-9]*\.json$/MESSAGES/' \
+    >"${TEST_NAME}.out"
+cmp_ok "${TEST_NAME}.out" <<'__OUT__'
+MESSAGES
+lock
+__OUT__
+rm -f "${SUITE_RUN_DIR}/.service/contact"
+
+purge_suite "${SUITE_NAME}"
+exit
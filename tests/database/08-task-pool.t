@@ -0,0 +1,60 @@
+#!/bin/bash
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2017 NIWA
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+# Suite database content, "task_pool" and "task_action_timers" tables, which
+# are updated with changes only, after tasks retry and leave the pool.
+. "$(dirname "$0")/test_header"
+set_test_number 11
+install_suite "${TEST_NAME_BASE}" "${TEST_NAME_BASE}"
+
+run_ok "${TEST_NAME_BASE}-validate" cylc validate "${SUITE_NAME}"
+suite_run_ok "${TEST_NAME_BASE}-run" cylc run --debug "${SUITE_NAME}"
+
+RUND="$(cylc get-global-config '--print-run-dir')/${SUITE_NAME}"
+
+# Task action timers of the tasks in the pool only, throughout the run
+for CYCLE in 2016 2017 2018 2019 2020; do
+    cmp_ok "${RUND}/task-action-timers-${CYCLE}.out" \
+        "${RUND}/task-pool-${CYCLE}.out"
+done
+
+# Tables at the end, the same in the private and the public databases
+for DB_FILE in "${RUND}/.service/db" "${RUND}/log/db"; do
+    sqlite3 "${DB_FILE}" 'SELECT * FROM task_pool ORDER BY cycle, name' \
+        >"$(basename "$(dirname "${DB_FILE}")")-task-pool.out"
+    sqlite3 "${DB_FILE}" \
+        'SELECT DISTINCT cycle, name FROM task_action_timers
+         ORDER BY cycle, name' \
+        >"$(basename "$(dirname "${DB_FILE}")")-task-action-timers.out"
+done
+cmp_ok '.service-task-pool.out' <<'__SELECT__'
+2020|t1|1|succeeded|
+2020|t2|1|succeeded|
+2021|t1|0|waiting|
+2021|t2|0|waiting|
+__SELECT__
+cmp_ok '.service-task-action-timers.out' <<'__SELECT__'
+2020|t1
+2020|t2
+2021|t1
+2021|t2
+__SELECT__
+cmp_ok 'log-task-pool.out' '.service-task-pool.out'
+cmp_ok 'log-task-action-timers.out' '.service-task-action-timers.out'
+
+purge_suite "${SUITE_NAME}"
+exit
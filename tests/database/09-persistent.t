@@ -0,0 +1,59 @@
+#!/bin/bash
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2017 NIWA
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+# Suite databases, with a persistent connection to the private database, and
+# both databases in WAL journal mode, across a restart.
+. "$(dirname "$0")/test_header"
+set_test_number 6
+install_suite "${TEST_NAME_BASE}" "${TEST_NAME_BASE}"
+
+create_test_globalrc '
+[cylc]
+    public database journal mode = WAL
+    private database persistent connection = True
+    private database synchronous = NORMAL
+    private database cache size = -4000'
+
+run_ok "${TEST_NAME_BASE}-validate" cylc validate "${SUITE_NAME}"
+suite_run_ok "${TEST_NAME_BASE}-run" cylc run --debug "${SUITE_NAME}"
+suite_run_ok "${TEST_NAME_BASE}-restart" cylc restart --debug "${SUITE_NAME}"
+
+RUND="$(cylc get-global-config '--print-run-dir')/${SUITE_NAME}"
+for DB_FILE in "${RUND}/.service/db" "${RUND}/log/db"; do
+    sqlite3 "${DB_FILE}" 'PRAGMA journal_mode'
+done >'journal-mode.out'
+cmp_ok 'journal-mode.out' <<'__OUT__'
+wal
+wal
+__OUT__
+
+for DB_FILE in "${RUND}/.service/db" "${RUND}/log/db"; do
+    sqlite3 "${DB_FILE}" \
+        'SELECT cycle, name, submit_num, run_status FROM task_jobs
+         ORDER BY cycle, name' \
+        >"$(basename "$(dirname "${DB_FILE}")")-task-jobs.out"
+done
+cmp_ok '.service-task-jobs.out' <<'__SELECT__'
+2016|t1|1|0
+2016|t2|1|0
+2017|t1|1|0
+2017|t2|1|0
+__SELECT__
+cmp_ok 'log-task-jobs.out' '.service-task-jobs.out'
+
+purge_suite "${SUITE_NAME}"
+exit
@@ -24,7 +24,7 @@ SUITED="$(cylc get-global-config --print-run-dir)/${SUITE_NAME}"
 run_ok "${TEST_NAME_BASE}-validate" cylc validate "${SUITE_NAME}"
 suite_run_ok "${TEST_NAME_BASE}-run" cylc run "${SUITE_NAME}" --debug
 sqlite3 "${SUITED}/log/db" \
-    'SELECT COUNT(*) FROM task_action_timers WHERE ctx_key_pickle GLOB "*event-handler-00*"' \
+    'SELECT COUNT(*) FROM task_action_timers WHERE ctx_key GLOB "*event-handler-00*"' \
     >"${TEST_NAME_BASE}-db-n-entries"
 cmp_ok "${TEST_NAME_BASE}-db-n-entries" <<<'1'
 suite_run_ok "${TEST_NAME_BASE}-restart" cylc restart "${SUITE_NAME}" --debug
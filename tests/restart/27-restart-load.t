@@ -0,0 +1,55 @@
+#!/bin/bash
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2017 NIWA
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+# Test restart load statistics, and removal of rows that cannot be loaded from
+# the task_pool and task_action_timers tables.
+. "$(dirname "$0")/test_header"
+set_test_number 5
+install_suite "${TEST_NAME_BASE}" "${TEST_NAME_BASE}"
+
+run_ok "${TEST_NAME_BASE}-validate" cylc validate "${SUITE_NAME}"
+suite_run_ok "${TEST_NAME_BASE}-run" cylc run "${SUITE_NAME}" --debug
+sqlite3 "${SUITE_RUN_DIR}/.service/db" <<'__SQL__'
+INSERT INTO task_states(name, cycle, submit_num, status)
+    VALUES('gone', '2016', 0, 'waiting');
+INSERT INTO task_pool VALUES('2016', 'gone', 0, 'waiting', NULL);
+INSERT INTO task_action_timers(cycle, name, ctx_key)
+    VALUES('2016', 't2', 'junk');
+__SQL__
+suite_run_ok "${TEST_NAME_BASE}-restart" cylc restart "${SUITE_NAME}" --debug
+grep_ok 'Restart loaded .* [0-9]* task proxies (.*s), [0-9]* task action timers (.*s), total .*s$' \
+    "${SUITE_RUN_DIR}/log/suite/log"
+for DB_FILE in "${SUITE_RUN_DIR}/.service/db" "${SUITE_RUN_DIR}/log/db"; do
+    sqlite3 "${DB_FILE}" \
+        'SELECT cycle, name FROM task_pool ORDER BY cycle, name'
+    sqlite3 "${DB_FILE}" \
+        'SELECT COUNT(*) FROM task_action_timers WHERE ctx_key=="junk"'
+done >'task-pool.out'
+cmp_ok 'task-pool.out' <<__OUT__
+2017|t1
+2017|t2
+2018|t1
+2018|t2
+0
+2017|t1
+2017|t2
+2018|t1
+2018|t2
+0
+__OUT__
+purge_suite "${SUITE_NAME}"
+exit
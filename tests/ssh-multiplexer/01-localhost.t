@@ -0,0 +1,58 @@
+#!/bin/bash
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2017 NIWA
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+#-------------------------------------------------------------------------------
+# Test remote job commands share one SSH connection per user@host. A stand-in
+# for "ssh" runs commands on the suite host, which the suite sees as remote
+# host "127.0.0.2".
+. "$(dirname "$0")/test_header"
+set_test_number 6
+install_suite "${TEST_NAME_BASE}" "${TEST_NAME_BASE}"
+SSH_LOG="${PWD}/ssh.log"
+create_test_globalrc '' "
+[hosts]
+    [[127.0.0.2]]
+        remote shell template = ${PWD}/fake-ssh ${SSH_LOG}
+        use ssh control master = True"
+
+run_ok "${TEST_NAME_BASE}-validate" cylc validate "${SUITE_NAME}"
+suite_run_ok "${TEST_NAME_BASE}-run" \
+    cylc run --debug --no-detach "${SUITE_NAME}"
+
+# One control master, used by all other SSH commands.
+TEST_NAME="${TEST_NAME_BASE}-master"
+grep -c -- '^-N -oControlMaster=yes ' "${SSH_LOG}" >"${TEST_NAME}.count"
+cmp_ok "${TEST_NAME}.count" <<<'1'
+CONTROL_PATH="$(sed -n 's/^-N -oControlMaster=yes -oControlPath=\([^ ]*\) .*$/\1/p' \
+    "${SSH_LOG}")"
+TEST_NAME="${TEST_NAME_BASE}-clients"
+grep -v -- '^-N ' "${SSH_LOG}" \
+    | grep -v -c -- "-oControlMaster=no -oControlPath=${CONTROL_PATH} " \
+    >"${TEST_NAME}.count"
+cmp_ok "${TEST_NAME}.count" <<<'0'
+TEST_NAME="${TEST_NAME_BASE}-jobs-cmds"
+sed -n 's/^.* cylc \(jobs-[a-z]*\) .*$/\1/p' "${SSH_LOG}" | sort -u \
+    >"${TEST_NAME}.out"
+cmp_ok "${TEST_NAME}.out" <<'__OUT__'
+jobs-poll
+jobs-submit
+__OUT__
+# Control master stopped on shutdown.
+exists_fail "$(dirname "${CONTROL_PATH}")"
+
+purge_suite "${SUITE_NAME}"
+exit
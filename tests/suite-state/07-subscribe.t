@@ -0,0 +1,48 @@
+#!/bin/bash
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2017 NIWA
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+# Test "cylc suite-state" waits on the suite for a task status, and only polls
+# the suite database with --no-subscribe.
+. "$(dirname "$0")/test_header"
+#-------------------------------------------------------------------------------
+set_test_number 7
+
+install_suite "${TEST_NAME_BASE}" subscribe
+
+run_ok "${TEST_NAME_BASE}-validate" cylc validate "${SUITE_NAME}"
+run_ok "${TEST_NAME_BASE}-validate-no-subscribe" \
+    cylc validate --set=NO_SUBSCRIBE=True "${SUITE_NAME}"
+
+# The suite reports the status to the poller, long before the end of the
+# first polling interval.
+suite_run_ok "${TEST_NAME_BASE}-run" \
+    cylc run --debug --no-detach "${SUITE_NAME}"
+SUITE_LOG="$(cylc cat-log -l "${SUITE_NAME}")"
+grep_ok '\[client-command\] wait_task_state ' "${SUITE_LOG}"
+grep_ok "\\[poller\\.1\\] -(current:running)> succeeded at " "${SUITE_LOG}"
+
+# The poller polls the suite database only.
+suite_run_ok "${TEST_NAME_BASE}-run-no-subscribe" \
+    cylc run --debug --no-detach --set=NO_SUBSCRIBE=True "${SUITE_NAME}"
+SUITE_LOG="$(cylc cat-log -l "${SUITE_NAME}")"
+TEST_NAME="${TEST_NAME_BASE}-no-subscribe"
+grep -c '\[client-command\] wait_task_state ' "${SUITE_LOG}" \
+    >"${TEST_NAME}.out"
+cmp_ok "${TEST_NAME}.out" <<<'0'
+
+purge_suite "${SUITE_NAME}"
+exit